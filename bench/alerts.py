@@ -0,0 +1,78 @@
+"""Per-tick cost of ``helper.alerts.AlertIndex`` with many alerts.
+
+    python -m bench.alerts --alerts 10000 --ticks 100000
+
+Spreads ``--alerts`` random thresholds over the fixture's KRW markets, then
+replays random-walk price updates (plus updates for unwatched markets, as the
+stream sends every market) through ``AlertIndex.check``. Every fired alert
+is compared with a brute-force scan of the same alerts, and the script exits
+1 on any mismatch.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.replay import percentile
+from bench.ws_stub import _load_markets
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Alert index cost per price update.")
+    parser.add_argument("--alerts", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=100000)
+    parser.add_argument("--unwatched", type=int, default=200, help="extra markets that have no alerts")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from helper.alerts import ABOVE, BELOW, Alert, AlertIndex
+
+    rng = random.Random(args.seed)
+    prices = {market: row["trade_price"] for market, row in _load_markets().items() if market.startswith("KRW-")}
+    watched = list(prices)
+    for idx in range(args.unwatched):
+        prices[f"KRW-IDLE{idx:03d}"] = 1000.0
+    index = AlertIndex()
+    pending = []
+    for idx in range(args.alerts):
+        market = rng.choice(watched)
+        direction = rng.choice((ABOVE, BELOW))
+        step = rng.uniform(0.001, 0.05)
+        threshold = prices[market] * (1 + step if direction == ABOVE else 1 - step)
+        alert = Alert(f"{idx:06d}", idx, "bench", 1, market, threshold, direction, 0.0)
+        index.add(alert)
+        pending.append(alert)
+
+    markets = list(prices)
+    samples = []
+    fired = 0
+    mismatches = 0
+    for _ in range(args.ticks):
+        market = rng.choice(markets)
+        prices[market] *= 1 + rng.uniform(-0.002, 0.002)
+        price = prices[market]
+        started = time.perf_counter()
+        hits = index.check(market, price)
+        samples.append(time.perf_counter() - started)
+        if market in watched:
+            expected = {alert.id for alert in pending if alert.market == market and alert.crossed(price)}
+            if expected != {alert.id for alert in hits}:
+                mismatches += 1
+            if expected:
+                pending = [alert for alert in pending if alert.id not in expected]
+        fired += len(hits)
+
+    print(f"{args.alerts} alerts on {len(watched)} markets, {args.ticks} ticks over {len(markets)} markets")
+    print(f"fired {fired}, still active {index.count}, mismatches {mismatches}")
+    print(f"check  p50 {percentile(samples, 50) * 1e6:7.2f} us  p99 {percentile(samples, 99) * 1e6:7.2f} us  max {max(samples) * 1e6:7.1f} us")
+    return 1 if mismatches or index.count != len(pending) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
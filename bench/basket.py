@@ -0,0 +1,70 @@
+"""Basket pricing latency versus basket size.
+
+    python -m bench.basket --latency 0.03 --repeat 20
+
+Prices baskets of 3, 10 and 30 Upbit KRW markets against the upstream stub
+(with ``--latency`` seconds per request) two ways: one ticker request per
+coin in turn, as the old ``!병림픽`` did, and ``helper.baskets.price`` with a
+single multi-market request. The ticker cache is cleared before every run so
+both pay for their requests.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench import fakes
+from bench.replay import percentile
+from bench.stub_server import Fixtures, UpstreamStub, build_routes
+
+SIZES = (3, 10, 30)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Basket pricing latency by basket size.")
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds added to every upstream request")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    fakes.install()
+    fixtures = Fixtures()
+    for idx in range(max(SIZES)):
+        fixtures.upbit[f"KRW-FILL{idx:02d}"] = {"market": f"KRW-FILL{idx:02d}", "korean_name": f"채움{idx:02d}", "english_name": f"Fill {idx:02d}", "trade_price": 1000.0 + idx, "signed_change_rate": idx / 1000}
+    stub = UpstreamStub(latency={"*": args.latency})
+    stub.routes = build_routes(fixtures)
+    from helper import http
+
+    http.UPSTREAM_OVERRIDE = stub.start()
+    from helper import baskets, cache, upbit
+
+    upbit.catalog()
+    print(f"{args.latency * 1000:.0f} ms upstream latency, ticker cache cleared before every run")
+    for size in SIZES:
+        markets = tuple(f"KRW-FILL{idx:02d}" for idx in range(size))
+        basket = baskets.Basket(f"fill{size}", markets, baskets.USER)
+        sequential, batched = [], []
+        for _ in range(args.repeat):
+            cache.market.clear()
+            upbit.catalog()
+            started = time.perf_counter()
+            rows = [upbit.tickers([market])[0] for market in markets]
+            baskets.rank(rows)
+            sequential.append(time.perf_counter() - started)
+
+            cache.market.clear()
+            upbit.catalog()
+            started = time.perf_counter()
+            baskets.price(basket)
+            batched.append(time.perf_counter() - started)
+        print(f"{size:>3} coins  per-coin p50 {percentile(sequential, 50) * 1000:7.1f} ms   basket p50 {percentile(batched, 50) * 1000:6.1f} ms  p99 {percentile(batched, 99) * 1000:6.1f} ms")
+    stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Bytes and parse time per ``!바낸`` lookup: full dump scan vs ``helper.binance``.
+
+    python -m bench.binance_snapshot --repeat 200
+
+Against the upstream stub (whose 24h ticker is padded to production size),
+compares the old path, which downloaded ``/api/v3/ticker/24hr`` for every
+command and scanned it, with the targeted ``symbols=[...]`` query and the
+background snapshot's dict lookup. Also checks that every mode prices the
+same pairs identically.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.replay import percentile
+from bench.stub_server import UpstreamStub
+
+PAIRS = ["BTC/USDT", "ETH/BTC", "XRP/USDT"]
+
+
+def _scan(payload: list, symbols: Sequence[str]) -> Dict[str, float]:
+    return {row["symbol"]: float(row["lastPrice"]) for row in payload if row["symbol"] in symbols}
+
+
+def _measure(fetch: Callable[[], bytes], parse: Callable[[bytes], Dict[str, float]], repeat: int):
+    sizes, fetches, parses = [], [], []
+    prices = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fetch()
+        fetched = time.perf_counter()
+        prices = parse(body)
+        fetches.append(fetched - started)
+        parses.append(time.perf_counter() - fetched)
+        sizes.append(len(body))
+    return {"bytes": sum(sizes) / len(sizes), "fetch": fetches, "parse": parses, "prices": prices}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Binance ticker bytes and parse time per command.")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    stub = UpstreamStub()
+    from helper import aio, binance, http
+
+    http.UPSTREAM_OVERRIDE = stub.start()
+    url = binance.TICKER_URL
+    results = {}
+    try:
+        for pair in PAIRS:
+            _, _, symbols = binance.pair_symbols(pair)
+            results[("full scan", pair)] = _measure(
+                lambda: http.get(url, coalesce=False).content,
+                lambda body: _scan(json.loads(body), symbols),
+                args.repeat,
+            )
+            results[("targeted", pair)] = _measure(
+                lambda: http.get(url, coalesce=False, params=binance._params(symbols)).content,
+                lambda body: {symbol: row["last_price"] for symbol, row in binance._index(json.loads(body)).items()},
+                args.repeat,
+            )
+            aio.run(binance.refresh_snapshot(), timeout=30)
+            results[("snapshot", pair)] = _measure(
+                lambda: b"",
+                lambda body: {symbol: row["last_price"] for symbol, row in binance.snapshot.get_many(symbols).items()},
+                args.repeat,
+            )
+    finally:
+        aio.close()
+        stub.stop()
+
+    failures = 0
+    print(f"{'mode':<10}{'pair':<10}{'bytes':>12}{'fetch p50 ms':>14}{'parse p50 ms':>14}")
+    for (mode, pair), result in results.items():
+        print(f"{mode:<10}{pair:<10}{result['bytes']:>12,.0f}{percentile(result['fetch'], 50) * 1000:>14.3f}{percentile(result['parse'], 50) * 1000:>14.3f}")
+        if result["prices"] != results[("full scan", pair)]["prices"]:
+            failures += 1
+            print(f"FAIL {mode} {pair}: {result['prices']} != {results[('full scan', pair)]['prices']}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
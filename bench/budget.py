@@ -0,0 +1,99 @@
+"""Upbit ticker bursts against an upstream that enforces Upbit's per-second limit.
+
+    python -m bench.budget --threads 16 --markets 20 --seconds 5
+
+The stub answers past ``UPBIT_GROUP_LIMIT`` calls a second with Upbit's 429.
+Each run primes the ticker cache with every market (spaced out, so the stub
+never refuses it), then has ``--threads`` workers read single-market tickers
+round-robin for ``--seconds``, once with ``helper.budget`` turned off and once
+with it pacing calls and deferring to the cache. It prints how many reads
+failed, how many 429s the stub sent, and the read latency.
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.replay import percentile
+from bench.stub_server import Fixtures, UPBIT_GROUP_LIMIT, UpstreamStub, build_routes
+
+
+def _run(upbit, markets, threads: int, seconds: float):
+    latencies, failures = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(offset: int):
+        idx = offset
+        while time.monotonic() < deadline:
+            market = markets[idx % len(markets)]
+            idx += 1
+            started = time.perf_counter()
+            try:
+                upbit.tickers([market])
+                error = None
+            except Exception as e:
+                error = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if error:
+                    failures.append(error)
+
+    workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, failures
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rate-budget pacing versus unpaced calls under Upbit's limit.")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--markets", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every upstream request")
+    args = parser.parse_args(argv)
+
+    fixtures = Fixtures()
+    for idx in range(args.markets):
+        fixtures.upbit[f"KRW-FILL{idx:02d}"] = {"market": f"KRW-FILL{idx:02d}", "korean_name": f"채움{idx:02d}", "english_name": f"Fill {idx:02d}", "trade_price": 1000.0 + idx, "signed_change_rate": idx / 1000}
+    stub = UpstreamStub(latency={"*": args.latency}, rate_limits=True)
+    stub.routes = build_routes(fixtures)
+    from helper import http
+
+    http.UPSTREAM_OVERRIDE = stub.start()
+    from helper import budget, cache, upbit
+
+    markets = [f"KRW-FILL{idx:02d}" for idx in range(args.markets)]
+    print(f"{args.threads} threads, {args.markets} markets, {args.seconds:.0f} s, Upbit limit {UPBIT_GROUP_LIMIT}/s per group")
+    for label, enabled in (("unpaced", False), ("budget", True)):
+        budget.budgets.clear()
+        budget.budgets.enabled = enabled
+        cache.market.clear()
+        # let the previous run's window and its last background refreshes pass
+        time.sleep(2.0)
+        for market in markets:
+            upbit.tickers([market])
+            time.sleep(1.5 / UPBIT_GROUP_LIMIT)
+        rejected, hits = stub.limits.rejected["api.upbit.com"], stub.hits["api.upbit.com"]
+        latencies, failures = _run(upbit, markets, args.threads, args.seconds)
+        rejected = stub.limits.rejected["api.upbit.com"] - rejected
+        sent = stub.hits["api.upbit.com"] - hits
+        print(
+            f"{label:8} reads {len(latencies):6d}  failed {len(failures):5d}  upstream {sent:4d} ({sent / args.seconds:5.1f}/s)  429s {rejected:4d}"
+            f"  p50 {percentile(latencies, 50) * 1000:6.2f} ms  p99 {percentile(latencies, 99) * 1000:7.2f} ms"
+        )
+    stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Candle reads from ``helper.candles`` versus refetching klines per request.
+
+    python -m bench.candles --latency 0.05 --repeat 50
+
+Against the upstream stub (with ``--latency`` seconds added per request) it
+times three ways a chart command could get its last ``--count`` candles:
+downloading them every time, reading the local store between refreshes, and
+reading it right after ``REFRESH`` has expired (one small tail request). It
+then checks, for Upbit and Binance, that the store agrees with a fresh
+download after a tail refresh, a backfill of older history and a torn append,
+and exits 1 if it does not.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from bench.replay import percentile
+from bench.stub_server import UpstreamStub
+
+SERIES = (("upbit", "KRW-BTC", "1h"), ("binance", "BTCUSDT", "1h"), ("upbit", "KRW-ETH", "1m"), ("binance", "ETHUSDT", "1d"))
+
+
+def _agree(stored, fresh) -> bool:
+    if len(stored) != len(fresh):
+        return False
+    # the still-open candle may have moved between the two reads
+    return bool(np.array_equal(stored.time, fresh.time) and np.allclose(stored.close[:-1], fresh.close[:-1]))
+
+
+def _verify(candles, exchange: str, symbol: str, interval: str, count: int) -> bool:
+    ok = True
+    first = candles.candles(exchange, symbol, interval, count)
+    ok &= _agree(first, candles.fetch(exchange, symbol, interval, count))
+
+    series = candles.store.series(exchange, symbol, interval)
+    # pretend the store went quiet for a few candles, then catch up
+    with series.lock:
+        series.replace(series.view()[:-3])
+        series.synced = 0.0
+    ok &= _agree(candles.candles(exchange, symbol, interval, count), candles.fetch(exchange, symbol, interval, count))
+
+    deeper = candles.HISTORY + 300
+    ok &= _agree(candles.candles(exchange, symbol, interval, deeper), candles.fetch(exchange, symbol, interval, deeper))
+
+    with open(os.path.join(series.directory, "close"), "ab") as fp:
+        fp.write(b"\x00" * 5)
+    reopened = candles.Series(series.directory)
+    ok &= len(reopened) == len(series) and np.array_equal(reopened.view().close, series.view().close)
+    return ok
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local candle store versus per-request kline downloads.")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every upstream request")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--count", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    stub = UpstreamStub(latency={"*": args.latency})
+    from helper import http
+
+    http.UPSTREAM_OVERRIDE = stub.start()
+    from helper import candles
+
+    with tempfile.TemporaryDirectory() as directory:
+        candles.store = candles.Store(directory)
+        exchange, symbol, interval = SERIES[1]
+
+        refetch = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            candles.fetch(exchange, symbol, interval, args.count)
+            refetch.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        candles.candles(exchange, symbol, interval, args.count)
+        cold = time.perf_counter() - started
+        series = candles.store.series(exchange, symbol, interval)
+        hits = sum(stub.hits.values())
+        warm, tail = [], []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            candles.candles(exchange, symbol, interval, args.count)
+            warm.append(time.perf_counter() - started)
+        warm_requests = sum(stub.hits.values()) - hits
+        for _ in range(args.repeat):
+            series.synced = 0.0
+            started = time.perf_counter()
+            candles.candles(exchange, symbol, interval, args.count)
+            tail.append(time.perf_counter() - started)
+
+        print(f"{exchange} {symbol} {interval}, last {args.count} candles, {args.latency * 1000:.0f} ms upstream latency")
+        print(f"refetch every time  p50 {percentile(refetch, 50) * 1000:8.2f} ms  p99 {percentile(refetch, 99) * 1000:8.2f} ms")
+        print(f"store, first call       {cold * 1000:8.2f} ms  ({candles.HISTORY} candles downloaded)")
+        print(f"store, warm         p50 {percentile(warm, 50) * 1000:8.3f} ms  p99 {percentile(warm, 99) * 1000:8.3f} ms  ({warm_requests} upstream requests)")
+        print(f"store, tail refresh p50 {percentile(tail, 50) * 1000:8.2f} ms  p99 {percentile(tail, 99) * 1000:8.2f} ms")
+
+        failed = [" ".join(key) for key in SERIES if not _verify(candles, *key, args.count)]
+    stub.stop()
+    print("store matches fresh downloads" if not failed else f"MISMATCH: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
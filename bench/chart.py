@@ -0,0 +1,121 @@
+"""Time ``bots.chart`` rendering against an equivalent matplotlib chart.
+
+    python -m bench.chart --repeat 200
+
+Renders ``--candles`` synthetic candles (plus the moving-average warm-up) with
+the Pillow renderer behind ``!차트`` and reports draw and PNG encode times.
+If matplotlib is installed, the same chart (candles, volume panel, three
+moving averages) is drawn with it the way an mplfinance-style bot would, and
+the one-off ``import matplotlib.pyplot`` cost is measured in a fresh
+interpreter. Exits 1 if the Pillow p99 exceeds ``--budget`` milliseconds.
+"""
+import argparse
+import io
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from bench.replay import percentile
+
+
+def synthetic(count: int, seed: int = 7):
+    from helper.candles import Candles
+
+    rng = np.random.default_rng(seed)
+    closes = 143_250_000 * np.exp(np.cumsum(rng.normal(0, 0.004, count)))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    spread = np.abs(rng.normal(0, 0.002, count)) * closes
+    times = 1_760_000_000 + np.arange(count, dtype=np.int64) * 3600
+    return Candles(times, opens, np.maximum(opens, closes) + spread, np.minimum(opens, closes) - spread, closes, rng.uniform(50, 500, count))
+
+
+def _report(name: str, samples: List[float]):
+    print(f"{name:<22} p50 {percentile(samples, 50) * 1000:8.2f} ms  p99 {percentile(samples, 99) * 1000:8.2f} ms")
+
+
+def _matplotlib_import_seconds() -> Optional[float]:
+    code = "import time; t = time.perf_counter(); import matplotlib; matplotlib.use('Agg'); import matplotlib.pyplot; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(result.stdout) if result.returncode == 0 else None
+
+
+def _render_matplotlib(plt, bars, visible: int, windows: Sequence[int]) -> bytes:
+    from bots.chart import moving_average
+
+    shown = bars[-visible:]
+    x = np.arange(len(shown))
+    rising = shown.close >= shown.open
+    colors = np.where(rising, "#0ecb81", "#f6465d")
+    figure, (price, volume) = plt.subplots(2, 1, figsize=(8, 5.2), dpi=100, sharex=True, gridspec_kw={"height_ratios": [4, 1]})
+    price.vlines(x, shown.low, shown.high, colors=colors, linewidth=1)
+    price.bar(x, np.abs(shown.close - shown.open), bottom=np.minimum(shown.open, shown.close), color=colors, width=0.7)
+    for window in windows:
+        price.plot(x, moving_average(np.asarray(bars.close), window)[-visible:], linewidth=1)
+    volume.bar(x, shown.volume, color=colors, width=0.7)
+    price.set_title(f"BTC 1h  {shown.close[-1]:,.0f}")
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    plt.close(figure)
+    return buffer.getvalue()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pillow chart renderer versus matplotlib.")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--candles", type=int, default=120)
+    parser.add_argument("--budget", type=float, default=50.0, help="Pillow p99 budget in ms")
+    args = parser.parse_args(argv)
+
+    from bots import chart
+
+    bars = synthetic(args.candles + max(chart.MOVING_AVERAGES) - 1)
+    draw, encode, sizes = [], [], []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        image = chart.render(bars, "비트코인(BTC)", "1h", "binance", visible=args.candles)
+        drawn = time.perf_counter()
+        buffer = chart.encode_png(image)
+        draw.append(drawn - started)
+        encode.append(time.perf_counter() - drawn)
+        sizes.append(len(buffer.getvalue()))
+    total = [a + b for a, b in zip(draw, encode)]
+    print(f"{args.candles} candles, {chart.WIDTH}x{chart.HEIGHT}, PNG ~{sum(sizes) // len(sizes) // 1024} KiB")
+    _report("pillow draw", draw)
+    _report("pillow png encode", encode)
+    _report("pillow total", total)
+
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ModuleNotFoundError:
+        print("matplotlib not installed; skipping the comparison")
+    else:
+        imported = _matplotlib_import_seconds()
+        if imported is not None:
+            print(f"{'matplotlib import':<22}     {imported * 1000:8.1f} ms (once per process)")
+        samples = []
+        for _ in range(max(args.repeat // 10, 5)):
+            started = time.perf_counter()
+            _render_matplotlib(plt, bars, args.candles, chart.MOVING_AVERAGES)
+            samples.append(time.perf_counter() - started)
+        _report("matplotlib total", samples)
+        print(f"pillow is {percentile(samples, 50) / percentile(total, 50):.1f}x faster at p50")
+
+    over = percentile(total, 99) * 1000 > args.budget
+    if over:
+        print(f"pillow p99 over the {args.budget:.0f} ms budget")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
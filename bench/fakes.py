@@ -0,0 +1,252 @@
+"""In-memory stand-ins for the ``iris`` SDK so ``irispy.py`` can run without an Iris server.
+
+``install()`` registers fake ``iris``, ``iris.bot.models``, ``iris.decorators`` and
+``iris.kakaolink`` modules in ``sys.modules``; it must run before ``irispy`` or any
+``bots.*`` module is imported.
+"""
+import itertools
+import sys
+import threading
+import time
+import types
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+_ids = itertools.count(1)
+
+
+class PyKV:
+    """Process-wide dict with the same ``get``/``put`` contract as ``iris.util.PyKV``."""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._data = {}
+        return cls._instance
+
+    def get(self, key):
+        return self._data.get(key, False)
+
+    def put(self, key, value):
+        self._data[key] = value
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def list_keys(self):
+        return list(self._data)
+
+    def search_key(self, search_string):
+        return [{"key": key, "value": value} for key, value in self._data.items() if search_string in key]
+
+    def open(self, filename):
+        pass
+
+    def close(self):
+        pass
+
+    @classmethod
+    def reset(cls):
+        PyKV()._data.clear()
+
+
+class Message:
+    def __init__(self, msg: str, type: int = 1, attachment: Optional[dict] = None):
+        self.id = next(_ids)
+        self.type = type
+        self.msg = msg
+        self.attachment = attachment or {}
+        self.v = {}
+        self.image = None
+        self.command, *param = msg.split(" ", 1)
+        self.has_param = len(param) > 0
+        self.param = param[0] if self.has_param else None
+
+
+@dataclass
+class Room:
+    id: int
+    name: str = "bench-room"
+
+    def is_group_chat(self) -> bool:
+        return True
+
+
+@dataclass
+class User:
+    id: int
+    name: str = "bench-user"
+    avatar: Any = None
+
+
+@dataclass
+class Reply:
+    at: float
+    kind: str
+    payload: Any
+
+
+class ChatContext:
+    """Records replies with timestamps instead of sending them to KakaoTalk."""
+
+    def __init__(self, msg: str, user_id: int = 1, room_id: int = 1, user_name: str = "bench-user"):
+        self.room = Room(room_id)
+        self.sender = User(user_id, user_name)
+        self.message = Message(msg)
+        self.raw = {"chat_id": str(room_id), "user_id": str(user_id), "message": msg}
+        self.api = None
+        self.is_lite = False
+        self.sent_at = time.perf_counter()
+        self.replies: List[Reply] = []
+        self.replied = threading.Event()
+
+    def _record(self, kind: str, payload):
+        self.replies.append(Reply(time.perf_counter(), kind, payload))
+        self.replied.set()
+
+    def reply(self, message, room_id: int = None, thread_id: int = None):
+        self._record("text", message)
+
+    def reply_media(self, files, room_id: int = None, thread_id: int = None):
+        self._record("media", files)
+
+    def get_source(self):
+        return None
+
+    @property
+    def first_reply_latency(self) -> Optional[float]:
+        if not self.replies:
+            return None
+        return self.replies[0].at - self.sent_at
+
+
+@dataclass
+class ErrorContext:
+    event: str
+    func: Callable
+    exception: Exception
+    args: list
+
+
+class _Api:
+    def __init__(self):
+        self.sent: List[tuple] = []
+
+    def reply(self, room_id, msg, thread_id=None):
+        self.sent.append((room_id, msg))
+
+    def reply_media(self, room_id, files, thread_id=None):
+        self.sent.append((room_id, files))
+
+    def query(self, query, bind=None):
+        return []
+
+
+class Bot:
+    def __init__(self, iris_url: str = "127.0.0.1:3000", *, max_workers=None):
+        self.iris_url = iris_url
+        self.api = _Api()
+        self.handlers: Dict[str, List[Callable]] = {}
+
+    def on_event(self, name: str):
+        def decorator(func: Callable):
+            self.handlers.setdefault(name.lower(), []).append(func)
+            return func
+        return decorator
+
+    def emit(self, name: str, *args):
+        for func in self.handlers.get(name.lower(), []):
+            func(*args)
+
+    def run(self):
+        raise RuntimeError("bench Bot does not connect to Iris")
+
+
+class IrisLink:
+    def __init__(self, *args, **kwargs):
+        self.sent: List[dict] = []
+
+    def send(self, **kwargs):
+        self.sent.append(kwargs)
+
+
+ADMINS: List[int] = []
+
+
+def has_param(func):
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs) if args[0].message.has_param else None
+    return wrapper
+
+
+def is_reply(func):
+    def wrapper(*args, **kwargs):
+        args[0].reply("메세지에 답장하여 요청하세요.")
+        return None
+    return wrapper
+
+
+def is_admin(func):
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs) if args[0].sender.id in ADMINS else None
+    return wrapper
+
+
+def is_not_banned(func):
+    def wrapper(*args, **kwargs):
+        bans = PyKV().get("ban") or []
+        return "" if args[0].sender.id in bans else func(*args, **kwargs)
+    return wrapper
+
+
+def install():
+    """Registers the fake ``iris`` modules; safe to call more than once."""
+    if getattr(sys.modules.get("iris"), "__bench__", False):
+        return
+
+    iris = types.ModuleType("iris")
+    iris.__bench__ = True
+    iris.ChatContext = ChatContext
+    iris.Bot = Bot
+    iris.PyKV = PyKV
+    iris.Message = Message
+    iris.Room = Room
+    iris.User = User
+    iris.IrisLink = IrisLink
+    iris.__path__ = []
+
+    bot = types.ModuleType("iris.bot")
+    bot.__path__ = []
+    bot.Bot = Bot
+    models = types.ModuleType("iris.bot.models")
+    models.ChatContext = ChatContext
+    models.ErrorContext = ErrorContext
+    models.Message = Message
+
+    decorators = types.ModuleType("iris.decorators")
+    decorators.ChatContext = ChatContext
+    decorators.PyKV = PyKV
+    decorators.has_param = has_param
+    decorators.is_reply = is_reply
+    decorators.is_admin = is_admin
+    decorators.is_not_banned = is_not_banned
+
+    kakaolink = types.ModuleType("iris.kakaolink")
+    kakaolink.IrisLink = IrisLink
+
+    iris.bot = bot
+    iris.decorators = decorators
+    iris.kakaolink = kakaolink
+    bot.models = models
+    sys.modules.update({
+        "iris": iris,
+        "iris.bot": bot,
+        "iris.bot.models": models,
+        "iris.decorators": decorators,
+        "iris.kakaolink": kakaolink,
+    })
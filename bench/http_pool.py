@@ -0,0 +1,74 @@
+"""Compares per-command latency with and without ``helper.http`` connection pooling.
+
+    python -m bench.http_pool --connect-latency 0.05 --repeat 3
+
+The same script is replayed twice against the upstream stub: first with every
+call on a one-off connection (``http.POOLING = False``, what bare
+``requests.get`` did), then over the per-host keep-alive pools. The stub
+charges ``--connect-latency`` for every new connection to stand in for the
+TCP/TLS handshake that pooling avoids.
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from bench.replay import DEFAULT_SCRIPT, boot, load_script, replay, summarize
+from bench.stub_server import UpstreamStub
+
+
+def _run(irispy, stub: UpstreamStub, messages: Sequence[str], pooled: bool, args) -> Dict[str, dict]:
+    from helper import http
+
+    http.close()
+    http.POOLING = pooled
+    replay(irispy, list(dict.fromkeys(messages)), timeout=args.timeout)
+    stub.connections = 0
+    chats, elapsed = replay(irispy, messages, rate=args.rate, users=args.users, rooms=args.rooms, timeout=args.timeout)
+    summary = summarize(chats)
+    summary["*"] = {"connections": stub.connections, "elapsed": elapsed, "replied": sum(1 for chat in chats if chat.replies)}
+    return summary
+
+
+def format_comparison(bare: Dict[str, dict], pooled: Dict[str, dict]) -> str:
+    lines = [f"{'command':<12}{'bare p50':>10}{'pool p50':>10}{'saved':>10}{'bare p95':>10}{'pool p95':>10}"]
+    for command in sorted(key for key in bare if key != "*"):
+        b, p = bare[command], pooled[command]
+        lines.append(
+            f"{command:<12}{b['p50'] * 1000:>10.1f}{p['p50'] * 1000:>10.1f}{(b['p50'] - p['p50']) * 1000:>10.1f}"
+            f"{b['p95'] * 1000:>10.1f}{p['p95'] * 1000:>10.1f}"
+        )
+    lines.append(f"upstream connections : bare={bare['*']['connections']}, pooled={pooled['*']['connections']}")
+    lines.append(f"wall time            : bare={bare['*']['elapsed']:.2f} s, pooled={pooled['*']['elapsed']:.2f} s")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-command latency saved by pooled upstream connections.")
+    parser.add_argument("scripts", nargs="*", type=Path, default=[DEFAULT_SCRIPT])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=20.0, help="messages per second, 0 sends as fast as possible")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--rooms", type=int, default=2)
+    parser.add_argument("--connect-latency", type=float, default=0.05, metavar="SECONDS", help="artificial cost of each new connection")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    messages: List[str] = []
+    for script in args.scripts:
+        messages.extend(load_script(script))
+    messages *= args.repeat
+
+    stub = UpstreamStub(connect_latency=args.connect_latency)
+    irispy = boot(stub.start())
+    try:
+        bare = _run(irispy, stub, messages, False, args)
+        pooled = _run(irispy, stub, messages, True, args)
+        print(format_comparison(bare, pooled))
+    finally:
+        stub.stop()
+    return 0 if bare["*"]["replied"] == pooled["*"]["replied"] == len(messages) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Time the all-symbol kimchi premium computation in ``helper.kimchi``.
+
+    python -m bench.kimchi --symbols 300 --repeat 2000
+
+Builds synthetic Upbit KRW and Binance USDT rows for ``--symbols`` coins (plus
+a production-sized set of Binance-only symbols) and times ``kimchi.compute``
+and the ranking on top of it, to confirm a refresh every few seconds costs
+no visible CPU.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.replay import percentile
+from bench.stub_server import BINANCE_FILLER_SYMBOLS
+
+
+def synthetic(symbols: int, usd_krw: float, seed: int = 7):
+    rng = random.Random(seed)
+    upbit_rows, binance_rows = [], {}
+    for idx in range(symbols):
+        symbol = f"C{idx:04d}"
+        usdt = 10 ** rng.uniform(-4, 5)
+        binance_rows[symbol + "USDT"] = {"symbol": symbol + "USDT", "last_price": usdt, "change_percent": 0.0}
+        upbit_rows.append({"market": "KRW-" + symbol, "trade_price": usdt * usd_krw * rng.uniform(0.97, 1.05)})
+    for idx in range(BINANCE_FILLER_SYMBOLS):
+        binance_rows[f"FILL{idx:04d}USDT"] = {"symbol": f"FILL{idx:04d}USDT", "last_price": 1.0, "change_percent": 0.0}
+    return upbit_rows, binance_rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Kimchi premium compute and rank time.")
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    from helper import kimchi
+
+    usd_krw = 1387.5
+    upbit_rows, binance_rows = synthetic(args.symbols, usd_krw)
+    compute, rank = [], []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        table = kimchi.compute(upbit_rows, binance_rows, usd_krw)
+        computed = time.perf_counter()
+        ranked = table.ranked()
+        table.rows(ranked[:10])
+        table.rows(ranked[::-1][:10])
+        compute.append(computed - started)
+        rank.append(time.perf_counter() - computed)
+    print(f"{len(table)} symbols joined out of {len(upbit_rows)} Upbit / {len(binance_rows)} Binance rows")
+    print(f"compute  p50 {percentile(compute, 50) * 1e6:8.1f} us  p99 {percentile(compute, 99) * 1e6:8.1f} us")
+    print(f"rank     p50 {percentile(rank, 50) * 1e6:8.1f} us  p99 {percentile(rank, 99) * 1e6:8.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
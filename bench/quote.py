@@ -0,0 +1,69 @@
+"""``!시세`` fan-out latency versus asking the exchanges one after another.
+
+    python -m bench.quote --latency api.upbit.com=0.05 --latency api.bithumb.com=0.3 --latency api.binance.com=0.15
+    python -m bench.quote --latency api.bithumb.com=5   # one exchange hanging
+
+Each run clears the market cache, then times ``quotes.compare`` (all sources
+at once, each under its ``DEADLINES`` entry) and the sequential chain the
+bots used before (Upbit, Bithumb, Binance, USD/KRW in turn), and prints the
+per-source status of the last fan-out.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.replay import _parse_latency, percentile
+from bench.stub_server import UpstreamStub
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Parallel cross-exchange quotes versus sequential calls.")
+    parser.add_argument("--latency", action="append", default=[], help="HOST=SECONDS or SECONDS for every host")
+    parser.add_argument("--symbol", default="WLD")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    stub = UpstreamStub(latency=_parse_latency(args.latency))
+    from helper import http
+
+    http.UPSTREAM_OVERRIDE = stub.start()
+    from helper import aio, binance, bithumb, cache, fx, quotes, upbit
+
+    fanned, chained, found = [], [], []
+    for _ in range(args.repeat):
+        cache.market.clear()
+        started = time.perf_counter()
+        found = quotes.compare(args.symbol)
+        fanned.append(time.perf_counter() - started)
+
+        cache.market.clear()
+        started = time.perf_counter()
+        for call in (
+            lambda: upbit.tickers(["KRW-" + args.symbol], check=False),
+            lambda: bithumb.tickers(["KRW-" + args.symbol], check=False),
+            lambda: binance.tickers([args.symbol + "USDT"]),
+            fx.usd_krw,
+        ):
+            try:
+                call()
+            except Exception:
+                pass
+        chained.append(time.perf_counter() - started)
+
+    print(f"{args.symbol}, latency {_parse_latency(args.latency) or 'none'}, deadlines {quotes.DEADLINES}")
+    print(f"fan-out     p50 {percentile(fanned, 50) * 1000:8.1f} ms  p99 {percentile(fanned, 99) * 1000:8.1f} ms")
+    print(f"sequential  p50 {percentile(chained, 50) * 1000:8.1f} ms  p99 {percentile(chained, 99) * 1000:8.1f} ms")
+    print("last fan-out: " + ", ".join(f"{quote.source} {quote.status} {quote.elapsed * 1000:.0f} ms" for quote in found))
+    aio.close()
+    stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Replays scripted message streams through ``irispy.on_message`` with no network access.
+
+    python -m bench.replay bench/scripts/market.txt --repeat 5 --rate 50
+
+Each script line is one chat message, optionally prefixed with a weight (``3x !김프``).
+Lines starting with ``#`` are ignored. Latency is measured from ``on_message`` to the
+first ``reply``/``reply_media`` and reported per command with p50/p95/p99 and throughput.
+Run with ``IRIS_ASYNC=1`` to measure the asyncio execution path instead of the lane threads.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench import fakes
+from bench.stub_server import UpstreamStub
+
+DEFAULT_SCRIPT = Path(__file__).with_name("scripts") / "market.txt"
+
+
+def load_script(path: Path) -> List[str]:
+    messages: List[str] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        weight, _, rest = line.partition(" ")
+        if weight.endswith("x") and weight[:-1].isdigit() and rest:
+            messages.extend([rest] * int(weight[:-1]))
+        else:
+            messages.append(line)
+    return messages
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def boot(upstream_url: str, rate_limits: bool = False):
+    """Imports ``irispy`` against the fake Iris SDK and the upstream stub.
+
+    Per-user rate limits are off unless ``rate_limits`` is set, since a replay
+    deliberately sends far more than one person would.
+    """
+    fakes.install()
+    os.chdir(ROOT)
+    from helper import http
+
+    http.UPSTREAM_OVERRIDE = upstream_url
+    sys.argv = [str(ROOT / "irispy.py"), "127.0.0.1:3000"]
+    import irispy
+
+    irispy.kl = fakes.IrisLink()
+    irispy.limiter.enabled = rate_limits
+    return irispy
+
+
+def replay(irispy, messages: Sequence[str], rate: float = 0.0, users: int = 1, rooms: int = 1, timeout: float = 30.0) -> Tuple[List[fakes.ChatContext], float]:
+    interval = 1.0 / rate if rate else 0.0
+    chats: List[fakes.ChatContext] = []
+    started = time.perf_counter()
+    for idx, msg in enumerate(messages):
+        if interval:
+            delay = started + idx * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        chat = fakes.ChatContext(msg, user_id=1000 + idx % users, room_id=1 + idx % rooms)
+        chats.append(chat)
+        irispy.on_message(chat)
+
+    deadline = time.perf_counter() + timeout
+    for chat in chats:
+        chat.replied.wait(max(0.0, deadline - time.perf_counter()))
+    finished = max((chat.replies[0].at for chat in chats if chat.replies), default=time.perf_counter())
+    return chats, finished - started
+
+
+def summarize(chats: Sequence[fakes.ChatContext]) -> Dict[str, dict]:
+    grouped: Dict[str, List[fakes.ChatContext]] = defaultdict(list)
+    for chat in chats:
+        grouped[chat.message.command].append(chat)
+
+    summary = {}
+    for command, items in grouped.items():
+        latencies = [chat.first_reply_latency for chat in items if chat.replies]
+        first_sent = min(chat.sent_at for chat in items)
+        last_reply = max((chat.replies[0].at for chat in items if chat.replies), default=first_sent)
+        window = last_reply - first_sent
+        summary[command] = {
+            "count": len(items),
+            "replied": len(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "throughput": len(latencies) / window if window > 0 else float("nan"),
+        }
+    return summary
+
+
+def format_report(summary: Dict[str, dict], elapsed: float, stub: Optional[UpstreamStub] = None) -> str:
+    lines = [f"{'command':<12}{'n':>6}{'ok':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"]
+    total = 0
+    for command, row in sorted(summary.items()):
+        total += row["replied"]
+        lines.append(
+            f"{command:<12}{row['count']:>6}{row['replied']:>6}"
+            f"{row['p50'] * 1000:>10.1f}{row['p95'] * 1000:>10.1f}{row['p99'] * 1000:>10.1f}{row['throughput']:>10.1f}"
+        )
+    lines.append(f"total {total} replies in {elapsed:.2f} s ({total / elapsed if elapsed > 0 else 0:.1f} req/s)")
+    if stub is not None:
+        lines.append("upstream requests : " + ", ".join(f"{host}={count}" for host, count in stub.hits.most_common()))
+        lines.append("upstream bytes    : " + ", ".join(f"{host}={size / 1024:,.0f}KiB" for host, size in stub.bytes_sent.most_common()))
+        lines.append(f"upstream conns    : {stub.connections}")
+    return "\n".join(lines)
+
+
+def _parse_latency(values: Sequence[str]) -> Dict[str, float]:
+    latency: Dict[str, float] = {}
+    for value in values:
+        host, sep, seconds = value.rpartition("=")
+        latency[host if sep else "*"] = float(seconds)
+    return latency
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline replay benchmark for irispy command handlers.")
+    parser.add_argument("scripts", nargs="*", type=Path, default=[DEFAULT_SCRIPT])
+    parser.add_argument("--repeat", type=int, default=1, help="replay the scripts this many times")
+    parser.add_argument("--rate", type=float, default=0.0, help="messages per second, 0 sends as fast as possible")
+    parser.add_argument("--users", type=int, default=5, help="number of distinct senders")
+    parser.add_argument("--rooms", type=int, default=2, help="number of distinct rooms")
+    parser.add_argument("--latency", action="append", default=[], metavar="[HOST=]SECONDS", help="artificial upstream latency")
+    parser.add_argument("--connect-latency", type=float, default=0.0, metavar="SECONDS", help="artificial cost of each new upstream connection")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--rate-limits", action="store_true", help="keep the per-user/room token buckets on")
+    parser.add_argument("--no-warmup", action="store_true", help="include first-use module imports in the measurement")
+    args = parser.parse_args(argv)
+
+    messages: List[str] = []
+    for script in args.scripts:
+        messages.extend(load_script(script))
+    messages *= args.repeat
+
+    stub = UpstreamStub(latency=_parse_latency(args.latency), connect_latency=args.connect_latency)
+    irispy = boot(stub.start(), rate_limits=args.rate_limits)
+    try:
+        if not args.no_warmup:
+            replay(irispy, list(dict.fromkeys(messages)), timeout=args.timeout)
+            stub.hits.clear()
+            stub.bytes_sent.clear()
+            stub.connections = 0
+        chats, elapsed = replay(irispy, messages, rate=args.rate, users=args.users, rooms=args.rooms, timeout=args.timeout)
+        print(format_report(summarize(chats), elapsed, stub))
+    finally:
+        from helper import aio
+
+        aio.close()
+        stub.stop()
+    return 0 if all(chat.replies for chat in chats) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,412 @@
+"""Local HTTP server that answers every upstream endpoint the bots call from recorded fixtures.
+
+Requests arrive as ``/<original host>/<original path>?<query>``; ``helper.http`` rewrites
+upstream URLs into that form when ``UPSTREAM_OVERRIDE`` points at this server.
+"""
+import calendar
+import io
+import json
+import math
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+FIXTURE_DIR = Path(__file__).with_name("fixtures")
+
+# Number of filler symbols added to the Binance 24h ticker so its size matches production.
+BINANCE_FILLER_SYMBOLS = 3000
+
+# Upbit's quotation API allows this many calls per second and endpoint group
+UPBIT_GROUP_LIMIT = 10
+UPBIT_GROUPS = (("/v1/market/", "market"), ("/v1/ticker", "ticker"), ("/v1/candles/", "candles"), ("/v1/orderbook", "orderbook"))
+# Binance spot's request weight per minute
+BINANCE_WEIGHT_LIMIT = 6000
+
+Response = Tuple[int, str, bytes]
+
+
+def _load(name: str):
+    with open(FIXTURE_DIR / name, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def _json(payload, status: int = 200) -> Response:
+    return status, "application/json;charset=UTF-8", json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _chart_png(width: int = 700, height: int = 289) -> bytes:
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGBA", (width, height), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    points = [(x, height // 2 + int(40 * ((x * 7919) % 97 - 48) / 48)) for x in range(0, width, 10)]
+    draw.line(points, fill=(204, 24, 24, 255), width=2)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _binance_row(symbol: str, last_price: float, change_percent: float) -> dict:
+    return {
+        "symbol": symbol,
+        "priceChange": f"{last_price * change_percent / 100:.8f}",
+        "priceChangePercent": f"{change_percent:.3f}",
+        "weightedAvgPrice": f"{last_price:.8f}",
+        "prevClosePrice": f"{last_price:.8f}",
+        "lastPrice": f"{last_price:.8f}",
+        "lastQty": "1.00000000",
+        "bidPrice": f"{last_price:.8f}",
+        "bidQty": "1.00000000",
+        "askPrice": f"{last_price:.8f}",
+        "askQty": "1.00000000",
+        "openPrice": f"{last_price:.8f}",
+        "highPrice": f"{last_price:.8f}",
+        "lowPrice": f"{last_price:.8f}",
+        "volume": "12345.00000000",
+        "quoteVolume": "12345678.00000000",
+        "openTime": 1760000000000,
+        "closeTime": 1760086399999,
+        "firstId": 1,
+        "lastId": 100000,
+        "count": 100000,
+    }
+
+
+class Fixtures:
+    def __init__(self):
+        self.upbit = {row["market"]: row for row in _load("upbit_markets.json")}
+        self.bithumb = {row["market"]: row for row in _load("bithumb_markets.json")}
+        self.naver = _load("naver.json")
+        self.nasdaq = _load("nasdaq.json")
+        binance = [_binance_row(row["symbol"], float(row["lastPrice"]), float(row["priceChangePercent"])) for row in _load("binance_tickers.json")]
+        binance += [_binance_row(f"FILL{idx:04d}USDT", 1.0 + idx / 1000, 0.0) for idx in range(BINANCE_FILLER_SYMBOLS)]
+        self.binance = {row["symbol"]: row for row in binance}
+        self.chart_png = _chart_png()
+
+
+def _catalog(markets: Dict[str, dict]) -> list:
+    return [{"market": market, "korean_name": row["korean_name"], "english_name": row["english_name"]} for market, row in markets.items()]
+
+
+def _tickers(markets: Dict[str, dict], query: Dict[str, list]) -> Response:
+    requested = [code for code in ",".join(query.get("markets", [""])).split(",") if code]
+    if not requested or any(code not in markets for code in requested):
+        return _json({"error": {"name": 404, "message": "Code not found"}}, 404)
+    rows = []
+    for code in requested:
+        row = markets[code]
+        rows.append({
+            "market": code,
+            "trade_price": row["trade_price"],
+            "signed_change_rate": row["signed_change_rate"],
+            "change_rate": abs(row["signed_change_rate"]),
+            "acc_trade_volume_24h": row.get("acc_trade_volume_24h", 0.0),
+            "acc_trade_price_24h": row.get("acc_trade_volume_24h", 0.0) * row["trade_price"],
+            "timestamp": int(time.time() * 1000),
+        })
+    return _json(rows)
+
+
+CANDLE_SECONDS = {"1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "1d": 86400, "1w": 604800}
+UPBIT_CANDLE_SECONDS = {"minutes/1": 60, "minutes/3": 180, "minutes/5": 300, "minutes/15": 900, "minutes/30": 1800, "minutes/60": 3600, "minutes/240": 14400, "days": 86400, "weeks": 604800}
+
+
+def _candle_times(step: int, count: int, start_ms: Optional[int], end_ms: Optional[int]) -> list:
+    """Open times (unix seconds) of up to ``count`` aligned candles, latest first unless ``start_ms`` is given."""
+    # weekly candles open on Monday like the real exchanges (the epoch was a Thursday)
+    offset = 4 * 86400 if step == 604800 else 0
+    now = int(time.time())
+    last = (now - offset) // step * step + offset
+    if end_ms is not None:
+        last = min(last, (end_ms // 1000 - offset) // step * step + offset)
+    if start_ms is not None:
+        first = -(-(start_ms // 1000 - offset) // step) * step + offset
+        return [t for t in range(first, last + 1, step)][:count]
+    return [last - i * step for i in range(count)][::-1]
+
+
+def _candle(base: float, step: int, t: int) -> Tuple[float, float, float, float, float]:
+    """Deterministic synthetic OHLCV, so repeated and overlapping requests agree."""
+    def close(at):
+        i = at // step
+        return base * (1 + 0.03 * math.sin(i / 23) + 0.01 * math.sin(i * 1.7))
+    open_, close_ = close(t - step), close(t)
+    return open_, max(open_, close_) * 1.002, min(open_, close_) * 0.998, close_, 100.0 + (t // step) % 50
+
+
+def build_routes(fixtures: Fixtures) -> Dict[Tuple[str, str], Callable[[str, Dict[str, list]], Response]]:
+    """Maps ``(host, path prefix)`` to a handler taking ``(path, query)``."""
+    naver = fixtures.naver
+    nasdaq = fixtures.nasdaq
+
+    def binance_24hr(path, query):
+        symbols = query.get("symbols") or query.get("symbol")
+        if symbols:
+            wanted = json.loads(symbols[0]) if symbols[0].startswith("[") else [symbols[0]]
+            rows = [fixtures.binance[symbol] for symbol in wanted if symbol in fixtures.binance]
+            return _json(rows if "symbols" in query else (rows[0] if rows else {"code": -1121, "msg": "Invalid symbol."}))
+        return _json(list(fixtures.binance.values()))
+
+    def binance_price(path, query):
+        symbol = query.get("symbol", [""])[0]
+        if symbol:
+            row = fixtures.binance.get(symbol)
+            if row is None:
+                return _json({"code": -1121, "msg": "Invalid symbol."}, 400)
+            return _json({"symbol": symbol, "price": row["lastPrice"]})
+        return _json([{"symbol": symbol, "price": row["lastPrice"]} for symbol, row in fixtures.binance.items()])
+
+    exchange_rows = {row["exchangeCode"]: row for row in naver["marketindex_exchange"]["normalList"]}
+
+    def exchange(path, query):
+        code = query.get("code", [""])[0]
+        if not code:
+            return _json(naver["marketindex_exchange"])
+        row = exchange_rows.get(code[3:6])
+        return _json({"normalList": [row] if row else []})
+
+    def calculator(path, query):
+        row = exchange_rows.get(query.get("u3", ["USD"])[0])
+        if row is None:
+            return _json({"country": []})
+        return _json({"country": [{"value": query.get("u2", ["1"])[0]}, {"value": row["closePrice"], "currencyUnit": "원"}]})
+
+    def open_er(path, query):
+        usd_krw = float(exchange_rows["USD"]["closePrice"].replace(",", ""))
+        rates = {"USD": 1.0, "KRW": usd_krw}
+        for code, row in exchange_rows.items():
+            unit = 100 if code == "JPY" else 1
+            rates.setdefault(code, usd_krw / (float(row["closePrice"].replace(",", "")) / unit))
+        return _json({"result": "success", "base_code": "USD", "time_last_update_unix": int(time.time()), "rates": rates})
+
+    def upbit_candles(path, query):
+        step = UPBIT_CANDLE_SECONDS.get(path[len("/v1/candles/"):])
+        row = fixtures.upbit.get(query.get("market", [""])[0])
+        if step is None or row is None:
+            return _json({"error": {"name": 404, "message": "Code not found"}}, 404)
+        to = query.get("to", [None])[0]
+        # ``to`` is exclusive
+        end_ms = calendar.timegm(time.strptime(to.rstrip("Z"), "%Y-%m-%dT%H:%M:%S")) * 1000 - 1 if to else None
+        rows = []
+        for t in _candle_times(step, min(int(query.get("count", ["1"])[0]), 200), None, end_ms)[::-1]:
+            open_, high, low, close, volume = _candle(row["trade_price"], step, t)
+            rows.append({
+                "market": row["market"],
+                "candle_date_time_utc": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t)),
+                "opening_price": open_,
+                "high_price": high,
+                "low_price": low,
+                "trade_price": close,
+                "timestamp": t * 1000,
+                "candle_acc_trade_volume": volume,
+            })
+        return _json(rows)
+
+    def binance_klines(path, query):
+        step = CANDLE_SECONDS.get(query.get("interval", [""])[0])
+        row = fixtures.binance.get(query.get("symbol", [""])[0])
+        if row is None:
+            return _json({"code": -1121, "msg": "Invalid symbol."}, 400)
+        if step is None:
+            return _json({"code": -1120, "msg": "Invalid interval."}, 400)
+        start = query.get("startTime", [None])[0]
+        end = query.get("endTime", [None])[0]
+        times = _candle_times(step, min(int(query.get("limit", ["500"])[0]), 1000), int(start) if start else None, int(end) if end else None)
+        klines = []
+        for t in times:
+            open_, high, low, close, volume = _candle(float(row["lastPrice"]), step, t)
+            klines.append([t * 1000, f"{open_:.8f}", f"{high:.8f}", f"{low:.8f}", f"{close:.8f}", f"{volume:.8f}", (t + step) * 1000 - 1, "0", 100, "0", "0", "0"])
+        return _json(klines)
+
+    def autocomplete(path, query):
+        item = naver["autocomplete"].get(query.get("q", [""])[0])
+        return _json({"items": [item] if item else []})
+
+    def realtime(path, query):
+        target = query.get("query", [""])[0]
+        kind, _, code = target.partition(":")
+        table = naver["realtime_indices"] if kind == "SERVICE_INDEX" else naver["realtime_items"]
+        data = table.get(code)
+        if data is None:
+            return _json({"resultCode": "success", "result": {"areas": []}})
+        return _json({"resultCode": "success", "result": {"areas": [{"name": kind, "datas": [data]}]}})
+
+    def nasdaq_quote(path, query):
+        for key in ("info", "summary", "chart"):
+            if path.endswith(key):
+                return _json(nasdaq[key])
+        return _json({"data": None, "status": {"rCode": 400}}, 400)
+
+    def vibe(path, query):
+        if "/lyric/" in path:
+            return _json(naver["vibe_lyric"])
+        return _json(naver["vibe_search"])
+
+    return {
+        ("api.upbit.com", "/v1/market/all"): lambda path, query: _json(_catalog(fixtures.upbit)),
+        ("api.upbit.com", "/v1/ticker"): lambda path, query: _tickers(fixtures.upbit, query),
+        ("api.upbit.com", "/v1/candles/"): upbit_candles,
+        ("api.bithumb.com", "/v1/market/all"): lambda path, query: _json(_catalog(fixtures.bithumb)),
+        ("api.bithumb.com", "/v1/ticker"): lambda path, query: _tickers(fixtures.bithumb, query),
+        ("api.binance.com", "/api/v3/ticker/24hr"): binance_24hr,
+        ("api.binance.com", "/api/v3/ticker/price"): binance_price,
+        ("api.binance.com", "/api/v3/klines"): binance_klines,
+        ("m.search.naver.com", "/p/csearch/content/qapirender.nhn"): calculator,
+        ("api.stock.naver.com", "/marketindex/exchange"): exchange,
+        ("open.er-api.com", "/v6/latest/"): open_er,
+        ("ac.stock.naver.com", "/ac"): autocomplete,
+        ("polling.finance.naver.com", "/api/realtime"): realtime,
+        ("ssl.pstatic.net", "/"): lambda path, query: (200, "image/png", fixtures.chart_png),
+        ("api.nasdaq.com", "/api/quote/"): nasdaq_quote,
+        ("apis.naver.com", "/vibeWeb/"): vibe,
+    }
+
+
+def _binance_weight(path: str, query: Dict[str, list]) -> int:
+    symbols = len(json.loads(query["symbols"][0])) if "symbols" in query else 1 if "symbol" in query else 0
+    if path.startswith("/api/v3/ticker/24hr"):
+        return 2 if 0 < symbols <= 20 else 40 if 0 < symbols <= 100 else 80
+    if path.startswith("/api/v3/ticker/price"):
+        return 2 if symbols == 1 else 4
+    return 2
+
+
+class RateLimits:
+    """Counts calls the way Upbit and Binance do, answers with their budget headers and refuses calls past the limit with a 429."""
+
+    def __init__(self, upbit_per_second: int = UPBIT_GROUP_LIMIT, binance_weight: int = BINANCE_WEIGHT_LIMIT):
+        self.upbit_per_second = upbit_per_second
+        self.binance_weight = binance_weight
+        self.rejected: Counter = Counter()
+        self._spent: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def charge(self, host: str, path: str, query: Dict[str, list]) -> Tuple[Optional[Response], Dict[str, str]]:
+        """``(429 response or None, headers)`` for one call."""
+        now = time.time()
+        if host == "api.upbit.com":
+            group = next((name for prefix, name in UPBIT_GROUPS if path.startswith(prefix)), "default")
+            key, cost, limit = (host, group, int(now)), 1, self.upbit_per_second
+        elif host == "api.binance.com":
+            key, cost, limit = (host, "weight", int(now // 60)), _binance_weight(path, query), self.binance_weight
+        else:
+            return None, {}
+        with self._lock:
+            self._spent[key] += cost
+            spent = self._spent[key]
+            over = spent > limit
+            if over:
+                self.rejected[host] += 1
+        if host == "api.upbit.com":
+            headers = {"Remaining-Req": f"group={group}; min={max(limit * 60 - spent, 0)}; sec={max(limit - spent, 0)}"}
+            throttled = _json({"error": {"name": "too_many_requests", "message": "Too many API requests."}}, 429)
+        else:
+            headers = {"X-MBX-USED-WEIGHT": str(spent), "X-MBX-USED-WEIGHT-1M": str(spent)}
+            if over:
+                headers["Retry-After"] = str(60 - int(now % 60))
+            throttled = _json({"code": -1003, "msg": "Too many requests."}, 429)
+        return (throttled if over else None), headers
+
+
+class UpstreamStub:
+    """Serves fixtures on ``127.0.0.1`` with optional per-host artificial latency in seconds.
+
+    ``connect_latency`` is charged once per new connection, standing in for the
+    TCP and TLS handshakes a keep-alive client only pays on the first request.
+    ``rate_limits`` adds Upbit's and Binance's budget headers and their 429s (see ``RateLimits``).
+    """
+
+    def __init__(self, latency: Optional[Dict[str, float]] = None, connect_latency: float = 0.0, rate_limits: bool = False):
+        self.latency = latency or {}
+        self.connect_latency = connect_latency
+        # off by default so the other benches measure latency rather than pacing
+        self.limits = RateLimits() if rate_limits else None
+        self.routes = build_routes(Fixtures())
+        self.connections = 0
+        self.hits: Counter = Counter()
+        self.bytes_sent: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, raw_path: str) -> Tuple[str, Response, Dict[str, str]]:
+        parsed = urlparse(raw_path)
+        host, _, path = parsed.path.lstrip("/").partition("/")
+        path = "/" + unquote(path)
+        query = parse_qs(parsed.query)
+        throttled, headers = self.limits.charge(host, path, query) if self.limits else (None, {})
+        if throttled is not None:
+            return host, throttled, headers
+        for (route_host, prefix), handler in self.routes.items():
+            if route_host == host and path.startswith(prefix):
+                return host, handler(path, query), headers
+        return host, _json({"error": f"no fixture for {host}{path}"}, 404), headers
+
+    def start(self, port: int = 0) -> str:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out as separate writes; without this, keep-alive
+            # clients stall on delayed ACKs and every response looks ~40 ms slower
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+                if stub.connect_latency:
+                    time.sleep(stub.connect_latency)
+
+            def do_GET(self):
+                host, (status, content_type, body), headers = stub.handle(self.path)
+                delay = stub.latency.get(host, stub.latency.get("*", 0.0))
+                if delay:
+                    time.sleep(delay)
+                with stub._lock:
+                    stub.hits[host] += 1
+                    stub.bytes_sent[host] += len(body)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="upstream-stub", daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve recorded upstream fixtures locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    stub = UpstreamStub()
+    print(f"upstream stub listening on {stub.start(args.port)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,106 @@
+"""Exercises ``helper.upbit``'s WebSocket price book against local stand-ins.
+
+    python -m bench.upbit_stream
+
+Starts the REST fixture stub and the ticker WebSocket stand-in, then checks
+that the book fills for every KRW market, times lookups from the book
+against REST round trips, drops the stream to confirm ``tickers()`` falls
+back to REST, and waits for the subscriber to reconnect. Exits 1 if any
+check fails.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.replay import percentile
+from bench.stub_server import UpstreamStub
+from bench.ws_stub import UpbitStreamStub
+
+
+def _wait(condition: Callable[[], bool], timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def _time_calls(func: Callable, count: int, before: Optional[Callable] = None) -> list:
+    samples = []
+    for _ in range(count):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Upbit WebSocket price book check against local stand-ins.")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between stand-in ticker updates")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    rest = UpstreamStub()
+    stream = UpbitStreamStub(interval=args.interval)
+    from helper import aio, cache, http, upbit
+
+    http.UPSTREAM_OVERRIDE = rest.start()
+    upbit.RECONNECT_MIN = 0.2
+    upbit.start_stream(stream.start())
+    failures = []
+
+    def check(name: str, ok: bool):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(name)
+
+    try:
+        markets = upbit.krw_markets(upbit.catalog())
+        check(f"book fills all {len(markets)} KRW markets", _wait(lambda: upbit.book.live and len(upbit.book.rows) >= len(markets), args.timeout))
+
+        hits = rest.hits["api.upbit.com"]
+        book_samples = _time_calls(lambda: upbit.tickers(["KRW-BTC"]), args.lookups)
+        all_samples = _time_calls(lambda: upbit.tickers(markets), args.lookups)
+        check("book answers without REST", rest.hits["api.upbit.com"] == hits)
+
+        upbit.stop_stream()
+        rest_samples = _time_calls(lambda: upbit.tickers(["KRW-BTC"]), 50, before=cache.market.clear)
+        check("REST fallback when the stream is stopped", rest.hits["api.upbit.com"] >= hits + 50)
+
+        print(f"KRW-BTC from book      p50 {percentile(book_samples, 50) * 1e6:8.1f} us  p99 {percentile(book_samples, 99) * 1e6:8.1f} us")
+        print(f"all {len(markets):>3} from book      p50 {percentile(all_samples, 50) * 1e6:8.1f} us  p99 {percentile(all_samples, 99) * 1e6:8.1f} us")
+        print(f"KRW-BTC over REST      p50 {percentile(rest_samples, 50) * 1e6:8.1f} us  p99 {percentile(rest_samples, 99) * 1e6:8.1f} us")
+
+        upbit.start_stream(stream.url)
+        check("stream resubscribes", _wait(lambda: upbit.book.live, args.timeout))
+        before = stream.connections
+        stream.drop()
+        check("book marked down after the stream drops", _wait(lambda: not upbit.book.connected, args.timeout))
+        hits = rest.hits["api.upbit.com"]
+        cache.market.clear()
+        row = upbit.tickers(["KRW-BTC"])[0]
+        check("tickers() served over REST while down", rest.hits["api.upbit.com"] > hits and row["market"] == "KRW-BTC")
+        check("subscriber reconnects", _wait(lambda: upbit.book.live and stream.connections > before, args.timeout))
+        first = upbit.tickers(["KRW-BTC"])[0]["trade_price"]
+        check("book keeps moving after reconnect", _wait(lambda: upbit.tickers(["KRW-BTC"])[0]["trade_price"] != first, args.timeout))
+    finally:
+        upbit.stop_stream()
+        aio.close()
+        stream.stop()
+        rest.stop()
+    print(f"stand-in frames sent: {stream.sent}, connections: {stream.connections}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
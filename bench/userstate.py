@@ -0,0 +1,113 @@
+"""Holdings updates through ``helper.userstate`` versus a PyKV read-modify-write per command.
+
+    python -m bench.userstate --threads 8 --users 20 --updates 200
+
+Runs against the real SQLite-backed ``iris`` PyKV in a temporary database.
+``--threads`` workers each register ``--updates`` coins spread over
+``--users`` users, first the way ``!코인등록`` used to (``get`` the user's
+dict, add the coin, ``put`` it back) and then with ``userstate.set_holding``
+and a background flush. It prints the per-command latency, how many PyKV
+writes each way took, and how many registrations were lost to concurrent
+read-modify-writes of the same user.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.replay import percentile
+
+
+def _run(register, threads: int, users: int, updates: int):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(index: int):
+        mine = []
+        for step in range(updates):
+            user_id = (index * updates + step) % users
+            started = time.perf_counter()
+            register(user_id, f"C{index}X{step}")
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, time.perf_counter() - started
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write-back user state versus per-command PyKV read-modify-write.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=200, help="registrations per thread")
+    args = parser.parse_args(argv)
+
+    from iris import PyKV
+
+    from helper import userstate
+
+    expected = args.threads * args.updates
+    with tempfile.TemporaryDirectory() as directory:
+        kv = PyKV()
+        kv.filename = os.path.join(directory, "bench.db")
+        puts = 0
+        put = kv.put
+
+        def counted_put(key, value):
+            nonlocal puts
+            puts += 1
+            put(key, value)
+
+        kv.put = counted_put
+
+        def read_modify_write(user_id, symbol):
+            coins = PyKV().get(f"{userstate.HOLDINGS_PREFIX}{user_id}") or {}
+            coins[symbol] = {"amount": 1.0, "average": 1000.0}
+            PyKV().put(f"{userstate.HOLDINGS_PREFIX}{user_id}", coins)
+
+        legacy, legacy_seconds = _run(read_modify_write, args.threads, args.users, args.updates)
+        legacy_kept = sum(len(coins) for coins in userstate.all_holdings().values())
+        legacy_puts = puts
+
+        for user_id in range(args.users):
+            PyKV().put(f"{userstate.HOLDINGS_PREFIX}{user_id}", {})
+        userstate.states.clear()
+        puts = 0
+        userstate.FLUSH_INTERVAL = 0.2
+        userstate.start_flusher()
+        cached, cached_seconds = _run(lambda user_id, symbol: userstate.set_holding(user_id, symbol, 1.0, 1000.0), args.threads, args.users, args.updates)
+        userstate.stop_flusher()
+        userstate.states.clear()
+        cached_kept = sum(len(coins) for coins in userstate.all_holdings().values())
+
+        print(f"{args.threads} threads x {args.updates} registrations over {args.users} users, SQLite PyKV")
+        for label, latencies, seconds, writes, kept in (
+            ("read-modify-write", legacy, legacy_seconds, legacy_puts, legacy_kept),
+            ("userstate", cached, cached_seconds, puts, cached_kept),
+        ):
+            print(
+                f"{label:18} p50 {percentile(latencies, 50) * 1000:7.3f} ms  p99 {percentile(latencies, 99) * 1000:7.3f} ms"
+                f"  {expected / seconds:8.0f}/s  PyKV puts {writes:5d}  lost {expected - kept:5d}"
+            )
+    from helper import aio
+
+    aio.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Local stand-in for Upbit's ticker WebSocket, fed from ``fixtures/upbit_markets.json``.
+
+A client sends the usual subscription frame; the stub answers with one
+snapshot per requested market and then random-walk updates every
+``interval`` seconds, as binary SIMPLE-format frames like the real stream.
+``drop()`` closes every open connection to exercise reconnects and the REST
+fallback.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from bench.stub_server import FIXTURE_DIR
+
+
+def _load_markets() -> Dict[str, dict]:
+    with open(FIXTURE_DIR / "upbit_markets.json", encoding="utf-8") as fp:
+        return {row["market"]: row for row in json.load(fp)}
+
+
+class UpbitStreamStub:
+    def __init__(self, interval: float = 0.05, seed: int = 7):
+        self.interval = interval
+        self.markets = _load_markets()
+        self.sent = 0
+        self.connections = 0
+        self._random = random.Random(seed)
+        self._sockets: Set = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner = None
+        self._port = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self._port}/websocket/v1"
+
+    def _frame(self, market: str) -> bytes:
+        row = self.markets[market]
+        return json.dumps({
+            "ty": "ticker",
+            "cd": market,
+            "tp": row["trade_price"],
+            "scr": row["signed_change_rate"],
+            "cr": abs(row["signed_change_rate"]),
+            "atv24h": row.get("acc_trade_volume_24h", 0.0),
+            "atp24h": row.get("acc_trade_volume_24h", 0.0) * row["trade_price"],
+            "tms": int(time.time() * 1000),
+            "st": "REALTIME",
+        }).encode("utf-8")
+
+    def _tick(self, market: str):
+        row = dict(self.markets[market])
+        step = 1 + self._random.uniform(-0.001, 0.001)
+        row["trade_price"] = round(row["trade_price"] * step, 8)
+        row["signed_change_rate"] = round(row["signed_change_rate"] + step - 1, 6)
+        self.markets[market] = row
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self._sockets.add(ws)
+        try:
+            subscription = json.loads((await ws.receive()).data)
+            codes = next(part["codes"] for part in subscription if part.get("type") == "ticker")
+            codes = [code for code in codes if code in self.markets]
+            for code in codes:
+                await ws.send_bytes(self._frame(code))
+                self.sent += 1
+            while not ws.closed:
+                await asyncio.sleep(self.interval)
+                code = self._random.choice(codes)
+                self._tick(code)
+                await ws.send_bytes(self._frame(code))
+                self.sent += 1
+        except (ConnectionResetError, StopIteration):
+            pass
+        finally:
+            self._sockets.discard(ws)
+        return ws
+
+    def start(self, port: int = 0) -> str:
+        from aiohttp import web
+
+        started = threading.Event()
+
+        async def serve():
+            app = web.Application()
+            app.router.add_get("/websocket/v1", self._handle)
+            self._runner = web.AppRunner(app)
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, "127.0.0.1", port)
+            await site.start()
+            self._port = site._server.sockets[0].getsockname()[1]
+            started.set()
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="upbit-ws-stub", daemon=True).start()
+        asyncio.run_coroutine_threadsafe(serve(), self._loop)
+        started.wait(5)
+        return self.url
+
+    def drop(self):
+        """Closes every open stream connection; clients are free to reconnect."""
+        async def close_all():
+            for ws in list(self._sockets):
+                await ws.close()
+        asyncio.run_coroutine_threadsafe(close_all(), self._loop).result(5)
+
+    def stop(self):
+        if self._runner is not None:
+            self.drop()
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._runner = None
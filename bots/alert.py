@@ -0,0 +1,62 @@
+from iris import ChatContext
+from helper import alerts, upbit
+
+DIRECTIONS = {'이상': alerts.ABOVE, '이하': alerts.BELOW}
+USAGE = '"!알림 코인 가격 이상/이하"로 입력하세요.\n예시 : !알림 BTC 150000000 이상\n목록 : !알림\n삭제 : !알림 삭제 번호 (모두 지우려면 !알림 삭제 전체)'
+
+def alert(chat: ChatContext):
+    if not chat.message.has_param:
+        list_alerts(chat)
+        return None
+    words = chat.message.param.split()
+    if words[0] == '삭제':
+        remove_alert(chat, words[1:])
+    else:
+        add_alert(chat, words)
+
+def add_alert(chat: ChatContext, words):
+    if len(words) != 3 or words[2] not in DIRECTIONS:
+        chat.reply(USAGE)
+        return None
+    try:
+        price = float(words[1].replace(',', ''))
+    except ValueError:
+        chat.reply(USAGE)
+        return None
+
+    matches = upbit.search(words[0])
+    if len(matches) != 1:
+        candidates = ', '.join(f"{market['korean_name']}({market['market'][4:]})" for market in matches[:5])
+        chat.reply(f'코인을 하나로 정할 수 없습니다 : {candidates}' if matches else '검색된 코인이 없습니다.')
+        return None
+    market = matches[0]['market']
+    current = upbit.tickers([market])[0]['trade_price']
+
+    new_alert = alerts.Alert.new(chat.sender.id, chat.sender.name, chat.room.id, market, price, DIRECTIONS[words[2]])
+    if new_alert.crossed(current):
+        chat.reply(f'현재가({alerts.format_price(current)}원)가 이미 {alerts.format_price(price)}원 {words[2]}입니다.')
+        return None
+    if not alerts.add(new_alert):
+        chat.reply(f'알림은 {alerts.MAX_PER_USER}개까지 등록할 수 있습니다. !알림 삭제 번호로 정리해주세요.')
+        return None
+    chat.reply(f'{alerts.format_alert(new_alert)} 알림을 등록했습니다.\n현재가 : {alerts.format_price(current)}원')
+
+def list_alerts(chat: ChatContext):
+    user_alerts = alerts.user_alerts(chat.sender.id)
+    if not user_alerts:
+        chat.reply('등록된 알림이 없습니다.\n' + USAGE)
+        return None
+    lines = ['내 알림'] + [f'{i}. {alerts.format_alert(user_alert)}' for i, user_alert in enumerate(user_alerts, 1)]
+    chat.reply('\n'.join(lines))
+
+def remove_alert(chat: ChatContext, args):
+    user_alerts = alerts.user_alerts(chat.sender.id)
+    if args == ['전체']:
+        targets = user_alerts
+    elif len(args) == 1 and args[0].isdigit() and 1 <= int(args[0]) <= len(user_alerts):
+        targets = [user_alerts[int(args[0])-1]]
+    else:
+        chat.reply('삭제할 알림 번호가 없습니다. !알림 으로 번호를 확인하세요.')
+        return None
+    removed = alerts.remove(chat.sender.id, [target.id for target in targets])
+    chat.reply(f'알림 {len(removed)}개를 삭제했습니다.')
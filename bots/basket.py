@@ -0,0 +1,91 @@
+from iris import ChatContext
+from iris.decorators import is_admin
+from helper import baskets
+
+MEDALS = ["🥇금", "🥈은", "🥉동"]
+USAGE = ('"!바구니 이름"으로 바구니 시세를 봅니다. (등락률순 : !바구니 이름 등락)\n'
+         '등록 : !바구니 등록 이름 코인1 코인2 ... (방 전체, 관리자 : !바구니 방등록 ...)\n'
+         '삭제 : !바구니 삭제 이름 (방 전체, 관리자 : !바구니 방삭제 이름)\n'
+         '목록 : !바구니')
+SCOPE_NAMES = {baskets.USER: '내 바구니', baskets.ROOM: '방 바구니', baskets.BUILTIN_SCOPE: '기본 바구니'}
+
+def basket(chat: ChatContext):
+    if not chat.message.has_param:
+        list_baskets(chat)
+        return None
+    words = chat.message.param.split()
+    match words[0]:
+        case '등록':
+            add_basket(chat, baskets.USER, chat.sender.id, words[1:])
+        case '방등록':
+            add_room_basket(chat, words[1:])
+        case '삭제':
+            remove_basket(chat, baskets.USER, chat.sender.id, words[1:])
+        case '방삭제':
+            remove_room_basket(chat, words[1:])
+        case _:
+            order = baskets.CHANGE if words[1:] == ['등락'] else baskets.PRICE
+            show_basket(chat, words[0], order)
+
+def format_price(price: float) -> str:
+    return f'{int(price):,}' if price % 1 == 0 else f'{price:,}'
+
+def format_basket(priced: baskets.Priced, header: str = '') -> str:
+    lines = [header or f'📈 {priced.basket.name} (업비트 기준)']
+    for rank, row in enumerate(priced.rows):
+        place = MEDALS[rank] if rank < len(MEDALS) else f'{rank + 1}위'
+        lines.append(f'{place} : {row.symbol} {format_price(row.price)}원 {row.change:+.2f}%')
+    if priced.missing:
+        lines.append('상장되어 있지 않음 : ' + ', '.join(market[4:] for market in priced.missing))
+    return '\n'.join(lines)
+
+def show_basket(chat: ChatContext, name: str, order: str = baskets.PRICE, header: str = ''):
+    found = baskets.find(name, chat.sender.id, chat.room.id)
+    if found is None:
+        chat.reply(f'"{name}" 바구니가 없습니다.\n' + USAGE)
+        return None
+    chat.reply(format_basket(baskets.price(found, order), header))
+
+def list_baskets(chat: ChatContext):
+    lines = ['바구니 목록']
+    for found in baskets.available(chat.sender.id, chat.room.id):
+        lines.append(f'[{SCOPE_NAMES[found.scope]}] {found.name} : ' + ', '.join(market[4:] for market in found.markets))
+    chat.reply('\n'.join(lines) + '\n\n' + USAGE)
+
+def add_basket(chat: ChatContext, scope: str, owner_id, words):
+    if len(words) < 2:
+        chat.reply(USAGE)
+        return None
+    name, queries = words[0], words[1:]
+    if len(name) > baskets.MAX_NAME or name in ('등록', '방등록', '삭제', '방삭제'):
+        chat.reply(f'바구니 이름은 {baskets.MAX_NAME}자 이하로, 명령어와 겹치지 않게 정해주세요.')
+        return None
+    if len(queries) > baskets.MAX_COINS:
+        chat.reply(f'바구니에는 코인을 {baskets.MAX_COINS}개까지 담을 수 있습니다.')
+        return None
+    markets, unresolved = baskets.resolve(queries)
+    if unresolved:
+        chat.reply('코인을 하나로 정할 수 없습니다 : ' + ', '.join(unresolved))
+        return None
+    if not baskets.save(scope, owner_id, name, markets):
+        chat.reply(f'바구니는 {baskets.MAX_BASKETS}개까지 만들 수 있습니다. !바구니 삭제 이름으로 정리해주세요.')
+        return None
+    chat.reply(f'{SCOPE_NAMES[scope]} "{name}"을(를) 등록했습니다 : ' + ', '.join(dict.fromkeys(market[4:] for market in markets)))
+
+# 방 바구니는 방 전체에 보이니 관리자만 바꾼다
+@is_admin
+def add_room_basket(chat: ChatContext, words):
+    add_basket(chat, baskets.ROOM, chat.room.id, words)
+
+@is_admin
+def remove_room_basket(chat: ChatContext, words):
+    remove_basket(chat, baskets.ROOM, chat.room.id, words)
+
+def remove_basket(chat: ChatContext, scope: str, owner_id, words):
+    if len(words) != 1:
+        chat.reply(USAGE)
+        return None
+    if baskets.delete(scope, owner_id, words[0]):
+        chat.reply(f'{SCOPE_NAMES[scope]} "{words[0]}"을(를) 삭제했습니다.')
+    else:
+        chat.reply(f'{SCOPE_NAMES[scope]}에 "{words[0]}"이(가) 없습니다.')
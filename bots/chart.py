@@ -0,0 +1,314 @@
+"""``!차트 BTC 1h``: candlestick charts drawn straight onto a Pillow canvas.
+
+Candles come from the local store in ``helper.candles``; every coordinate is
+computed once with NumPy and the candles, volume bars and moving averages are
+plain ``ImageDraw`` rectangles and polylines, so a chart costs a few
+milliseconds instead of a matplotlib import and figure.
+
+    !차트 BTC          업비트 KRW-BTC 1시간봉
+    !차트 비트코인 15m  업비트 KRW-BTC 15분봉
+    !차트 ETH/BTC 4h   바이낸스 ETHBTC 4시간봉
+"""
+import datetime
+import io
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    from iris import ChatContext
+except ModuleNotFoundError:  # pragma: no cover
+    ChatContext = None  # type: ignore[misc,assignment]
+
+from helper import binance, candles, metrics, upbit
+
+DEFAULT_INTERVAL = "1h"
+INTERVAL_ALIASES = {"1분": "1m", "5분": "5m", "15분": "15m", "30분": "30m", "1시간": "1h", "4시간": "4h", "일": "1d", "일봉": "1d", "주": "1w", "주봉": "1w"}
+INTERVAL_NAMES = {"1m": "1분", "3m": "3분", "5m": "5분", "15m": "15분", "30m": "30분", "1h": "1시간", "4h": "4시간", "1d": "일", "1w": "주"}
+USAGE = '"!차트 코인 간격"으로 입력하세요.\n예시 : !차트 BTC 1h, !차트 비트코인 15m, !차트 ETH/BTC 4h\n간격 : ' + ", ".join(candles.INTERVALS)
+
+VISIBLE = 120
+MOVING_AVERAGES = (7, 25, 99)
+
+WIDTH = 800
+HEIGHT = 520
+HEADER = 64
+AXIS_WIDTH = 92
+TIME_AXIS = 24
+VOLUME_HEIGHT = 90
+GAP = 8
+PAD = 10
+
+FONT_PATH = Path("res") / "NanumGothic.otf"
+BOLD_FONT_PATH = Path("res") / "NanumGothicBold.otf"
+KST = datetime.timezone(datetime.timedelta(hours=9))
+
+
+@dataclass(frozen=True)
+class Theme:
+    background: Tuple[int, int, int]
+    grid: Tuple[int, int, int]
+    text: Tuple[int, int, int]
+    muted: Tuple[int, int, int]
+    up: Tuple[int, int, int]
+    down: Tuple[int, int, int]
+    averages: Tuple[Tuple[int, int, int], ...]
+
+
+# Binance's dark chart with green-up candles; Upbit's light chart with the Korean red-up convention
+THEMES = {
+    candles.BINANCE: Theme((22, 26, 30), (37, 41, 48), (234, 236, 239), (132, 142, 156), (14, 203, 129), (246, 70, 93), ((240, 185, 11), (235, 64, 181), (145, 99, 255))),
+    candles.UPBIT: Theme((255, 255, 255), (236, 238, 242), (33, 37, 41), (128, 134, 140), (200, 34, 49), (18, 97, 196), ((242, 153, 0), (226, 62, 140), (105, 78, 214))),
+}
+
+
+def _load_font(path: Path, size: int) -> ImageFont.ImageFont:
+    if path.exists():
+        try:
+            return ImageFont.truetype(str(path), size)
+        except (OSError, IOError):
+            pass
+    return ImageFont.load_default()
+
+
+class Glyphs:
+    """A font whose glyphs are rasterized once and then pasted as masks.
+
+    FreeType takes about half a millisecond per ``draw.text`` call with these
+    fonts, more than all the candles together; pasting a cached mask takes a
+    few microseconds per glyph. Kerning is dropped, which digits and Hangul
+    labels do not miss.
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self.font = font
+        self.ascent, self.descent = font.getmetrics()
+        self._glyphs: Dict[str, Tuple[Image.Image, int, int, float]] = {}
+
+    def _glyph(self, char: str) -> Tuple[Image.Image, int, int, float]:
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            left, top, right, bottom = self.font.getbbox(char, anchor="ls")
+            mask = Image.new("L", (max(right - left, 1), max(bottom - top, 1)))
+            ImageDraw.Draw(mask).text((-left, -top), char, font=self.font, fill=255, anchor="ls")
+            glyph = self._glyphs[char] = (mask, left, top, self.font.getlength(char))
+        return glyph
+
+    def width(self, text: str) -> float:
+        return sum(self._glyph(char)[3] for char in text)
+
+    def draw(self, image: Image.Image, xy: Tuple[float, float], text: str, fill: Tuple[int, int, int], anchor: str = "la"):
+        """Same anchors as ``ImageDraw.text``: ``l``/``m``/``r`` across, ``a``/``t``/``m``/``s`` down."""
+        x, y = xy
+        if anchor[0] == "m":
+            x -= self.width(text) / 2
+        elif anchor[0] == "r":
+            x -= self.width(text)
+        if anchor[1] in "at":
+            baseline = y + self.ascent
+        elif anchor[1] == "m":
+            baseline = y + (self.ascent - self.descent) / 2
+        else:
+            baseline = y
+        for char in text:
+            mask, left, top, advance = self._glyph(char)
+            corner = (round(x + left), round(baseline + top))
+            image.paste(fill, corner + (corner[0] + mask.width, corner[1] + mask.height), mask)
+            x += advance
+
+
+FONTS = {
+    "title": Glyphs(_load_font(BOLD_FONT_PATH, 22)),
+    "price": Glyphs(_load_font(BOLD_FONT_PATH, 20)),
+    "legend": Glyphs(_load_font(FONT_PATH, 13)),
+    "axis": Glyphs(_load_font(FONT_PATH, 12)),
+}
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average; the first ``window - 1`` entries are NaN."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def format_price(value: float, step: float) -> str:
+    """``value`` with as many decimals as a price ``step`` apart needs to read differently."""
+    decimals = min(max(0, 1 - math.floor(math.log10(step))) if step > 0 else 2, 8)
+    return f"{value:,.{decimals}f}"
+
+
+def _time_label(seconds: int, interval: str) -> str:
+    moment = datetime.datetime.fromtimestamp(seconds, KST)
+    return moment.strftime("%y/%m/%d" if candles.INTERVALS[interval] >= 24 * 60 * 60 else "%m/%d %H:%M")
+
+
+def _nice_step(span: float, ticks: int = 5) -> float:
+    """The largest 1/2/5 step that still cuts ``span`` into at least ``ticks`` parts."""
+    raw = span / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (5, 2):
+        if factor * magnitude <= raw:
+            return factor * magnitude
+    return magnitude
+
+
+def render(bars: candles.Candles, title: str, interval: str, exchange: str, visible: int = VISIBLE) -> Image.Image:
+    """Draws the last ``visible`` of ``bars`` with volume and moving averages over all of them."""
+    theme = THEMES[exchange]
+    averages = [moving_average(np.asarray(bars.close, dtype=np.float64), window) for window in MOVING_AVERAGES]
+    shown = bars[-visible:]
+    averages = [average[-visible:] for average in averages]
+    count = len(shown)
+    opens, highs, lows, closes, volumes = (np.asarray(column, dtype=np.float64) for column in (shown.open, shown.high, shown.low, shown.close, shown.volume))
+
+    image = Image.new("RGB", (WIDTH, HEIGHT), theme.background)
+    draw = ImageDraw.Draw(image)
+
+    plot_left, plot_right = PAD, WIDTH - AXIS_WIDTH
+    price_top, price_bottom = HEADER, HEIGHT - TIME_AXIS - VOLUME_HEIGHT - GAP
+    volume_top, volume_bottom = price_bottom + GAP, HEIGHT - TIME_AXIS
+
+    low = float(np.nanmin([lows.min()] + [np.nanmin(a) for a in averages if not np.isnan(a).all()]))
+    high = float(np.nanmax([highs.max()] + [np.nanmax(a) for a in averages if not np.isnan(a).all()]))
+    if high <= low:
+        high, low = high * 1.001 + 1e-12, low * 0.999
+    margin = (high - low) * 0.04
+    low, high = low - margin, high + margin
+    scale = (price_bottom - price_top) / (high - low)
+
+    slot = (plot_right - plot_left) / visible
+    centers = plot_left + (np.arange(count) + visible - count + 0.5) * slot
+    half = max(slot * 0.35, 0.5)
+
+    def y(values: np.ndarray) -> np.ndarray:
+        return price_top + (high - values) * scale
+
+    # price grid and axis
+    step = _nice_step(high - low)
+    for level in np.arange(math.ceil(low / step) * step, high, step):
+        row = float(y(np.float64(level)))
+        draw.line((plot_left, row, plot_right, row), fill=theme.grid)
+        FONTS["axis"].draw(image, (plot_right + 6, row), format_price(level, step), theme.muted, anchor="lm")
+    draw.line((plot_right, price_top, plot_right, volume_bottom), fill=theme.grid)
+
+    # time axis: about five labels, on candle centers
+    label_every = max(count // 5, 1)
+    for i in range(label_every // 2, count, label_every):
+        x = float(centers[i])
+        draw.line((x, price_top, x, volume_bottom), fill=theme.grid)
+        FONTS["axis"].draw(image, (x, volume_bottom + 5), _time_label(int(shown.time[i]), interval), theme.muted, anchor="mt")
+
+    # candles and volume
+    rising = closes >= opens
+    wick_top, wick_bottom = y(highs), y(lows)
+    body_top, body_bottom = y(np.maximum(opens, closes)), y(np.minimum(opens, closes))
+    volume_scale = (volume_bottom - volume_top) / volumes.max() if volumes.max() > 0 else 0.0
+    volume_top_rows = volume_bottom - volumes * volume_scale
+    for i in range(count):
+        color = theme.up if rising[i] else theme.down
+        x = float(centers[i])
+        draw.line((x, float(wick_top[i]), x, float(wick_bottom[i])), fill=color)
+        draw.rectangle((x - half, float(body_top[i]), x + half, max(float(body_bottom[i]), float(body_top[i]) + 1)), fill=color)
+        draw.rectangle((x - half, float(volume_top_rows[i]), x + half, volume_bottom), fill=color)
+
+    # moving averages
+    for average, color in zip(averages, theme.averages):
+        points = [(float(px), float(py)) for px, py in zip(centers, y(average)) if not math.isnan(py)]
+        if len(points) > 1:
+            draw.line(points, fill=color, width=1)
+
+    # last price marker
+    last = closes[-1]
+    last_color = theme.up if rising[-1] else theme.down
+    row = float(y(np.float64(last)))
+    for x in range(plot_left, plot_right, 8):
+        draw.line((x, row, min(x + 4, plot_right), row), fill=last_color)
+    price_step = step / 100
+    label = format_price(last, price_step)
+    draw.rectangle((plot_right + 1, row - 9, WIDTH, row + 9), fill=last_color)
+    FONTS["axis"].draw(image, (plot_right + 6, row), label, (255, 255, 255), anchor="lm")
+
+    # header: title, last price, change over the shown range, moving average legend
+    change = (last / opens[0] - 1) * 100 if opens[0] else 0.0
+    heading = f"{title} · {INTERVAL_NAMES.get(interval, interval)}"
+    FONTS["title"].draw(image, (PAD, 8), heading, theme.text)
+    FONTS["price"].draw(image, (PAD + FONTS["title"].width(heading) + 16, 10), f"{label}  {change:+.2f}%", theme.up if change >= 0 else theme.down)
+    x = PAD
+    for window, average, color in zip(MOVING_AVERAGES, averages, theme.averages):
+        value = average[-1]
+        text = f"MA({window}) {format_price(value, price_step) if not math.isnan(value) else '-'}"
+        FONTS["legend"].draw(image, (x, 40), text, color)
+        x += FONTS["legend"].width(text) + 14
+    return image
+
+
+def encode_png(image: Image.Image) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with metrics.timer("render", stage="png_encode", command="chart"):
+        # a few flat colors: a 32-color palette looks the same, and quantizing plus
+        # encoding it is faster than deflating 24-bit RGB even at the fastest level
+        image.quantize(colors=32, method=Image.Quantize.FASTOCTREE).save(buffer, format="PNG", compress_level=1)
+    buffer.seek(0)
+    return buffer
+
+
+def parse(param: str) -> Optional[Tuple[str, str]]:
+    """``"BTC 15m"`` -> ``("BTC", "15m")``; None if the interval is not one ``helper.candles`` knows."""
+    words = param.split()
+    if not words or len(words) > 2:
+        return None
+    interval = DEFAULT_INTERVAL
+    if len(words) == 2:
+        interval = INTERVAL_ALIASES.get(words[1], words[1].lower())
+        if interval not in candles.INTERVALS:
+            return None
+    return words[0], interval
+
+
+def resolve(query: str) -> Tuple[Optional[Tuple[str, str, str]], List[dict]]:
+    """``(exchange, market code, title)`` for ``query``, or None with the Upbit candidates it matched."""
+    if "/" in query:
+        symbol, _, _ = binance.pair_symbols(query)
+        return (candles.BINANCE, symbol, query.upper()), []
+    matches = upbit.search(query)
+    if len(matches) != 1:
+        return None, matches
+    market = matches[0]
+    return (candles.UPBIT, market["market"], f"{market['korean_name']}({market['market'][4:]})"), []
+
+
+def chart(chat: ChatContext):
+    parsed = parse(chat.message.param) if chat.message.has_param else None
+    if parsed is None:
+        chat.reply(USAGE)
+        return None
+    query, interval = parsed
+    try:
+        target, matches = resolve(query)
+    except ValueError:
+        chat.reply(USAGE)
+        return None
+    if target is None:
+        candidates = ", ".join(f"{market['korean_name']}({market['market'][4:]})" for market in matches[:5])
+        chat.reply(f"코인을 하나로 정할 수 없습니다 : {candidates}" if matches else "검색된 코인이 없습니다.")
+        return None
+    exchange, symbol, title = target
+    try:
+        bars = candles.candles(exchange, symbol, interval, VISIBLE + max(MOVING_AVERAGES) - 1)
+    except Exception as e:
+        print(f"[chart] {exchange} {symbol} {interval} candles failed: {e}")
+        chat.reply("차트 데이터를 불러오지 못했습니다.")
+        return None
+    if not len(bars):
+        chat.reply("차트 데이터가 없습니다.")
+        return None
+    with metrics.timer("render", stage="draw", command="chart"):
+        image = render(bars, title, interval, exchange)
+    return chat.reply_media([encode_png(image)])
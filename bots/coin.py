@@ -1,20 +1,17 @@
-import requests
+import asyncio
 import datetime
 import pytz
-from iris import ChatContext, PyKV
-
-all_url = "https://api.upbit.com/v1/market/all"
-base_url = "https://api.upbit.com/v1/ticker?markets="
-currency_url = "https://m.search.naver.com/p/csearch/content/qapirender.nhn?key=calculator&pkid=141&q=%ED%99%98%EC%9C%A8&where=m&u1=keb&u6=standardUnit&u7=0&u3=USD&u4=KRW&u8=down&u2=1"
-binance_url = "https://api.binance.com/api/v3/ticker/"
+from iris import ChatContext
+from helper import aio, binance, board, fx, kimchi, portfolio, upbit, userstate
 
 def get_coin_info(chat: ChatContext):
     match chat.message.command:
         case "!코인":
-            if chat.message.has_param:
+            query = _board_query(chat.message.param if chat.message.has_param else '')
+            if query is None:
                 get_upbit(chat)
             else:
-                get_upbit_all(chat)
+                get_upbit_all(chat, query)
         case "!내코인":
             get_my_coins(chat)
         case "!바낸":
@@ -23,155 +20,148 @@ def get_coin_info(chat: ChatContext):
             get_kimchi_premium(chat)
         case "!달러":
             usd_to_krw(chat)
+        case "!환율":
+            get_exchange_rates(chat)
         case "!코인등록":
             coin_add(chat)
         case "!코인삭제":
             coin_remove(chat)
 
 def get_upbit(chat: ChatContext):
-    kv = PyKV()
-    query = chat.message.param.upper()
-    res = requests.get(base_url + 'KRW-' + query)
-    if 'error' in res.text:
-        try:
-            result_json, query = get_upbit_korean(query)
-        except:
-            chat.reply("검색된 코인이 없습니다.")
-            return None
-
+    matches = upbit.search(chat.message.param)
+    if len(matches) > 1:
+        chat.reply(_format_candidates(chat.message.param, matches))
+        return None
+    if matches:
+        market = matches[0]['market']
     else:
-        result_json = res.json()[0]
-    
+        # 카탈로그 갱신 전에 상장된 심볼일 수 있다
+        market = 'KRW-' + chat.message.param.upper()
+    res = upbit.tickers([market], check=False)
+    if 'error' in res:
+        chat.reply("검색된 코인이 없습니다.")
+        return None
+    result_json = res[0]
+    query = market[4:]
+    chat.reply(_format_upbit(query, result_json, userstate.holding(chat.sender.id, query)))
+
+CANDIDATE_LIMIT = 10
+
+def _format_candidates(param, matches):
+    lines = [f'"{param}" 검색 결과가 여러 개입니다. 코인명이나 심볼로 다시 입력하세요.']
+    lines += [f"{market['korean_name']}({market['market'][4:]})" for market in matches[:CANDIDATE_LIMIT]]
+    if len(matches) > CANDIDATE_LIMIT:
+        lines.append(f'외 {len(matches) - CANDIDATE_LIMIT}개')
+    return '\n'.join(lines)
+
+def _format_upbit(query, result_json, holding=None):
     price = result_json['trade_price']
     change = result_json['signed_change_rate']*100
     if price % 1 == 0:
         price = int(price)
     
     result = query + f'\n현재가 : {price:,}원\n등락률 : {change:,.2f}%'
-    try:
-        user_coin_info = kv.get(f"coin.{str(chat.sender.id)}")[query]
-        amount = user_coin_info["amount"]
-        average = user_coin_info["average"]
-        seed = average*amount
+    if holding is not None and holding.cost:
+        amount = holding.amount
+        average = holding.average
+        seed = holding.cost
         total = round(result_json['trade_price']*amount,0)
         percent = round((total/seed-1)*100,1)
         plus_mark = "+" if percent > 0 else ""
         result += f'\n총평가금액 : {total:,.0f}원({plus_mark}{percent:,.1f}%)\n총매수금액 : {seed:,.0f}원\n보유수량 : {amount:,.0f}개\n평균단가 : {average:,}원'
-    except:
-        pass        
-    chat.reply(result)
+    return result
 
 def get_my_coins(chat: ChatContext):
-    kv = PyKV()
-    my_coins = kv.get(f"coin.{str(chat.sender.id)}")
-    if not my_coins:
+    my_portfolio = portfolio.value_user(chat.sender.id)
+    if my_portfolio is None:
         chat.reply("등록된 코인이 없습니다. !코인등록 기능으로 코인을 등록하세요.")
         return None
+    if not my_portfolio.positions:
+        chat.reply(f"업비트 원화마켓에 없는 코인만 등록되어 있습니다 : {', '.join(my_portfolio.unlisted)}")
+        return None
+    chat.reply(_format_my_coins(my_portfolio, _portfolio_changes(chat.sender.id)))
 
-    my_coins_list = []
-    for key in my_coins.keys():
-        my_coins_list.append("KRW-" + key)
-    
-    coins_query = ",".join(my_coins_list)
-    
-    res = requests.get(base_url + coins_query)
-    
+PORTFOLIO_CHANGES = [('어제', 24*60*60), ('지난주', 7*24*60*60)]
+
+def _portfolio_changes(user_id):
+    return [(label, portfolio.history.at(user_id, seconds)) for label, seconds in PORTFOLIO_CHANGES]
+
+def _format_my_coins(my_portfolio, changes=()):
     result_list = []
-    coins = {}
-    current_total = 0
-    bought_total = 0
-    
-    for coin in res.json():
-        coins[coin['market'][4:]] = {'price' : coin['trade_price'], 'change' : coin['signed_change_rate']*100}
-    
-    for key in coins.keys():
-        to_append = f'{key}\n현재가 : {coins[key]["price"]} 원\n등락률 : {coins[key]["change"]:.2f} %'
-        amount = my_coins[key]["amount"]
-        average = my_coins[key]["average"]
-        seed = average*amount
-        total = round(coins[key]["price"]*amount,0)
-        percent = round((total/seed-1)*100,1)
+    for position in my_portfolio.positions:
+        to_append = f'{position.symbol}\n현재가 : {position.price} 원\n등락률 : {position.change:.2f} %'
+        percent = round((position.value/position.cost-1)*100,1)
         plus_mark = "+" if percent > 0 else ""
-        to_append = to_append + f'\n총평가금액 : {total:,.0f}원({plus_mark}{percent:,.1f}%)\n총매수금액 : {seed:,.0f}원\n보유수량 : {amount:,.0f}개\n평균단가 : {average:,}원'
+        to_append = to_append + f'\n총평가금액 : {position.value:,.0f}원({plus_mark}{percent:,.1f}%)\n총매수금액 : {position.cost:,.0f}원\n보유수량 : {position.amount:,.0f}개\n평균단가 : {position.average:,}원'
         result_list.append(to_append)
-        current_total += total
-        bought_total += seed
     result = '\n\n'.join(result_list)
+    current_total = my_portfolio.value
+    bought_total = my_portfolio.cost
     total_change = round((current_total/bought_total-1)*100,1)
-    result = '내 코인\n' + '\u200b'*500 + f'\n전체\n총평가 : {current_total:,.0f}원\n총매수 : {bought_total:,.0f}원\n평가손익 : {current_total-bought_total:+,.0f}원\n수익률 : {total_change:+,.1f}%\n\n' + result
-    
-    chat.reply(result)
-    
-def get_upbit_all(chat: ChatContext):
-    res = requests.get(all_url)
-    krw_coins = []
-    for market in res.json():
-        if 'KRW' in market['market']:
-            krw_coins.append(market['market'])
-
-    res = requests.get(base_url + ','.join(krw_coins))
-    
-    result_list = []
-    coins = {}
-    result_list.append('업비트 원화시세\n' + '\u200b'*500)
+    summary = f'\n전체\n총평가 : {current_total:,.0f}원\n총매수 : {bought_total:,.0f}원\n평가손익 : {current_total-bought_total:+,.0f}원\n수익률 : {total_change:+,.1f}%'
+    for label, point in changes:
+        # 손익 차이로 비교해서 그 사이 추가 매수한 금액은 빠진다
+        if point is not None and point.value:
+            diff = my_portfolio.pnl - point.pnl
+            summary += f'\n{label} 대비 : {diff:+,.0f}원({diff/point.value*100:+.1f}%)'
+    if my_portfolio.unlisted:
+        # 상장폐지됐거나 잘못 등록된 코인은 시세 없이 빠진다
+        summary += f'\n시세 없음 : {", ".join(my_portfolio.unlisted)}'
+    return '내 코인\n' + '\u200b'*500 + summary + '\n\n' + result
 
-    for coin in res.json():
-        coins[coin['market'][4:]] = {'price' : coin['trade_price'], 'change' : coin['signed_change_rate']*100}
-    coin_list = sorted(coins.items(),key = lambda x: x[1]['change'],reverse=True)
-    
-    for item in coin_list:
-        to_append = f'{item[0]}\n현재가 : {item[1]["price"]} 원\n등락률 : {item[1]["change"]:.2f} %'
-        result_list.append(to_append)
-    result = '\n\n'.join(result_list)
-    
-    chat.reply(result)
+BOARD_QUERIES = {'전체': None, '상승': board.GAINERS, '하락': board.LOSERS, '거래량': board.VOLUME, '거래대금': board.VOLUME}
 
-def get_upbit_korean(query):
-    res_eng_query = requests.get(all_url)
-    for market in res_eng_query.json():
-        if 'KRW' in market['market'] and query in market['korean_name']:
-            eng_query = market['market']
-            if query == market['korean_name']:
-                break
+def _board_query(param):
+    """"" / "전체 2" / "상승 20" / "거래량" -> (종류, 숫자), 시세판 조회가 아니면 None"""
+    words = param.split()
+    if not words:
+        return ('전체', None)
+    if words[0] not in BOARD_QUERIES or len(words) > 2 or (len(words) == 2 and not words[1].isdigit()):
+        return None
+    return (words[0], int(words[1]) if len(words) == 2 else None)
 
-    res = requests.get(base_url + eng_query)
-    return (res.json()[0],eng_query[4:])
+def _render_board(market_board, query):
+    kind, number = query
+    if BOARD_QUERIES[kind] is None:
+        return market_board.page(number or 1)
+    return market_board.ranked(BOARD_QUERIES[kind], number or board.DEFAULT_TOP)
 
+def get_upbit_all(chat: ChatContext, query=('전체', None)):
+    chat.reply(_render_board(board.board(), query))
 
 def get_binance(chat: ChatContext):
     try:
-        query = chat.message.param.upper()
-        query_split = query.split("/")
-        query = "".join(query_split)
+        query, quote, symbols = binance.pair_symbols(chat.message.param)
         currency = get_USDKRW()
-        r = requests.get(binance_url+'24hr').json()
-        is_USDT = query_split[1] in ["USDT", "BUSD", "USDC"]
-        for coin in r:
-            if coin['symbol'] == 'BTCUSDT':
-                BTCUSDT = float(coin['lastPrice'])
-                if query == 'BTCUSDT':
-                    price = BTCUSDT
-                    change = float(coin['priceChangePercent'])
-            elif coin['symbol'] == query:
-                price = float(coin['lastPrice'])
-                change = float(coin['priceChangePercent'])
-            elif coin['symbol'] == query_split[1]+'USDT':
-                to_USDT = float(coin['lastPrice'])
-        if not is_USDT:
-            price = price*to_USDT
-        BTCKRW = requests.get(base_url + "KRW-BTC").json()[0]["trade_price"]
-        query_KRW = price*currency
-        query_KRW_kimp = (BTCKRW/(BTCUSDT*currency))*query_KRW
-        res = f'{query}\nUSD : ${price:,f}\nKRW : ￦{query_KRW:,.2f}\nKRW(김프) : ￦{query_KRW_kimp:,.2f}\n등락률 : {change:+.2f}%\n환율 : ￦{currency:,.0f}'
-        chat.reply(res)
+        tickers = binance.tickers(symbols)
+        BTCKRW = upbit.tickers(["KRW-BTC"])[0]["trade_price"]
+        chat.reply(_format_binance(query, quote, tickers, currency, BTCKRW))
     except Exception as e:
         print(e)
-        chat.reply('코인이 정확하지 않거나 오류가 발생하였습니다. 코인심볼과 화폐단위를 함께 적어주세요. 예시 : BTC/USDT, ETC/USDT, IQ/BNB')
+        chat.reply(BINANCE_HELP)
+
+BINANCE_HELP = '코인이 정확하지 않거나 오류가 발생하였습니다. 코인심볼과 화폐단위를 함께 적어주세요. 예시 : BTC/USDT, ETC/USDT, IQ/BNB'
+
+def _format_binance(query, quote, tickers, currency, BTCKRW):
+    price = tickers[query]['last_price']
+    change = tickers[query]['change_percent']
+    BTCUSDT = tickers['BTCUSDT']['last_price']
+    if quote not in binance.USD_QUOTES:
+        price = price*tickers[quote+'USDT']['last_price']
+    query_KRW = price*currency
+    query_KRW_kimp = (BTCKRW/(BTCUSDT*currency))*query_KRW
+    return f'{query}\nUSD : ${price:,f}\nKRW : ￦{query_KRW:,.2f}\nKRW(김프) : ￦{query_KRW_kimp:,.2f}\n등락률 : {change:+.2f}%\n환율 : ￦{currency:,.0f}'
 
 def get_kimchi_premium(chat: ChatContext):
-    BTCUSDT = float(requests.get(binance_url+"price?symbol=BTCUSDT").json()["price"])
-    BTCKRW = requests.get(base_url + "KRW-BTC").json()[0]["trade_price"]
+    if chat.message.param == '전체':
+        chat.reply(_format_kimchi_ranking(kimchi.table()))
+        return None
+    BTCUSDT = binance.tickers(["BTCUSDT"])["BTCUSDT"]["last_price"]
+    BTCKRW = upbit.tickers(["KRW-BTC"])[0]["trade_price"]
     USDKRW = get_USDKRW()
+    chat.reply(_format_kimchi_premium(BTCUSDT, BTCKRW, USDKRW))
+
+def _format_kimchi_premium(BTCUSDT, BTCKRW, USDKRW):
     local_time = datetime.datetime.now()
     eastern = pytz.timezone('US/Eastern')
     eastern_time = local_time.astimezone(eastern)
@@ -180,16 +170,59 @@ def get_kimchi_premium(chat: ChatContext):
     BTCKRW_to_USDT = BTCKRW/USDKRW
     kimchi_premium = (BTCKRW - BTCUSDT_to_KRW) / BTCUSDT_to_KRW * 100
 
-    chat.reply(f'김치 프리미엄\n업빗 : ￦{BTCKRW:,.0f}(${BTCKRW_to_USDT:,.0f})\n바낸 : ￦{BTCUSDT_to_KRW:,.0f}(${BTCUSDT:,.0f})\n김프 : {kimchi_premium:.2f}%\n환율 : ￦{USDKRW:,.0f}\n버거시간(동부) : {EST}')
+    return f'김치 프리미엄\n업빗 : ￦{BTCKRW:,.0f}(${BTCKRW_to_USDT:,.0f})\n바낸 : ￦{BTCUSDT_to_KRW:,.0f}(${BTCUSDT:,.0f})\n김프 : {kimchi_premium:.2f}%\n환율 : ￦{USDKRW:,.0f}\n버거시간(동부) : {EST}'
+
+KIMCHI_RANK_SIZE = 10
+
+def _format_krw(value):
+    return f'{value:,.0f}' if value >= 100 else f'{value:,.4g}'
+
+def _format_usd(value):
+    return f'{value:,.2f}' if value >= 1 else f'{value:.4g}'
+
+def _format_kimchi_ranking(table):
+    if not len(table):
+        return '비교할 수 있는 코인이 없습니다.'
+    ranked = table.ranked()
+    # 종목이 적으면 상위/하위가 겹치지 않게 나눈다
+    top = min(KIMCHI_RANK_SIZE, (len(ranked)+1)//2)
+    bottom = min(KIMCHI_RANK_SIZE, len(ranked)-top)
+    def lines(rows):
+        return [f"{i}. {row['symbol']} {row['premium']:+.2f}% (￦{_format_krw(row['krw'])} / ${_format_usd(row['usdt'])})" for i, row in enumerate(rows, 1)]
+    result = [f'김프 순위 ({len(table)}종목, 환율 ￦{table.usd_krw:,.0f})', '\u200b'*500, '▲ 김프 상위']
+    result += lines(table.rows(ranked[:top]))
+    if bottom:
+        result += ['', '▼ 김프 하위']
+        result += lines(table.rows(ranked[::-1][:bottom]))
+    result += ['', f'평균 : {table.mean:+.2f}%  중앙값 : {table.median:+.2f}%']
+    return '\n'.join(result)
 
 def usd_to_krw(chat: ChatContext):
     usd = float(chat.message.param)
     USDKRW = get_USDKRW()
-    chat.reply(f'${usd:,.2f} = {USDKRW*float(chat.message.msg[4:]):,.2f}원\n환율 : {USDKRW:,.2f}원')
+    chat.reply(_format_usd_to_krw(usd, USDKRW))
+
+def _format_usd_to_krw(usd, USDKRW):
+    return f'${usd:,.2f} = {USDKRW*usd:,.2f}원\n환율 : {USDKRW:,.2f}원'
 
 def get_USDKRW():
-    USDKRW = float(requests.get(currency_url).json()["country"][1]["value"].replace(",",""))
-    return USDKRW
+    return fx.usd_krw()
+
+def get_exchange_rates(chat: ChatContext):
+    chat.reply(_format_exchange_rates(fx.rates()))
+
+def _format_exchange_rates(rates):
+    lines = ['환율']
+    for currency in fx.CURRENCIES:
+        rate = rates.get(currency)
+        if rate is None:
+            continue
+        unit = f'{rate.unit} ' if rate.unit != 1 else ''
+        change = f' ({rate.ratio:+.2f}%)' if rate.ratio is not None else ''
+        lines.append(f'{unit}{currency} : ￦{rate.price:,.2f}{change}')
+    fetched = min(rate.fetched for rate in rates.values())
+    lines.append(f"기준 : {datetime.datetime.fromtimestamp(fetched, pytz.timezone('Asia/Seoul')):%H:%M:%S}")
+    return '\n'.join(lines)
 
 def coin_add(chat: ChatContext):
     msg_split = chat.message.msg.split(" ")
@@ -199,23 +232,15 @@ def coin_add(chat: ChatContext):
     symbol = msg_split[1].upper()
     amount = float(msg_split[2].replace(',',''))
     average = float(msg_split[3].replace(',',''))
-    r = requests.get(base_url + 'KRW-' + symbol)
-    if 'error' in r.text:
+    r = upbit.tickers(['KRW-' + symbol], check=False)
+    if 'error' in r:
         chat.reply('업비트 원화마켓만 지원합니다.\n"!코인등록 코인명(영문심볼) 보유수량 평균단가"로 입력하세요.')
         return None
 
-    kv = PyKV()
-    user_kv = kv.get(f"coin.{str(chat.sender.id)}")
-    if not user_kv:
-        user_kv = {}
-    
-    user_kv[symbol] = {"amount":amount, "average":average}
-    kv.put(f"coin.{str(chat.sender.id)}",user_kv)
-
+    userstate.set_holding(chat.sender.id, symbol, amount, average)
     chat.reply(f'{symbol}코인을 {average}원에 {amount}개 등록하였습니다.')
 
 def coin_remove(chat: ChatContext):
-    kv = PyKV()
     msg_split = chat.message.msg.split(" ")
     if not len(msg_split) == 2:
         chat.reply('"!코인삭제 코인명(영문심볼)"으로 입력하세요.')
@@ -223,13 +248,79 @@ def coin_remove(chat: ChatContext):
     
     symbol = msg_split[1].upper()
     
-    user_kv = kv.get(f"coin.{str(chat.sender.id)}")
-    if not user_kv:
-        user_kv = {}
-    
-    if symbol in user_kv.keys():
-        user_kv.pop(symbol)
-        kv.put(f"coin.{str(chat.sender.id)}", user_kv)
+    if userstate.remove_holding(chat.sender.id, symbol):
         chat.reply(f'{symbol}코인을 삭제하였습니다.')
     else:
-        chat.reply('코인이 없거나 잘못된 명령입니다.\n"!코인삭제 코인명(영문심볼)"으로 입력하세요.')
\ No newline at end of file
+        chat.reply('코인이 없거나 잘못된 명령입니다.\n"!코인삭제 코인명(영문심볼)"으로 입력하세요.')
+
+
+# ---- async 실행 경로 (IRIS_ASYNC=1) ----
+
+async def get_coin_info_async(chat: ChatContext):
+    match chat.message.command:
+        case "!코인":
+            query = _board_query(chat.message.param if chat.message.has_param else '')
+            if query is None:
+                await get_upbit_async(chat)
+            else:
+                await get_upbit_all_async(chat, query)
+        case "!바낸":
+            await get_binance_async(chat)
+        case "!김프":
+            await get_kimchi_premium_async(chat)
+        case "!달러":
+            await usd_to_krw_async(chat)
+        case "!환율":
+            await aio.reply(chat, _format_exchange_rates(await fx.rates_async()))
+        case _:
+            await asyncio.to_thread(get_coin_info, chat)
+
+async def get_upbit_async(chat: ChatContext):
+    matches = await upbit.search_async(chat.message.param)
+    if len(matches) > 1:
+        await aio.reply(chat, _format_candidates(chat.message.param, matches))
+        return None
+    market = matches[0]['market'] if matches else 'KRW-' + chat.message.param.upper()
+    res = await upbit.tickers_async([market], check=False)
+    if 'error' in res:
+        await aio.reply(chat, "검색된 코인이 없습니다.")
+        return None
+    query = market[4:]
+
+    # 처음 조회하는 사용자는 PyKV 를 읽으므로 루프 밖에서 가져온다
+    holding = await asyncio.to_thread(userstate.holding, chat.sender.id, query)
+    await aio.reply(chat, _format_upbit(query, res[0], holding))
+
+async def get_upbit_all_async(chat: ChatContext, query=('전체', None)):
+    await aio.reply(chat, _render_board(await board.board_async(), query))
+
+async def get_USDKRW_async():
+    return await fx.usd_krw_async()
+
+async def get_binance_async(chat: ChatContext):
+    try:
+        query, quote, symbols = binance.pair_symbols(chat.message.param)
+        currency, tickers, btc = await asyncio.gather(
+            get_USDKRW_async(),
+            binance.tickers_async(symbols),
+            upbit.tickers_async(["KRW-BTC"]),
+        )
+        await aio.reply(chat, _format_binance(query, quote, tickers, currency, btc[0]["trade_price"]))
+    except Exception as e:
+        print(e)
+        await aio.reply(chat, BINANCE_HELP)
+
+async def get_kimchi_premium_async(chat: ChatContext):
+    if chat.message.param == '전체':
+        await aio.reply(chat, _format_kimchi_ranking(await kimchi.table_async()))
+        return None
+    btcusdt, btckrw, USDKRW = await asyncio.gather(
+        binance.tickers_async(["BTCUSDT"]),
+        upbit.tickers_async(["KRW-BTC"]),
+        get_USDKRW_async(),
+    )
+    await aio.reply(chat, _format_kimchi_premium(btcusdt["BTCUSDT"]["last_price"], btckrw[0]["trade_price"], USDKRW))
+
+async def usd_to_krw_async(chat: ChatContext):
+    usd = float(chat.message.param)
+    await aio.reply(chat, _format_usd_to_krw(usd, await get_USDKRW_async()))
@@ -1,12 +1,5 @@
-import requests
-import datetime
-import pytz
-from iris import ChatContext, PyKV
-
-all_url = "https://api.upbit.com/v1/market/all"
-base_url = "https://api.upbit.com/v1/ticker?markets="
-currency_url = "https://m.search.naver.com/p/csearch/content/qapirender.nhn?key=calculator&pkid=141&q=%ED%99%98%EC%9C%A8&where=m&u1=keb&u6=standardUnit&u7=0&u3=USD&u4=KRW&u8=down&u2=1"
-binance_url = "https://api.binance.com/api/v3/ticker/"
+from iris import ChatContext
+from helper import binance, fx, upbit, userstate
 
 def favorite_coin_info(chat: ChatContext):
     match chat.message.command:
@@ -27,10 +20,9 @@ def favorite_coin_info(chat: ChatContext):
             favorite_remove(chat)
 
 def get_upbit(chat: ChatContext):
-    kv = PyKV()
     query = chat.message.param.upper()
-    res = requests.get(base_url + 'KRW-' + query)
-    if 'error' in res.text:
+    res = upbit.tickers(['KRW-' + query], check=False)
+    if 'error' in res:
         try:
             result_json, query = get_upbit_korean(query)
         except:
@@ -38,7 +30,7 @@ def get_upbit(chat: ChatContext):
             return None
 
     else:
-        result_json = res.json()[0]
+        result_json = res[0]
     
     price = result_json['trade_price']
     change = result_json['signed_change_rate']*100
@@ -50,24 +42,24 @@ def get_upbit(chat: ChatContext):
     chat.reply(result)
 
 def get_my_coins(chat: ChatContext):
-    kv = PyKV()
-    my_coins = kv.get(f"coin.{str(chat.sender.id)}")
+    my_coins = userstate.favorites(chat.sender.id)
     if not my_coins:
         chat.reply("등록된 코인이 없습니다. !즐찾등록 기능으로 코인을 등록하세요.")
         return None
 
+    # 없는 마켓이 하나라도 섞이면 업비트가 요청 전체를 거절하니 상장된 것만 묻는다
+    listed = set(upbit.krw_markets(upbit.catalog()))
     my_coins_list = []
-    for key in my_coins.keys():
-        my_coins_list.append("KRW-" + key)
-    
-    coins_query = ",".join(my_coins_list)
+    for key in my_coins:
+        if "KRW-" + key in listed:
+            my_coins_list.append("KRW-" + key)
     
-    res = requests.get(base_url + coins_query)
+    res = upbit.tickers(my_coins_list) if my_coins_list else []
     
     result_list = []
     coins = {}
     
-    for coin in res.json():
+    for coin in res:
         coins[coin['market'][4:]] = {'price' : coin['trade_price'], 'change' : coin['signed_change_rate']*100}
     
     for key in coins.keys():
@@ -78,19 +70,15 @@ def get_my_coins(chat: ChatContext):
     chat.reply(result)
     
 def get_upbit_all(chat: ChatContext):
-    res = requests.get(all_url)
-    krw_coins = []
-    for market in res.json():
-        if 'KRW' in market['market']:
-            krw_coins.append(market['market'])
+    krw_coins = upbit.krw_markets(upbit.catalog())
 
-    res = requests.get(base_url + ','.join(krw_coins))
+    res = upbit.tickers(krw_coins)
     
     result_list = []
     coins = {}
     result_list.append('업비트 원화시세\n' + '\u200b'*500)
 
-    for coin in res.json():
+    for coin in res:
         coins[coin['market'][4:]] = {'price' : coin['trade_price'], 'change' : coin['signed_change_rate']*100}
     coin_list = sorted(coins.items(),key = lambda x: x[1]['change'],reverse=True)
     
@@ -102,39 +90,23 @@ def get_upbit_all(chat: ChatContext):
     chat.reply(result)
 
 def get_upbit_korean(query):
-    res_eng_query = requests.get(all_url)
-    for market in res_eng_query.json():
-        if 'KRW' in market['market'] and query in market['korean_name']:
-            eng_query = market['market']
-            if query == market['korean_name']:
-                break
+    eng_query = upbit.search(query)[0]['market']
 
-    res = requests.get(base_url + eng_query)
-    return (res.json()[0],eng_query[4:])
+    res = upbit.tickers([eng_query])
+    return (res[0],eng_query[4:])
 
 
 def get_binance(chat: ChatContext):
     try:
-        query = chat.message.param.upper()
-        query_split = query.split("/")
-        query = "".join(query_split)
+        query, quote, symbols = binance.pair_symbols(chat.message.param)
         currency = get_USDKRW()
-        r = requests.get(binance_url+'24hr').json()
-        is_USDT = query_split[1] in ["USDT", "BUSD", "USDC"]
-        for coin in r:
-            if coin['symbol'] == 'BTCUSDT':
-                BTCUSDT = float(coin['lastPrice'])
-                if query == 'BTCUSDT':
-                    price = BTCUSDT
-                    change = float(coin['priceChangePercent'])
-            elif coin['symbol'] == query:
-                price = float(coin['lastPrice'])
-                change = float(coin['priceChangePercent'])
-            elif coin['symbol'] == query_split[1]+'USDT':
-                to_USDT = float(coin['lastPrice'])
-        if not is_USDT:
-            price = price*to_USDT
-        BTCKRW = requests.get(base_url + "KRW-BTC").json()[0]["trade_price"]
+        tickers = binance.tickers(symbols)
+        price = tickers[query]['last_price']
+        change = tickers[query]['change_percent']
+        BTCUSDT = tickers['BTCUSDT']['last_price']
+        if quote not in binance.USD_QUOTES:
+            price = price*tickers[quote+'USDT']['last_price']
+        BTCKRW = upbit.tickers(["KRW-BTC"])[0]["trade_price"]
         query_KRW = price*currency
         query_KRW_kimp = (BTCKRW/(BTCUSDT*currency))*query_KRW
         res = f'{query}\nUSD : ${price:,f}\nKRW : ￦{query_KRW:,.2f}\nKRW(김프) : ￦{query_KRW_kimp:,.2f}\n등락률 : {change:+.2f}%\n환율 : ￦{currency:,.0f}'
@@ -149,8 +121,7 @@ def usd_to_krw(chat: ChatContext):
     chat.reply(f'${usd:,.2f} = {USDKRW*float(chat.message.msg[4:]):,.2f}원\n환율 : {USDKRW:,.2f}원')
 
 def get_USDKRW():
-    USDKRW = float(requests.get(currency_url).json()["country"][1]["value"].replace(",",""))
-    return USDKRW
+    return fx.usd_krw()
 
 def favorite_add(chat: ChatContext):
     msg_split = chat.message.msg.split(" ")
@@ -161,29 +132,18 @@ def favorite_add(chat: ChatContext):
     symbol = msg_split[1].upper()
 
     # 업비트 원화 마켓에 존재하는지 확인
-    r = requests.get(base_url + 'KRW-' + symbol)
-    if 'error' in r.text:
+    r = upbit.tickers(['KRW-' + symbol], check=False)
+    if 'error' in r:
         chat.reply('업비트 원화마켓만 지원합니다.\n"!즐찾등록 코인명(영문심볼)"로 입력하세요.')
         return None
 
-    # 사용자별 코인 목록 가져오기
-    kv = PyKV()
-    user_key = f"coin.{str(chat.sender.id)}"
-    user_kv = kv.get(user_key)
-    if not user_kv:
-        user_kv = {}
-
-    # 심볼 등록 (중복 방지 가능)
-    user_kv[symbol] = True
-
-    # 저장
-    kv.put(user_key, user_kv)
+    # 이미 등록된 심볼이면 그대로 둔다
+    userstate.add_favorite(chat.sender.id, symbol)
 
     chat.reply(f"{symbol} 코인을 등록했습니다.")
 
 
 def favorite_remove(chat: ChatContext):
-    kv = PyKV()
     msg_split = chat.message.msg.split(" ")
     if not len(msg_split) == 2:
         chat.reply('"!코인삭제 코인명(영문심볼)"으로 입력하세요.')
@@ -191,13 +151,7 @@ def favorite_remove(chat: ChatContext):
     
     symbol = msg_split[1].upper()
     
-    user_kv = kv.get(f"coin.{str(chat.sender.id)}")
-    if not user_kv:
-        user_kv = {}
-    
-    if symbol in user_kv.keys():
-        user_kv.pop(symbol)
-        kv.put(f"coin.{str(chat.sender.id)}", user_kv)
+    if userstate.remove_favorite(chat.sender.id, symbol):
         chat.reply(f'{symbol}코인을 삭제하였습니다.')
     else:
         chat.reply('코인이 없거나 잘못된 명령입니다.\n"!즐찾삭제 코인명(영문심볼)"으로 입력하세요.')
\ No newline at end of file
@@ -7,6 +7,8 @@ from iris.decorators import *
 from iris import ChatContext
 import os, io
 import time
+import asyncio
+from helper import aio, metrics
 
 pro_key = os.getenv("GEMINI_KEY")
 
@@ -70,22 +72,28 @@ def get_gemini_image(chat : ChatContext):
         )
 
         res = ""
+        image = None
 
-        for chunk in client.models.generate_content_stream(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        ):
-            if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
-                continue
-            if chunk.candidates[0].content.parts[0].inline_data:
-                chat.reply_media(
-                    chunk.candidates[0].content.parts[0].inline_data.data
-                )
-                return ""
-
-            elif chunk.candidates[0].content.parts[0].text:
-                res = res + chunk.candidates[0].content.parts[0].text
+        with metrics.upstream("gemini"):
+            for chunk in client.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=generate_content_config,
+            ):
+                if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
+                    continue
+                if chunk.candidates[0].content.parts[0].inline_data:
+                    image = chunk.candidates[0].content.parts[0].inline_data.data
+                    break
+
+                elif chunk.candidates[0].content.parts[0].text:
+                    res = res + chunk.candidates[0].content.parts[0].text
+
+        if image is not None:
+            chat.reply_media(
+                image
+            )
+            return ""
 
         if res.strip() != "":
             chat.reply(
@@ -128,23 +136,29 @@ def get_gemini_image_to_image(chat : ChatContext):
         )
 
         res = ""
+        image = None
+
+        with metrics.upstream("gemini"):
+            for chunk in client.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=generate_content_config,
+            ):
+                if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
+                    continue
 
-        for chunk in client.models.generate_content_stream(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        ):
-            if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
-                continue
+                if chunk.candidates[0].content.parts[0].inline_data:
+                    image = chunk.candidates[0].content.parts[0].inline_data.data
+                    break
 
-            if chunk.candidates[0].content.parts[0].inline_data:
-                chat.reply_media(
-                    chunk.candidates[0].content.parts[0].inline_data.data
-                )
-                return ""
+                elif chunk.candidates[0].content.parts[0].text:
+                    res = res + chunk.candidates[0].content.parts[0].text
 
-            elif chunk.candidates[0].content.parts[0].text:
-                res = res + chunk.candidates[0].content.parts[0].text
+        if image is not None:
+            chat.reply_media(
+                image
+            )
+            return ""
 
         if res.strip() != "":
             chat.reply(
@@ -174,19 +188,79 @@ def get_gemini_vision_analyze_image_reply(chat: ChatContext):
 
 def get_gemini_vision_analyze_image(img):
     client = genai.Client(api_key=pro_key)
-    res = client.models.generate_content(
-        model="gemini-2.5-flash-image-preview",
-        config=types.GenerateContentConfig(
-            system_instruction="analyze the given image, and rate violence, sexuality score out of 100 in below format. If the image given is text-only image, scores must be N/A. If sexuality score is over 50, 성인물 will be True. Do not add any other comments or markdown\n폭력성 : score/100\n선정성 : score/100\n성인물 : True/False",
-            tools=[types.Tool(
-                google_search=types.GoogleSearchRetrieval(
-                    dynamic_retrieval_config=types.DynamicRetrievalConfig(
-                        dynamic_threshold=0.6))
-            )],),
-        contents=[img]
-        )
+    with metrics.upstream("gemini"):
+        res = client.models.generate_content(
+            model="gemini-2.5-flash-image-preview",
+            config=types.GenerateContentConfig(
+                system_instruction="analyze the given image, and rate violence, sexuality score out of 100 in below format. If the image given is text-only image, scores must be N/A. If sexuality score is over 50, 성인물 will be True. Do not add any other comments or markdown\n폭력성 : score/100\n선정성 : score/100\n성인물 : True/False",
+                tools=[types.Tool(
+                    google_search=types.GoogleSearchRetrieval(
+                        dynamic_retrieval_config=types.DynamicRetrievalConfig(
+                            dynamic_threshold=0.6))
+                )],),
+            contents=[img]
+            )
     try:
         result = res.text.strip()
     except:
         result = "Gemini 서버에서 오류가 발생했거나 분당 한도가 초과하였습니다. 잠시 후 다시 시도해주세요."
     return result
+
+
+# ---- async 실행 경로 (IRIS_ASYNC=1) ----
+
+async def get_gemini_async(chat: ChatContext):
+    # 이미지 생성만 google-genai 의 aio 클라이언트로 처리하고, 답장 원본이 필요한 나머지는 스레드로 넘긴다
+    if chat.message.command == "!gi":
+        return await get_gemini_image_async(chat)
+    return await asyncio.to_thread(get_gemini, chat)
+
+async def get_gemini_image_async(chat: ChatContext):
+    if not chat.message.has_param:
+        return None
+    failure = (
+        f"오류가 발생하였거나, Gemini가 이미지 생성을 거부하였습니다.\n"
+        f"Q: {chat.message.msg[4:]}"
+    )
+    try:
+        client = genai.Client(api_key=pro_key)
+        contents = [
+            types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=chat.message.param)],
+            ),
+        ]
+        generate_content_config = types.GenerateContentConfig(
+            response_modalities=[
+                "image",
+                "text",
+            ],
+            safety_settings=safety_settings
+        )
+
+        res = ""
+        image = None
+
+        with metrics.upstream("gemini"):
+            async for chunk in await client.aio.models.generate_content_stream(
+                model="gemini-2.5-flash-image-preview",
+                contents=contents,
+                config=generate_content_config,
+            ):
+                if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
+                    continue
+                if chunk.candidates[0].content.parts[0].inline_data:
+                    image = chunk.candidates[0].content.parts[0].inline_data.data
+                    break
+
+                elif chunk.candidates[0].content.parts[0].text:
+                    res = res + chunk.candidates[0].content.parts[0].text
+
+        if image is not None:
+            await aio.reply_media(chat, image)
+        elif res.strip() != "":
+            await aio.reply(chat, res.strip())
+        else:
+            await aio.reply(chat, failure)
+    except:
+        await aio.reply(chat, failure)
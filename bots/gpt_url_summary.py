@@ -11,6 +11,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from urllib.parse import urlparse, parse_qs, unquote
 from openai import OpenAI
+from helper import metrics
 
 # OpenAI 클라이언트 (환경변수 OPENAI_API_KEY 필요)
 client = OpenAI()
@@ -301,11 +302,12 @@ def summarize_text(article: dict) -> str:
 \"\"\"{body}\"\"\"
 """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_completion_tokens=300
-        )
+        with metrics.upstream("openai"):
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_completion_tokens=300
+            )
         return response.choices[0].message.content.strip()
     except Exception as e:
         print(f"❌ GPT 요약 실패: {e}")
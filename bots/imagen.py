@@ -4,20 +4,43 @@ from gemini_webapi import GeminiClient
 import time
 from iris.decorators import *
 import os
+from helper import aio, metrics
 
 Secure_1PSID = os.getenv("SECURE_1PSID")
 Secure_1PSIDTS = os.getenv("SECURE_1PSIDTS")
 
 @has_param
 def get_imagen(chat: ChatContext):
-    images = asyncio.run(get_client(chat.message.param))
+    with metrics.upstream("gemini_web"):
+        images = aio.run(get_client(chat.message.param))
     chat.reply_media(
         images
     )
 
+_client = None
+_client_lock = None
+
+async def _shared_client() -> GeminiClient:
+    # 요청마다 새 이벤트 루프와 클라이언트를 만들던 것을 공유 루프 위의 클라이언트 하나로 바꾼다
+    global _client, _client_lock
+    if _client_lock is None:
+        _client_lock = asyncio.Lock()
+    async with _client_lock:
+        if _client is None:
+            client = GeminiClient(Secure_1PSID, Secure_1PSIDTS, proxy=None)
+            await client.init(timeout=30, auto_close=False, close_delay=300, auto_refresh=False, verbose=True)
+            _client = client
+    return _client
+
+async def get_imagen_async(chat: ChatContext):
+    if not chat.message.has_param:
+        return None
+    with metrics.upstream("gemini_web"):
+        images = await get_client(chat.message.param)
+    await aio.reply_media(chat, images)
+
 async def get_client(msg: str):
-    client = GeminiClient(Secure_1PSID, Secure_1PSIDTS, proxy=None)
-    await client.init(timeout=30, auto_close=False, close_delay=300, auto_refresh=False, verbose=True)
+    client = await _shared_client()
     response = await client.generate_content(msg)
     filenames = []
     for i, image in enumerate(response.images):
@@ -1,8 +1,8 @@
+import asyncio
 import io
 from pathlib import Path
 from typing import Optional, Sequence
 
-import requests
 from PIL import Image, ImageDraw, ImageFont
 
 try:
@@ -11,6 +11,8 @@ try:
 except ModuleNotFoundError:  # pragma: no cover
     ChatContext = None  # type: ignore[misc,assignment]
 
+from helper import aio, cache, metrics
+
 
 INDEX_CODES: Sequence[str] = ("KOSPI", "KOSDAQ")
 INDEX_LABELS = {
@@ -58,15 +60,16 @@ def _text_width(font: ImageFont.ImageFont, text: str) -> int:
 
 
 def _fetch_chart_image(index_code: str) -> Image.Image:
-    response = requests.get(CHART_URL.format(code=index_code), timeout=5)
-    response.raise_for_status()
-    return Image.open(io.BytesIO(response.content)).convert("RGB")
+    chart_bytes = cache.get_content(CHART_URL.format(code=index_code), "chart_image", timeout=5)
+    return Image.open(io.BytesIO(chart_bytes)).convert("RGB")
 
 
 def _fetch_realtime_data(index_code: str) -> dict:
-    response = requests.get(REALTIME_URL.format(code=index_code), timeout=5)
-    response.raise_for_status()
-    payload = response.json()
+    payload = cache.get_json(REALTIME_URL.format(code=index_code), "index_quote", timeout=5)
+    return _parse_realtime_data(index_code, payload)
+
+
+def _parse_realtime_data(index_code: str, payload: dict) -> dict:
     areas = payload.get("result", {}).get("areas", [])
     datas = areas[0].get("datas") if areas else None
     if not datas:
@@ -193,7 +196,10 @@ def _create_combined_image(index_codes: Sequence[str] = INDEX_CODES) -> Image.Im
         chart_image = _fetch_chart_image(code)
         stock_data = _fetch_realtime_data(code)
         panels.append(_create_index_panel(code, chart_image, stock_data))
+    return _combine_panels(panels)
+
 
+def _combine_panels(panels: Sequence[Image.Image]) -> Image.Image:
     width = max(panel.width for panel in panels)
     height = sum(panel.height for panel in panels)
 
@@ -217,10 +223,21 @@ def _normalize_indices(indices: Sequence[str]) -> list[str]:
     return normalized
 
 
-def kospidaq(chat: Optional[ChatContext], *indices: str):
+def _select_indices(indices: Sequence[str]) -> list[str]:
     selected_indices = _normalize_indices(indices) if indices else list(INDEX_CODES)
-    if not selected_indices:
-        selected_indices = list(INDEX_CODES)
+    return selected_indices or list(INDEX_CODES)
+
+
+def _encode_png(image: Image.Image) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with metrics.timer("render", stage="png_encode", command="kospidaq"):
+        image.save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def kospidaq(chat: Optional[ChatContext], *indices: str):
+    selected_indices = _select_indices(indices)
     try:
         combined_image = _create_combined_image(selected_indices)
     except Exception as exc:
@@ -230,10 +247,37 @@ def kospidaq(chat: Optional[ChatContext], *indices: str):
     if ChatContext is None or chat is None:
         return combined_image
 
-    buffer = io.BytesIO()
-    combined_image.save(buffer, format="PNG")
-    buffer.seek(0)
-    return chat.reply_media([buffer])
+    return chat.reply_media([_encode_png(combined_image)])
+
+
+# ---- async 실행 경로 (IRIS_ASYNC=1) ----
+
+async def _fetch_index_async(index_code: str):
+    chart_bytes, payload = await asyncio.gather(
+        cache.get_content_async(CHART_URL.format(code=index_code), "chart_image"),
+        cache.get_json_async(REALTIME_URL.format(code=index_code), "index_quote"),
+    )
+    return chart_bytes, _parse_realtime_data(index_code, payload)
+
+
+def _render_indices(index_codes: Sequence[str], fetched: Sequence[tuple]) -> io.BytesIO:
+    panels = []
+    for code, (chart_bytes, stock_data) in zip(index_codes, fetched):
+        chart_image = Image.open(io.BytesIO(chart_bytes)).convert("RGB")
+        panels.append(_create_index_panel(code, chart_image, stock_data))
+    return _encode_png(_combine_panels(panels))
+
+
+async def kospidaq_async(chat: ChatContext, *indices: str):
+    selected_indices = _select_indices(indices)
+    try:
+        # 지수별 차트/시세 요청을 한 번에 보내고, 이미지 합성은 루프 밖에서 처리한다
+        fetched = await asyncio.gather(*(_fetch_index_async(code) for code in selected_indices))
+        buffer = await asyncio.to_thread(_render_indices, selected_indices, fetched)
+    except Exception as exc:
+        print(f"Failed to create KOSPI/KOSDAQ image: {exc}")
+        return None
+    await aio.reply_media(chat, [buffer])
 
 
 if __name__ == "__main__":
@@ -1,38 +1,68 @@
-import requests
 import urllib.parse
 from iris import ChatContext
+from helper import aio, http
+
+SEARCH_LYRIC_URL = "https://apis.naver.com/vibeWeb/musicapiweb/v4/search/lyric?query={query}&start=1&display=10&sort=RELEVANCE"
+SEARCH_ALL_URL = "https://apis.naver.com/vibeWeb/musicapiweb/v4/searchall?query={query}&sort=RELEVANCE&vidDisplay=25&trDisplay=9&alDisplay=21&arDisplay=21"
+LYRIC_URL = "https://apis.naver.com/vibeWeb/musicapiweb/vibe/v4/lyric/{track_id}"
+JSON_HEADERS = {'Accept': 'application/json'}
 
 def find_lyrics(chat: ChatContext):
     try:
         query = urllib.parse.quote_plus(chat.message.msg[6:])
-        url = f"https://apis.naver.com/vibeWeb/musicapiweb/v4/search/lyric?query={query}&start=1&display=10&sort=RELEVANCE"
-        r = requests.get(
-                url,
-                headers={'Accept': 'application/json'}
+        r = http.get(
+                SEARCH_LYRIC_URL.format(query=query),
+                headers=JSON_HEADERS
                 ).json()
-        songs = r["response"]["result"]["tracks"][0:5]
-        res = [f'{i+1}. {s["artists"][0]["artistName"]} - {s["trackTitle"]}' for i,s in enumerate(songs)]
-        chat.reply("\n".join(res))
+        chat.reply(_format_songs(r))
     except:
         chat.reply("검색된 노래가 없습니다.")
 
 def get_lyrics(chat: ChatContext):
     try:
         query = urllib.parse.quote_plus(chat.message.msg[6:])
-        url = f"https://apis.naver.com/vibeWeb/musicapiweb/v4/searchall?query={query}&sort=RELEVANCE&vidDisplay=25&trDisplay=9&alDisplay=21&arDisplay=21"
-        r = requests.get(
-                url,
-                headers={'Accept': 'application/json'}
+        r = http.get(
+                SEARCH_ALL_URL.format(query=query),
+                headers=JSON_HEADERS
                 ).json()
         track = r["response"]["result"]["trackResult"]["tracks"][0]
-        res = f'{track["artists"][0]["artistName"]} - {track["trackTitle"]}\n' + "\u200b"*500 + "\n"
-        track_url = f'https://apis.naver.com/vibeWeb/musicapiweb/vibe/v4/lyric/{track["trackId"]}'
-        r2 = requests.get(
-                track_url,
-                headers={'Accept': 'application/json'}
+        r2 = http.get(
+                LYRIC_URL.format(track_id=track["trackId"]),
+                headers=JSON_HEADERS
                 ).json()
-        res += r2["response"]["result"]["lyric"]["normalLyric"]["text"]
-        chat.reply(res)
+        chat.reply(_format_lyrics(track, r2))
     except Exception as e:
         chat.reply("검색된 노래가 없습니다.")
-        print(e)
\ No newline at end of file
+        print(e)
+
+
+def _format_songs(r):
+    songs = r["response"]["result"]["tracks"][0:5]
+    return "\n".join(f'{i+1}. {s["artists"][0]["artistName"]} - {s["trackTitle"]}' for i,s in enumerate(songs))
+
+def _format_lyrics(track, r2):
+    res = f'{track["artists"][0]["artistName"]} - {track["trackTitle"]}\n' + "\u200b"*500 + "\n"
+    return res + r2["response"]["result"]["lyric"]["normalLyric"]["text"]
+
+# ---- async 실행 경로 (IRIS_ASYNC=1) ----
+
+async def find_lyrics_async(chat: ChatContext):
+    try:
+        query = urllib.parse.quote_plus(chat.message.msg[6:])
+        r = await aio.get_json(SEARCH_LYRIC_URL.format(query=query), headers=JSON_HEADERS)
+        message = _format_songs(r)
+    except:
+        message = "검색된 노래가 없습니다."
+    await aio.reply(chat, message)
+
+async def get_lyrics_async(chat: ChatContext):
+    try:
+        query = urllib.parse.quote_plus(chat.message.msg[6:])
+        r = await aio.get_json(SEARCH_ALL_URL.format(query=query), headers=JSON_HEADERS)
+        track = r["response"]["result"]["trackResult"]["tracks"][0]
+        r2 = await aio.get_json(LYRIC_URL.format(track_id=track["trackId"]), headers=JSON_HEADERS)
+        message = _format_lyrics(track, r2)
+    except Exception as e:
+        print(e)
+        message = "검색된 노래가 없습니다."
+    await aio.reply(chat, message)
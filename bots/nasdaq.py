@@ -1,8 +1,8 @@
+import asyncio
 import io
 from pathlib import Path
 from typing import Optional, Sequence, List, Dict
 
-import requests
 from PIL import Image, ImageDraw, ImageFont
 
 try:
@@ -11,6 +11,8 @@ try:
 except ModuleNotFoundError:  # pragma: no cover
     ChatContext = None  # type: ignore[misc,assignment]
 
+from helper import aio, cache, fx, metrics
+
 
 CHART_URL = "https://ssl.pstatic.net/imgfinance/chart/mobile/world/mini/.IXIC_naverpc_l.png"
 INFO_URL = "https://api.nasdaq.com/api/quote/COMP/info?assetclass=index"
@@ -69,15 +71,15 @@ def _text_width(font: ImageFont.ImageFont, text: str) -> int:
 
 
 def _fetch_chart_image() -> Image.Image:
-    response = requests.get(CHART_URL, timeout=5)
-    response.raise_for_status()
-    return Image.open(io.BytesIO(response.content)).convert("RGB")
+    chart_bytes = cache.get_content(CHART_URL, "chart_image", timeout=5)
+    return Image.open(io.BytesIO(chart_bytes)).convert("RGB")
 
 
 def _fetch_json(url: str) -> dict:
-    response = requests.get(url, headers=REQUEST_HEADERS, timeout=5)
-    response.raise_for_status()
-    payload = response.json()
+    return _unwrap(url, cache.get_json(url, "nasdaq_quote", headers=REQUEST_HEADERS, timeout=5))
+
+
+def _unwrap(url: str, payload: dict) -> dict:
     status = payload.get("status", {})
     if status.get("rCode") not in (None, 200):
         raise ValueError(f"Unexpected response code from {url}: {status}")
@@ -100,9 +102,10 @@ def _determine_color(indicator: str) -> tuple[int, int, int]:
 
 
 def _fetch_market_data() -> dict:
-    info = _fetch_json(INFO_URL)
-    summary = _fetch_json(SUMMARY_URL)
-    chart_payload = _fetch_json(CHART_DATA_URL)
+    return _parse_market_data(_fetch_json(INFO_URL), _fetch_json(SUMMARY_URL), _fetch_json(CHART_DATA_URL))
+
+
+def _parse_market_data(info: dict, summary: dict, chart_payload: dict) -> dict:
     chart_points: Sequence[dict] = chart_payload.get("chart", [])
 
     if not info:
@@ -152,31 +155,22 @@ def _format_price(value: float) -> str:
 
 
 def _fetch_usdkrw_chart() -> Image.Image:
-    response = requests.get(FX_CHART_URL, timeout=5)
-    response.raise_for_status()
-    return Image.open(io.BytesIO(response.content)).convert("RGB")
+    chart_bytes = cache.get_content(FX_CHART_URL, "chart_image", timeout=5)
+    return Image.open(io.BytesIO(chart_bytes)).convert("RGB")
 
 
 def _fetch_usdkrw_data() -> Dict[str, float]:
-    url = "https://api.stock.naver.com/marketindex/exchange?code=FX_USDKRW"
-    response = requests.get(url, timeout=5)
-    response.raise_for_status()
-    payload = response.json()
-
-    candidates: List[dict] = payload.get("normalList") or []
-    for item in candidates:
-        if item.get("exchangeCode") == "USD":
-            price = _parse_float(item.get("closePrice", "0"))
-            change = _parse_float(item.get("fluctuations", "0"))
-            ratio = _parse_float(item.get("fluctuationsRatio", "0"))
-            indicator = (item.get("fluctuationsType") or {}).get("code", "")
-            return {
-                "price": price,
-                "change": change,
-                "ratio": ratio,
-                "indicator": indicator,
-            }
-    raise ValueError("USD/KRW data not found in response")
+    return _usdkrw_data(fx.rate("USD"))
+
+
+def _usdkrw_data(rate: fx.Rate) -> Dict[str, float]:
+    # 보조 소스는 등락 정보가 없다
+    return {
+        "price": rate.price,
+        "change": rate.change or 0.0,
+        "ratio": rate.ratio or 0.0,
+        "indicator": rate.indicator,
+    }
 
 
 def _create_panel(chart_image: Image.Image, market: dict) -> Image.Image:
@@ -319,12 +313,15 @@ def _create_nasdaq_image() -> Image.Image:
     panels: List[Image.Image] = [_create_panel(chart_image, market_data)]
 
     try:
-        fx = _fetch_usdkrw_data()
+        fx_data = _fetch_usdkrw_data()
         fx_chart = _fetch_usdkrw_chart()
-        panels.append(_create_fx_panel(fx_chart, fx))
+        panels.append(_create_fx_panel(fx_chart, fx_data))
     except Exception as exc:
         print(f"Failed to append USD/KRW panel: {exc}")
+    return _combine_panels(panels)
+
 
+def _combine_panels(panels: Sequence[Image.Image]) -> Image.Image:
     width = max(panel.width for panel in panels)
     expanded = [_expand_panel(panel, width) for panel in panels]
     height = sum(panel.height for panel in expanded)
@@ -347,10 +344,62 @@ def nasdaq(chat: Optional[ChatContext] = None):
     if ChatContext is None or chat is None:
         return image
 
+    return chat.reply_media([_encode_png(image)])
+
+
+def _encode_png(image: Image.Image) -> io.BytesIO:
     buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
+    with metrics.timer("render", stage="png_encode", command="nasdaq"):
+        image.save(buffer, format="PNG")
     buffer.seek(0)
-    return chat.reply_media([buffer])
+    return buffer
+
+
+# ---- async 실행 경로 (IRIS_ASYNC=1) ----
+
+async def _fetch_nasdaq_json_async(url: str) -> dict:
+    return _unwrap(url, await cache.get_json_async(url, "nasdaq_quote", headers=REQUEST_HEADERS))
+
+
+async def _fetch_fx_async():
+    try:
+        return await asyncio.gather(
+            fx.rate_async("USD"),
+            cache.get_content_async(FX_CHART_URL, "chart_image"),
+        )
+    except Exception as exc:
+        print(f"Failed to append USD/KRW panel: {exc}")
+        return None
+
+
+def _render_nasdaq(chart_bytes: bytes, market_payloads: Sequence[dict], fx_payloads) -> io.BytesIO:
+    chart_image = Image.open(io.BytesIO(chart_bytes)).convert("RGB")
+    panels: List[Image.Image] = [_create_panel(chart_image, _parse_market_data(*market_payloads))]
+    if fx_payloads is not None:
+        try:
+            fx_rate, fx_chart_bytes = fx_payloads
+            fx_chart = Image.open(io.BytesIO(fx_chart_bytes)).convert("RGB")
+            panels.append(_create_fx_panel(fx_chart, _usdkrw_data(fx_rate)))
+        except Exception as exc:
+            print(f"Failed to append USD/KRW panel: {exc}")
+    return _encode_png(_combine_panels(panels))
+
+
+async def nasdaq_async(chat: ChatContext):
+    try:
+        # 나스닥 세 개 API, 차트 이미지, 환율 패널 데이터를 모두 동시에 요청한다
+        chart_bytes, info, summary, chart_payload, fx_payloads = await asyncio.gather(
+            cache.get_content_async(CHART_URL, "chart_image"),
+            _fetch_nasdaq_json_async(INFO_URL),
+            _fetch_nasdaq_json_async(SUMMARY_URL),
+            _fetch_nasdaq_json_async(CHART_DATA_URL),
+            _fetch_fx_async(),
+        )
+        buffer = await asyncio.to_thread(_render_nasdaq, chart_bytes, (info, summary, chart_payload), fx_payloads)
+    except Exception as exc:
+        print(f"Failed to create NASDAQ image: {exc}")
+        return None
+    await aio.reply_media(chat, [buffer])
 
 
 if __name__ == "__main__":
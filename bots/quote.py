@@ -0,0 +1,50 @@
+from iris import ChatContext
+from helper import aio, quotes
+
+SOURCE_NAMES = {quotes.UPBIT: '업비트', quotes.BITHUMB: '빗썸', quotes.BINANCE: '바이낸스'}
+USAGE = '"!시세 코인"으로 입력하세요. 업비트, 빗썸, 바이낸스 시세를 한 번에 비교합니다.\n예시 : !시세 WLD, !시세 월드코인'
+
+def format_krw(price: float) -> str:
+    return f'{int(price):,}' if price % 1 == 0 or price >= 100 else f'{price:,.4f}'.rstrip('0').rstrip('.')
+
+def format_quote(quote: quotes.Quote) -> str:
+    name = SOURCE_NAMES[quote.source]
+    if quote.source == quotes.BINANCE:
+        return f'{name} : ${quote.price:,.8f}'.rstrip('0').rstrip('.') + f' ≈ {format_krw(quote.krw)}원 ({quote.change:+.2f}%)'
+    return f'{name} : {format_krw(quote.price)}원 ({quote.change:+.2f}%)'
+
+def format_quotes(symbol: str, found) -> str:
+    lines = [f'{symbol} 거래소별 시세']
+    answered = [quote for quote in found if quote.status == quotes.OK]
+    lines += [format_quote(quote) for quote in answered]
+    if len(answered) >= 2:
+        high = max(answered, key=lambda quote: quote.krw)
+        low = min(answered, key=lambda quote: quote.krw)
+        lines.append(f'최대 차이 : {(high.krw / low.krw - 1) * 100:.2f}% ({SOURCE_NAMES[high.source]} > {SOURCE_NAMES[low.source]})')
+    for status, label in ((quotes.TIMEOUT, '⏱ 시간 초과'), (quotes.ERROR, '⚠ 오류'), (quotes.MISSING, '미상장')):
+        sources = [SOURCE_NAMES[quote.source] for quote in found if quote.status == status]
+        if sources:
+            lines.append(f'{label} : ' + ', '.join(sources))
+    return '\n'.join(lines)
+
+async def _compare(param: str) -> str:
+    symbol = await quotes.resolve_async(param)
+    if symbol is None:
+        return '코인을 하나로 정할 수 없습니다. 심볼로 입력해주세요.\n' + USAGE
+    found = await quotes.compare_async(symbol)
+    if not any(quote.status == quotes.OK for quote in found) and all(quote.status == quotes.MISSING for quote in found):
+        return f'{symbol} : 세 거래소 모두 원화/USDT 마켓이 없습니다.'
+    return format_quotes(symbol, found)
+
+def quote(chat: ChatContext):
+    if not chat.message.has_param:
+        chat.reply(USAGE)
+        return None
+    # 세 거래소 요청을 공유 이벤트 루프에서 동시에 보낸다
+    chat.reply(aio.run(_compare(chat.message.param)))
+
+async def quote_async(chat: ChatContext):
+    if not chat.message.has_param:
+        await aio.reply(chat, USAGE)
+        return None
+    await aio.reply(chat, await _compare(chat.message.param))
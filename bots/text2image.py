@@ -1,11 +1,12 @@
 # coding: utf8
 import random
 from PIL import Image, ImageFont, ImageDraw
-import requests, random, os
+import random, os
 from io import BytesIO, BufferedReader
 from bots.gemini import get_gemini_vision_analyze_image
 from iris.decorators import *
 from iris import ChatContext, PyKV
+from helper import http
 
 RES_PATH = "res/"
 disallowed_substrings = ["medium.com", "post.phinf.naver.net", ".gif", "imagedelivery.net", "clien.net"]
@@ -167,12 +168,12 @@ def add_default_text(chat, img, txt):
     
 def get_image_from_url(url):
     try:
-        response = requests.get(url)
+        response = http.get(url)
     except:
         if url[-3:] == 'jpg':
-            response = requests.get(url[:-3]+'png')
+            response = http.get(url[:-3]+'png')
         elif url[-3:] == 'png':
-            response = requests.get(url[:-3]+'jpg')
+            response = http.get(url[:-3]+'jpg')
     img = Image.open(BytesIO(response.content))
     img = img.convert("RGBA")
     return img
@@ -188,7 +189,7 @@ def get_image_url_from_naver(query):
         'display':'20'
         }
 
-    res = requests.get(url,params=params, headers=headers)
+    res = http.get(url,params=params, headers=headers)
     js = res.json()['items']
     link = []
     if not len(js) == 0:
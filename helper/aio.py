@@ -0,0 +1,113 @@
+"""Single long-lived asyncio loop and shared aiohttp session for the async execution mode.
+
+``irispy.py`` routes commands here when ``IRIS_ASYNC=1``. The loop runs in one daemon thread; sync code hands it
+coroutines with ``submit``/``run`` and async handlers fetch through ``get_json``/``get_bytes``.
+"""
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Optional
+
+from helper import budget, http, metrics
+from helper.singleflight import Group
+
+# seconds; connect matches helper.http.DEFAULT_TIMEOUT
+CONNECT_TIMEOUT = http.DEFAULT_TIMEOUT[0]
+TOTAL_TIMEOUT = 10
+CONNECTION_LIMIT = 100
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_session = None
+_inflight = Group("aio")
+
+
+def loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                new_loop = asyncio.new_event_loop()
+                threading.Thread(target=new_loop.run_forever, name="aio-loop", daemon=True).start()
+                _loop = new_loop
+    return _loop
+
+
+def submit(coro: Awaitable) -> concurrent.futures.Future:
+    """Schedules ``coro`` on the shared loop from any thread."""
+    return asyncio.run_coroutine_threadsafe(coro, loop())
+
+
+def run(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Runs ``coro`` on the shared loop and blocks the calling (non-loop) thread for the result."""
+    return submit(coro).result(timeout)
+
+
+def session():
+    """Returns the shared ``aiohttp.ClientSession``; must be called from the loop thread.
+
+    aiohttp is imported here so the sync execution path never pays for it.
+    """
+    global _session
+    if _session is None or _session.closed:
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=CONNECTION_LIMIT, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=TOTAL_TIMEOUT, connect=CONNECT_TIMEOUT)
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=http.DEFAULT_HEADERS)
+    return _session
+
+
+async def _get(url: str, read, check: bool = True, **kwargs):
+    # identical overlapping fetches share one request; the read kind is part of the key
+    key = (getattr(read, "__name__", read), check) + http.request_key(url, kwargs.get("params"), kwargs.get("headers"))
+    return await _inflight.do_async(key, lambda: _fetch(url, read, check, **kwargs), source=metrics.source_for(url))
+
+
+async def _fetch(url: str, read, check: bool, **kwargs):
+    await budget.pace_async(url)
+    with metrics.upstream(url):
+        async with session().get(http.resolve_url(url), **kwargs) as response:
+            budget.record(url, response.status, response.headers)
+            if check:
+                response.raise_for_status()
+            return await read(response)
+
+
+def _read_json(response):
+    return response.json(content_type=None)
+
+
+def _read_bytes(response):
+    return response.read()
+
+
+def _read_text(response):
+    return response.text()
+
+
+async def get_json(url: str, check: bool = True, **kwargs) -> Any:
+    """Fetches and decodes JSON; with ``check=False`` error bodies are returned instead of raised."""
+    return await _get(url, _read_json, check, **kwargs)
+
+
+async def get_bytes(url: str, **kwargs) -> bytes:
+    return await _get(url, _read_bytes, **kwargs)
+
+
+async def get_text(url: str, **kwargs) -> str:
+    return await _get(url, _read_text, **kwargs)
+
+
+async def reply(chat, message: str):
+    await asyncio.to_thread(chat.reply, message)
+
+
+async def reply_media(chat, files):
+    await asyncio.to_thread(chat.reply_media, files)
+
+
+def close():
+    """Closes the shared session, e.g. before the process exits."""
+    if _session is not None and not _session.closed:
+        run(_session.close(), timeout=5)
@@ -0,0 +1,228 @@
+"""Price alerts checked against every Upbit price update.
+
+Alerts are stored per user in PyKV under ``alert.<user id>`` and mirrored in
+an ``AlertIndex``: for each market, one threshold list per direction kept
+sorted with ``bisect``. A price update for a market costs a dict lookup
+and, only if the market is watched, one bisect per direction; every alert it
+crosses sits at one end of its list and is sliced off in one go. No alert is
+evaluated on its own, so thousands of them cost about the same as one.
+
+Updates come from ``upbit.book`` (the ticker WebSocket) while it is live;
+when it is not, one batched REST read of every watched market every
+``POLL_INTERVAL`` seconds feeds the same check. Triggered alerts are removed
+and sent to the room they were set in with ``bot.api.reply`` from a small
+worker pool, off the stream's event loop.
+"""
+import asyncio
+import bisect
+import concurrent.futures
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from iris import PyKV
+
+from helper import aio, metrics, upbit
+
+KEY_PREFIX = "alert."
+MAX_PER_USER = 20
+# seconds between REST checks while the price book is down
+POLL_INTERVAL = 5.0
+
+ABOVE = "above"
+BELOW = "below"
+DIRECTION_NAMES = {ABOVE: "이상", BELOW: "이하"}
+
+
+@dataclass(frozen=True)
+class Alert:
+    id: str
+    user_id: int
+    user_name: str
+    room_id: int
+    market: str
+    price: float
+    direction: str
+    created: float
+
+    @classmethod
+    def new(cls, user_id, user_name: str, room_id, market: str, price: float, direction: str) -> "Alert":
+        return cls(uuid.uuid4().hex[:8], int(user_id), user_name, int(room_id), market, float(price), direction, time.time())
+
+    def crossed(self, price: float) -> bool:
+        return price >= self.price if self.direction == ABOVE else price <= self.price
+
+
+class AlertIndex:
+    """Per-market sorted thresholds; ``check`` pops every alert a price crosses."""
+
+    def __init__(self):
+        # market -> direction -> (thresholds ascending, alerts in the same order)
+        self._books: Dict[str, Dict[str, Tuple[List[float], List[Alert]]]] = {}
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def markets(self) -> List[str]:
+        return list(self._books)
+
+    def add(self, alert: Alert):
+        with self._lock:
+            thresholds, alerts = self._books.setdefault(alert.market, {ABOVE: ([], []), BELOW: ([], [])})[alert.direction]
+            position = bisect.bisect_right(thresholds, alert.price)
+            thresholds.insert(position, alert.price)
+            alerts.insert(position, alert)
+            self.count += 1
+
+    def remove(self, alert: Alert) -> bool:
+        with self._lock:
+            book = self._books.get(alert.market)
+            if book is None:
+                return False
+            thresholds, alerts = book[alert.direction]
+            start = bisect.bisect_left(thresholds, alert.price)
+            for position in range(start, bisect.bisect_right(thresholds, alert.price)):
+                if alerts[position].id == alert.id:
+                    del thresholds[position], alerts[position]
+                    self.count -= 1
+                    self._drop_if_empty(alert.market)
+                    return True
+            return False
+
+    def _drop_if_empty(self, market: str):
+        if not any(thresholds for thresholds, _ in self._books[market].values()):
+            del self._books[market]
+
+    def check(self, market: str, price: float) -> List[Alert]:
+        # unwatched markets, i.e. almost every tick, stop at this lookup
+        if market not in self._books:
+            return []
+        with self._lock:
+            book = self._books.get(market)
+            if book is None:
+                return []
+            fired = []
+            thresholds, alerts = book[ABOVE]
+            crossed = bisect.bisect_right(thresholds, price)
+            if crossed:
+                fired += alerts[:crossed]
+                del thresholds[:crossed], alerts[:crossed]
+            thresholds, alerts = book[BELOW]
+            crossed = bisect.bisect_left(thresholds, price)
+            if crossed < len(thresholds):
+                fired += alerts[crossed:]
+                del thresholds[crossed:], alerts[crossed:]
+            if fired:
+                self.count -= len(fired)
+                self._drop_if_empty(market)
+            return fired
+
+
+index = AlertIndex()
+# serializes read-modify-write of a user's stored list between commands and deliveries
+_store_lock = threading.Lock()
+_api = None
+_delivery = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="alerts")
+_poll_task: Optional[concurrent.futures.Future] = None
+
+
+def _key(user_id) -> str:
+    return f"{KEY_PREFIX}{user_id}"
+
+
+def user_alerts(user_id) -> List[Alert]:
+    return [Alert(**row) for row in PyKV().get(_key(user_id)) or []]
+
+
+def _save(user_id, alerts: List[Alert]):
+    PyKV().put(_key(user_id), [asdict(alert) for alert in alerts])
+
+
+def add(alert: Alert) -> bool:
+    """Stores and indexes ``alert``; False if the user already has ``MAX_PER_USER``."""
+    with _store_lock:
+        alerts = user_alerts(alert.user_id)
+        if len(alerts) >= MAX_PER_USER:
+            return False
+        _save(alert.user_id, alerts + [alert])
+    index.add(alert)
+    return True
+
+
+def remove(user_id, alert_ids: List[str]) -> List[Alert]:
+    with _store_lock:
+        alerts = user_alerts(user_id)
+        removed = [alert for alert in alerts if alert.id in alert_ids]
+        _save(user_id, [alert for alert in alerts if alert.id not in alert_ids])
+    for alert in removed:
+        index.remove(alert)
+    return removed
+
+
+def load():
+    """Indexes every stored alert; called once at startup."""
+    for entry in PyKV().search_key(KEY_PREFIX):
+        if entry["key"].startswith(KEY_PREFIX) and isinstance(entry["value"], list):
+            for row in entry["value"]:
+                index.add(Alert(**row))
+
+
+def format_price(price: float) -> str:
+    return f"{price:,.8f}".rstrip("0").rstrip(".")
+
+
+def format_alert(alert: Alert) -> str:
+    return f"{alert.market[4:]} {format_price(alert.price)}원 {DIRECTION_NAMES[alert.direction]}"
+
+
+def _deliver(alert: Alert, price: float):
+    try:
+        with _store_lock:
+            _save(alert.user_id, [stored for stored in user_alerts(alert.user_id) if stored.id != alert.id])
+        if _api is not None:
+            _api.reply(alert.room_id, f"🔔 {alert.user_name}님 알림\n{format_alert(alert)} 도달\n현재가 : {format_price(price)}원")
+        metrics.inc("alerts_delivered_total")
+    except Exception as e:
+        metrics.inc("alerts_delivery_errors_total")
+        print(f"[alerts] delivery of {alert.id} failed: {e}")
+
+
+def on_price(row: Dict[str, Any]):
+    """``upbit.book`` listener; runs on the event loop for every stream message."""
+    fired = index.check(row["market"], row["trade_price"])
+    for alert in fired:
+        _delivery.submit(_deliver, alert, row["trade_price"])
+
+
+async def _poll():
+    while True:
+        await asyncio.sleep(POLL_INTERVAL)
+        markets = index.markets()
+        if not markets or upbit.book.live:
+            continue
+        try:
+            rows = await upbit.tickers_async(markets, check=False)
+            for row in rows if isinstance(rows, list) else []:
+                on_price(row)
+        except Exception as e:
+            print(f"[alerts] poll failed: {e}")
+
+
+def start(api):
+    """Loads stored alerts, subscribes to the price book and starts the REST fallback."""
+    global _api, _poll_task
+    _api = api
+    load()
+    if on_price not in upbit.book.listeners:
+        upbit.book.listeners.append(on_price)
+    if _poll_task is None or _poll_task.done():
+        _poll_task = aio.submit(_poll())
+
+
+def _collect():
+    yield "alerts_active", {}, index.count
+    yield "alerts_markets", {}, len(index.markets())
+
+
+metrics.register_collector(_collect)
@@ -0,0 +1,144 @@
+"""Named coin baskets defined per user or per room, priced and ranked in one go.
+
+Baskets live in PyKV as ``{name: [market, ...]}`` under ``basket.user.<user
+id>`` and ``basket.room.<room id>``; ``BUILTIN`` holds the ones every room
+has. ``!병림픽`` always shows the built-in ``병림픽`` basket, even where a
+user or room has saved one of its own under that name. ``price()`` reads
+every market of a basket with a single ``upbit.tickers()`` call, so a basket
+of 30 coins costs the same one request (or book read) as a basket of 3, and
+ranks the rows with one sort.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from iris import PyKV
+
+from helper import upbit
+
+USER_PREFIX = "basket.user."
+ROOM_PREFIX = "basket.room."
+MAX_BASKETS = 10
+MAX_COINS = 30
+MAX_NAME = 20
+
+USER = "user"
+ROOM = "room"
+BUILTIN_SCOPE = "builtin"
+BUILTIN: Dict[str, Tuple[str, ...]] = {
+    "병림픽": ("KRW-WLD", "KRW-ONDO", "KRW-VIRTUAL"),
+}
+
+PRICE = "price"
+CHANGE = "change"
+
+
+@dataclass(frozen=True)
+class Basket:
+    name: str
+    markets: Tuple[str, ...]
+    scope: str
+
+
+@dataclass(frozen=True)
+class Row:
+    market: str
+    price: float
+    change: float
+
+    @property
+    def symbol(self) -> str:
+        return self.market[4:]
+
+
+@dataclass(frozen=True)
+class Priced:
+    basket: Basket
+    rows: Tuple[Row, ...]
+    # markets of the basket Upbit no longer lists
+    missing: Tuple[str, ...]
+
+
+# serializes read-modify-write of one stored basket map
+_store_lock = threading.Lock()
+
+
+def _key(scope: str, owner_id) -> str:
+    return f"{USER_PREFIX if scope == USER else ROOM_PREFIX}{owner_id}"
+
+
+def stored(scope: str, owner_id) -> Dict[str, List[str]]:
+    found = PyKV().get(_key(scope, owner_id))
+    return found if isinstance(found, dict) else {}
+
+
+def save(scope: str, owner_id, name: str, markets: Sequence[str]) -> bool:
+    """Stores a basket, replacing one of the same name; False if the owner already has ``MAX_BASKETS`` others."""
+    with _store_lock:
+        baskets = stored(scope, owner_id)
+        if name not in baskets and len(baskets) >= MAX_BASKETS:
+            return False
+        baskets[name] = list(dict.fromkeys(markets))[:MAX_COINS]
+        PyKV().put(_key(scope, owner_id), baskets)
+    return True
+
+
+def delete(scope: str, owner_id, name: str) -> bool:
+    with _store_lock:
+        baskets = stored(scope, owner_id)
+        if baskets.pop(name, None) is None:
+            return False
+        PyKV().put(_key(scope, owner_id), baskets)
+    return True
+
+
+def builtin(name: str) -> Optional[Basket]:
+    """The built-in basket called ``name``, whatever users or rooms have saved under it."""
+    return Basket(name, BUILTIN[name], BUILTIN_SCOPE) if name in BUILTIN else None
+
+
+def find(name: str, user_id, room_id) -> Optional[Basket]:
+    """The user's basket called ``name``, else the room's, else a built-in one."""
+    for scope, owner_id in ((USER, user_id), (ROOM, room_id)):
+        markets = stored(scope, owner_id).get(name)
+        if markets:
+            return Basket(name, tuple(markets), scope)
+    return builtin(name)
+
+
+def available(user_id, room_id) -> List[Basket]:
+    """Every basket ``find`` can reach from this user and room, shadowed names left out."""
+    seen = {}
+    for scope, owner_id in ((USER, user_id), (ROOM, room_id)):
+        for name, markets in stored(scope, owner_id).items():
+            seen.setdefault(name, Basket(name, tuple(markets), scope))
+    for name, markets in BUILTIN.items():
+        seen.setdefault(name, Basket(name, markets, BUILTIN_SCOPE))
+    return list(seen.values())
+
+
+def resolve(queries: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """Markets for what users type (``BTC``, ``비트코인``); also returns the queries that did not match exactly one."""
+    markets, unresolved = [], []
+    for query in queries:
+        matches = upbit.search(query)
+        if len(matches) == 1:
+            markets.append(matches[0]["market"])
+        else:
+            unresolved.append(query)
+    return markets, unresolved
+
+
+def rank(rows: Sequence[Dict[str, Any]], order: str = PRICE) -> Tuple[Row, ...]:
+    field = "trade_price" if order == PRICE else "signed_change_rate"
+    ranked = sorted(rows, key=lambda row: row[field], reverse=True)
+    return tuple(Row(row["market"], row["trade_price"], row["signed_change_rate"] * 100) for row in ranked)
+
+
+def price(basket: Basket, order: str = PRICE) -> Priced:
+    listed = set(upbit.krw_markets(upbit.catalog()))
+    markets = [market for market in basket.markets if market in listed]
+    missing = tuple(market for market in basket.markets if market not in listed)
+    # sorted so the same basket always hits the same cached request
+    rows = upbit.tickers(sorted(markets)) if markets else []
+    return Priced(basket, rank(rows, order), missing)
@@ -0,0 +1,179 @@
+"""Binance spot tickers by symbol.
+
+Commands only ever need a handful of symbols (the pair itself, BTCUSDT for the
+premium and the quote asset's USDT pair), so by default ``tickers()`` asks
+``/api/v3/ticker/24hr`` for exactly those with ``symbols=[...]`` instead of
+downloading and scanning the full dump of every symbol.
+
+With ``BINANCE_SNAPSHOT=1`` a background task on the ``helper.aio`` loop
+instead fetches the whole (``type=MINI``) dump every ``SNAPSHOT_INTERVAL``
+seconds and parses it once into ``snapshot``, a dict keyed by symbol, so
+command lookups are dict reads. Targeted queries remain the fallback while
+the snapshot is missing, stale or lacks a symbol.
+
+Rows from either source are parsed to::
+
+    {"symbol": "BTCUSDT", "last_price": 103250.12, "change_percent": 1.204}
+"""
+import asyncio
+import concurrent.futures
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from helper import aio, cache, http, metrics
+
+TICKER_URL = "https://api.binance.com/api/v3/ticker/24hr"
+
+# quote assets priced 1:1 in USD
+USD_QUOTES = ("USDT", "BUSD", "USDC")
+
+SNAPSHOT = os.getenv("BINANCE_SNAPSHOT") == "1"
+# seconds between full snapshot refreshes
+SNAPSHOT_INTERVAL = 5.0
+# seconds after which an unrefreshed snapshot is no longer used
+SNAPSHOT_MAX_AGE = 30.0
+
+
+class Snapshot:
+    """Parsed ``symbol -> row`` dict from the last full refresh; replaced whole, never mutated."""
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.updated = 0.0
+
+    def replace(self, rows: Dict[str, Dict[str, Any]]):
+        self.rows = rows
+        self.updated = time.monotonic()
+
+    @property
+    def fresh(self) -> bool:
+        return bool(self.updated) and time.monotonic() - self.updated < SNAPSHOT_MAX_AGE
+
+    def get_many(self, symbols: Iterable[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Rows for every symbol, or ``None`` if the snapshot is stale or any symbol is missing."""
+        if not self.fresh:
+            return None
+        rows = self.rows
+        try:
+            return {symbol: rows[symbol] for symbol in symbols}
+        except KeyError:
+            return None
+
+
+snapshot = Snapshot()
+_snapshot_task: Optional[concurrent.futures.Future] = None
+
+
+def pair_symbols(param: str):
+    """``"ETH/BTC"`` -> ``("ETHBTC", "BTC", ["ETHBTC", "BTCUSDT"])``: the pair, its quote and every symbol a quote needs."""
+    base, quote = param.upper().split("/")
+    symbol = base + quote
+    needed = [symbol, "BTCUSDT"]
+    if quote not in USD_QUOTES:
+        needed.append(quote + "USDT")
+    return symbol, quote, list(dict.fromkeys(needed))
+
+
+def parse_ticker(row: Dict[str, Any]) -> Dict[str, Any]:
+    last_price = float(row["lastPrice"])
+    if "priceChangePercent" in row:
+        change_percent = float(row["priceChangePercent"])
+    else:
+        # type=MINI rows carry the open instead of the change
+        open_price = float(row["openPrice"])
+        change_percent = (last_price - open_price) / open_price * 100 if open_price else 0.0
+    return {"symbol": row["symbol"], "last_price": last_price, "change_percent": change_percent}
+
+
+def _params(symbols: List[str]) -> Dict[str, str]:
+    return {"symbols": json.dumps(sorted(symbols), separators=(",", ":"))}
+
+
+def _index(rows: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {row["symbol"]: parse_ticker(row) for row in rows}
+
+
+def tickers(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Parsed rows keyed by symbol. Raises ``KeyError`` for a symbol Binance does not list."""
+    rows = snapshot.get_many(symbols)
+    if rows is not None:
+        metrics.inc("binance_ticker_reads_total", source="snapshot")
+        return rows
+    metrics.inc("binance_ticker_reads_total", source="targeted")
+    indexed = _index(cache.get_json(TICKER_URL, "binance_ticker", params=_params(symbols)))
+    return {symbol: indexed[symbol] for symbol in symbols}
+
+
+async def tickers_async(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    rows = snapshot.get_many(symbols)
+    if rows is not None:
+        metrics.inc("binance_ticker_reads_total", source="snapshot")
+        return rows
+    metrics.inc("binance_ticker_reads_total", source="targeted")
+    indexed = _index(await cache.get_json_async(TICKER_URL, "binance_ticker", params=_params(symbols)))
+    return {symbol: indexed[symbol] for symbol in symbols}
+
+
+def _load_all() -> Dict[str, Dict[str, Any]]:
+    response = http.get(TICKER_URL, params={"type": "MINI"})
+    response.raise_for_status()
+    return _index(response.json())
+
+
+async def _load_all_async() -> Dict[str, Dict[str, Any]]:
+    return _index(await aio.get_json(TICKER_URL, params={"type": "MINI"}))
+
+
+def all_tickers() -> Dict[str, Dict[str, Any]]:
+    """Every symbol's parsed row: the snapshot while fresh, else the full dump, cached parsed for the ``binance_ticker`` TTL."""
+    if snapshot.fresh:
+        return snapshot.rows
+    return cache.market.get(("binance_all",), _load_all, "binance_ticker")
+
+
+async def all_tickers_async() -> Dict[str, Dict[str, Any]]:
+    if snapshot.fresh:
+        return snapshot.rows
+    return await cache.market.get_async(("binance_all",), _load_all_async, "binance_ticker")
+
+
+async def refresh_snapshot():
+    snapshot.replace(await _load_all_async())
+
+
+async def _run_snapshot():
+    while True:
+        try:
+            await refresh_snapshot()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # keep the previous snapshot until it ages out; reads fall back to targeted queries
+            metrics.inc("binance_snapshot_errors_total")
+            print(f"[binance] snapshot refresh failed: {e}")
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+
+
+def start_snapshot():
+    """Starts the background refresher once; safe to call again."""
+    global _snapshot_task
+    if _snapshot_task is None or _snapshot_task.done():
+        _snapshot_task = aio.submit(_run_snapshot())
+
+
+def stop_snapshot():
+    global _snapshot_task
+    if _snapshot_task is not None:
+        _snapshot_task.cancel()
+        _snapshot_task = None
+
+
+def _collect():
+    yield "binance_snapshot_symbols", {}, len(snapshot.rows)
+    if snapshot.updated:
+        yield "binance_snapshot_age_seconds", {}, time.monotonic() - snapshot.updated
+
+
+metrics.register_collector(_collect)
@@ -0,0 +1,76 @@
+"""Bithumb market data with the same batch interface as ``helper.upbit``.
+
+Bithumb's v1 public API mirrors Upbit's: ``/v1/market/all`` lists markets as
+``{"market": "KRW-WLD", "korean_name": ..., "english_name": ...}`` and
+``/v1/ticker?markets=KRW-WLD,KRW-ARKM`` returns one REST ticker row per
+market. ``catalog()`` is cached for ``cache.TTL["bithumb_catalog"]`` and
+indexed by market code, so naming a coin costs no request, and
+``tickers()`` reads any number of markets with a single request::
+
+    names = bithumb.names()
+    rows = bithumb.tickers(["KRW-WLD", "KRW-ARKM", "KRW-AGI"])
+"""
+from typing import Any, Dict, List, Optional
+
+from helper import cache, metrics
+from helper.upbit import MarketIndex
+
+MARKET_ALL_URL = "https://api.bithumb.com/v1/market/all?isDetails=false"
+TICKER_URL = "https://api.bithumb.com/v1/ticker?markets="
+HEADERS = {"accept": "application/json"}
+
+
+def catalog() -> List[Dict[str, Any]]:
+    return cache.get_json(MARKET_ALL_URL, "bithumb_catalog", headers=HEADERS)
+
+
+async def catalog_async() -> List[Dict[str, Any]]:
+    return await cache.get_json_async(MARKET_ALL_URL, "bithumb_catalog", headers=HEADERS)
+
+
+_index: Optional[MarketIndex] = None
+_names: Dict[str, str] = {}
+_indexed_catalog: Optional[list] = None
+
+
+def _reindex(markets: List[Dict[str, Any]]):
+    global _index, _names, _indexed_catalog
+    # the cache hands out the same list until it reloads the catalog
+    if markets is not _indexed_catalog:
+        _index = MarketIndex(markets)
+        _names = {market["market"]: market.get("korean_name") or market["market"][4:] for market in markets}
+        _indexed_catalog = markets
+
+
+def names(markets: Optional[List[Dict[str, Any]]] = None) -> Dict[str, str]:
+    """Market code -> Korean name, rebuilt only when the catalog is refreshed."""
+    _reindex(catalog() if markets is None else markets)
+    return _names
+
+
+def market_index(markets: Optional[List[Dict[str, Any]]] = None) -> MarketIndex:
+    _reindex(catalog() if markets is None else markets)
+    return _index
+
+
+def search(query: str) -> List[Dict[str, Any]]:
+    return market_index().search(query)
+
+
+async def search_async(query: str) -> List[Dict[str, Any]]:
+    return market_index(await catalog_async()).search(query)
+
+
+def tickers(markets: List[str], check: bool = True):
+    """Ticker rows for ``markets`` from one request, in the shape ``upbit.tickers`` returns.
+
+    With ``check=False`` an unknown market yields Bithumb's error body (a dict
+    with ``"error"``) instead of raising.
+    """
+    metrics.inc("bithumb_ticker_reads_total")
+    return cache.get_json(TICKER_URL + ",".join(markets), "bithumb_ticker", check=check, headers=HEADERS)
+
+
+async def tickers_async(markets: List[str], check: bool = True):
+    metrics.inc("bithumb_ticker_reads_total")
+    return await cache.get_json_async(TICKER_URL + ",".join(markets), "bithumb_ticker", check=check, headers=HEADERS)
@@ -0,0 +1,127 @@
+"""Upbit KRW market board: every market pre-sorted and pre-formatted, served by page or rank.
+
+``board()`` returns a ``Board`` built from one ``upbit.tickers()`` read of every
+KRW market and cached for ``cache.TTL["upbit_board"]`` seconds; after that the
+old board keeps answering while one background refresh rebuilds it. A
+rebuild reuses the formatted line of every market whose price and change did
+not move, and each board memoizes the messages it has rendered, so many
+rooms asking for the same page share one string.
+
+    board().page(2)
+    board().ranked(GAINERS, 10)
+"""
+import asyncio
+import math
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from helper import cache, upbit
+
+PAGE_SIZE = 20
+DEFAULT_TOP = 10
+MAX_TOP = 50
+
+GAINERS = "gainers"
+LOSERS = "losers"
+VOLUME = "volume"
+TITLES = {GAINERS: "상승률 상위", LOSERS: "하락률 상위", VOLUME: "거래대금 상위"}
+
+FOLD = "​" * 500
+
+
+def format_line(symbol: str, price: float, change: float) -> str:
+    return f"{symbol}\n현재가 : {price} 원\n등락률 : {change:.2f} %"
+
+
+def _turnover(row: Dict[str, Any]) -> float:
+    turnover = row.get("acc_trade_price_24h")
+    if turnover is None:
+        turnover = (row.get("acc_trade_volume_24h") or 0.0) * row["trade_price"]
+    return turnover
+
+
+class Board:
+    def __init__(self, tickers: Sequence[Dict[str, Any]], previous: Optional["Board"] = None):
+        reuse = previous._lines if previous is not None else {}
+        self._lines: Dict[str, Tuple[float, float, str]] = {}
+        turnover = {}
+        for row in tickers:
+            symbol = row["market"][4:]
+            price = row["trade_price"]
+            change = row["signed_change_rate"] * 100
+            kept = reuse.get(symbol)
+            self._lines[symbol] = kept if kept is not None and kept[:2] == (price, change) else (price, change, format_line(symbol, price, change))
+            turnover[symbol] = _turnover(row)
+        self.by_change: List[str] = sorted(self._lines, key=lambda symbol: self._lines[symbol][1], reverse=True)
+        self.by_volume: List[str] = sorted(self._lines, key=turnover.get, reverse=True)
+        self._messages: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    @property
+    def pages(self) -> int:
+        return max(1, math.ceil(len(self.by_change) / PAGE_SIZE))
+
+    def _memo(self, key: Tuple, render) -> str:
+        message = self._messages.get(key)
+        if message is None:
+            message = render()
+            with self._lock:
+                message = self._messages.setdefault(key, message)
+        return message
+
+    def _join(self, title: str, symbols: Sequence[str], footer: str = "") -> str:
+        body = "\n\n".join(self._lines[symbol][2] for symbol in symbols)
+        return f"{title}\n{FOLD}\n{body}" + (f"\n\n{footer}" if footer else "")
+
+    def page(self, number: int) -> str:
+        """Markets by change rate, ``PAGE_SIZE`` per page; out-of-range pages clamp."""
+        number = min(max(number, 1), self.pages)
+
+        def render():
+            start = (number - 1) * PAGE_SIZE
+            footer = f"다음 페이지 : !코인 전체 {number + 1}" if number < self.pages else ""
+            return self._join(f"업비트 원화시세 ({number}/{self.pages}쪽, 등락률순)", self.by_change[start:start + PAGE_SIZE], footer)
+        return self._memo(("page", number), render)
+
+    def ranked(self, order: str, count: int = DEFAULT_TOP) -> str:
+        count = min(max(count, 1), MAX_TOP)
+
+        def render():
+            if order == GAINERS:
+                symbols = self.by_change[:count]
+            elif order == LOSERS:
+                symbols = self.by_change[::-1][:count]
+            else:
+                symbols = self.by_volume[:count]
+            return self._join(f"업비트 원화 {TITLES[order]} {len(symbols)}", symbols)
+        return self._memo((order, count), render)
+
+
+_previous: Optional[Board] = None
+
+
+def _build(tickers: Sequence[Dict[str, Any]]) -> Board:
+    global _previous
+    _previous = Board(tickers, _previous)
+    return _previous
+
+
+def _load() -> Board:
+    return _build(upbit.tickers(upbit.krw_markets(upbit.catalog())))
+
+
+async def _load_async() -> Board:
+    tickers = await upbit.tickers_async(upbit.krw_markets(await upbit.catalog_async()))
+    # a few hundred rows; keep the sort and formatting off the event loop
+    return await asyncio.to_thread(_build, tickers)
+
+
+def board() -> Board:
+    return cache.market.get(("upbit_board",), _load, "upbit_board")
+
+
+async def board_async() -> Board:
+    return await cache.market.get_async(("upbit_board",), _load_async, "upbit_board")
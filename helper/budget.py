@@ -0,0 +1,276 @@
+"""Request budgets the exchanges report in their response headers, and pacing against them.
+
+Upbit answers every call with ``Remaining-Req: group=ticker; min=1799; sec=9``,
+the calls still allowed this second for that endpoint group, and Binance with
+``X-MBX-USED-WEIGHT-1M``, the request weight spent this minute out of
+``BINANCE_WEIGHT_LIMIT``. ``helper.http`` and ``helper.aio`` hand every
+response's headers to ``record()`` and ask ``pace()`` before every request:
+
+* while the window has budget left, the call goes out at once and is counted
+  against the window until the next header corrects the count;
+* once it is spent, the call waits for the window to roll over if that is at
+  most ``MAX_WAIT`` seconds away (Upbit's one-second windows), so a burst of
+  commands is spread out instead of tripping the limit;
+* otherwise, and while a 429/418 ``Retry-After`` runs, ``Throttled`` is raised
+  without sending anything. ``helper.cache`` answers it with the last value it
+  holds however old, and keeps values longer for a source that is ``low()``.
+
+A load with nothing cached to fall back on runs under ``overrun()``: it may
+also spend the ``RESERVE`` kept for calls in flight, counted in
+``budget_overrun_total``, so it is only refused once the window is at zero.
+
+Paced, deferred and rejected calls are counted in ``upstream_throttled_total``
+and every window's remaining budget is exported as ``upstream_budget_remaining``.
+"""
+import asyncio
+import contextlib
+import contextvars
+import re
+import threading
+import time
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from helper import metrics
+
+UPBIT = "upbit"
+BINANCE = "binance"
+
+# Binance spot's request weight per IP per minute
+BINANCE_WEIGHT_LIMIT = 6000
+# budget left untouched in every window for calls already in flight
+RESERVE: Dict[str, int] = {UPBIT: 1, BINANCE: 300}
+# below this share of its window's capacity a source counts as low
+LOW_SHARE = 0.2
+# seconds a call may wait for its window to roll over before it is deferred to the cache
+MAX_WAIT = 1.0
+# seconds to stay away after a 429/418 that carries no Retry-After
+BACKOFF: Dict[str, float] = {UPBIT: 1.0, BINANCE: 60.0}
+
+PACED = "paced"
+DEFERRED = "deferred"
+REJECTED = "rejected"
+
+_FIELD = re.compile(r"(\w+)=([\w-]+)")
+# set by ``overrun()``; copied into the tasks and loads started under it
+_overrun: contextvars.ContextVar[bool] = contextvars.ContextVar("budget_overrun", default=False)
+
+
+class Throttled(Exception):
+    """Raised instead of sending a call the source's budget cannot cover."""
+
+    def __init__(self, source: str, retry_after: float):
+        super().__init__(f"{source} rate budget spent, retry in {retry_after:.1f}s")
+        self.source = source
+        self.retry_after = retry_after
+
+
+class _Window:
+    __slots__ = ("remaining", "sent", "capacity", "resets")
+
+    def __init__(self, remaining: int, capacity: int, resets: float):
+        # as of the last response; ``sent`` counts calls made since that are still unanswered
+        self.remaining = remaining
+        self.sent = 0
+        self.capacity = capacity
+        self.resets = resets
+
+    @property
+    def left(self) -> int:
+        return self.remaining - self.sent
+
+
+def _resets(source: str, now: float) -> float:
+    if source == BINANCE:
+        # Binance counts weight per wall-clock minute
+        return now + 60 - time.time() % 60
+    # Upbit does not say where its second starts; a full second from now is the safe guess
+    return now + 1.0
+
+
+def _parse(source: str, headers: Mapping[str, str]) -> Optional[Tuple[str, int, int]]:
+    """``(group, remaining, capacity)`` from a response's headers, if it carries a budget."""
+    if source == UPBIT:
+        value = headers.get("Remaining-Req")
+        if not value:
+            return None
+        fields = dict(_FIELD.findall(value))
+        if "sec" not in fields:
+            return None
+        remaining = int(fields["sec"])
+        # the call that carried the header is already taken out of "sec"
+        return fields.get("group", "default"), remaining, remaining + 1
+    used = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("X-MBX-USED-WEIGHT")
+    if not used:
+        return None
+    return "weight", BINANCE_WEIGHT_LIMIT - int(used), BINANCE_WEIGHT_LIMIT
+
+
+def _retry_after(source: str, value: Optional[str]) -> float:
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return BACKOFF[source]
+
+
+class Budgets:
+    """Per-source, per-group request windows learned from response headers; thread-safe."""
+
+    def __init__(self):
+        # bench/budget.py turns this off for its unpaced baseline
+        self.enabled = True
+        self._windows: Dict[Tuple[str, str], _Window] = {}
+        # Upbit's group for each path, learned from its responses
+        self._groups: Dict[str, str] = {}
+        self._blocked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        metrics.register_collector(self._collect)
+
+    def _window(self, source: str, url: str) -> Optional[_Window]:
+        if source == BINANCE:
+            return self._windows.get((source, "weight"))
+        group = self._groups.get(urlsplit(url).path)
+        return self._windows.get((source, group)) if group else None
+
+    def reserve(self, url: str, patience: float = MAX_WAIT) -> float:
+        """Counts one call to ``url`` and returns 0, or returns the seconds to wait before asking again.
+
+        Raises ``Throttled`` when the wait would be longer than ``patience``.
+        """
+        source = metrics.source_for(url)
+        if not self.enabled or source not in RESERVE:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            blocked = self._blocked.get(source, 0.0) - now
+            window = self._window(source, url)
+            if blocked <= 0 and window is not None:
+                if now >= window.resets:
+                    # at least one call goes out per window, so a capacity learned from a drained window recovers
+                    window.remaining = max(window.capacity, RESERVE[source] + 1)
+                    window.sent = 0
+                    window.resets = _resets(source, now)
+                if window.left > RESERVE[source]:
+                    window.sent += 1
+                    return 0.0
+                if window.left > 0 and _overrun.get():
+                    window.sent += 1
+                    metrics.inc("budget_overrun_total", source=source)
+                    return 0.0
+                blocked = window.resets - now
+            elif blocked <= 0:
+                return 0.0
+        if blocked > patience:
+            metrics.inc("upstream_throttled_total", source=source, action=DEFERRED)
+            raise Throttled(source, blocked)
+        return blocked
+
+    def record(self, url: str, status: int, headers: Mapping[str, str]):
+        """Updates ``url``'s window from a response.
+
+        A 429 or 418 blocks the source for its ``Retry-After`` and raises ``Throttled``.
+        """
+        source = metrics.source_for(url)
+        if not self.enabled or source not in RESERVE:
+            return
+        now = time.monotonic()
+        parsed = _parse(source, headers)
+        if parsed is not None:
+            group, remaining, capacity = parsed
+            with self._lock:
+                if source == UPBIT:
+                    self._groups[urlsplit(url).path] = group
+                window = self._windows.get((source, group))
+                if window is None:
+                    window = self._windows[(source, group)] = _Window(remaining, capacity, _resets(source, now))
+                elif now >= window.resets or remaining > window.remaining:
+                    # the exchange has started a new window since the last response
+                    window.resets = _resets(source, now)
+                window.remaining = remaining
+                window.sent = max(window.sent - 1, 0)
+                window.capacity = max(window.capacity, capacity)
+        if status in (418, 429):
+            metrics.inc("upstream_throttled_total", source=source, action=REJECTED)
+            retry_after = _retry_after(source, headers.get("Retry-After"))
+            with self._lock:
+                self._blocked[source] = max(self._blocked.get(source, 0.0), now + retry_after)
+            raise Throttled(source, retry_after)
+
+    def low(self, url: str) -> bool:
+        """Whether ``url``'s source is blocked or its current window is down to ``LOW_SHARE`` of its capacity."""
+        source = metrics.source_for(url)
+        if not self.enabled or source not in RESERVE:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if self._blocked.get(source, 0.0) > now:
+                return True
+            window = self._window(source, url)
+            return window is not None and now < window.resets and window.left < window.capacity * LOW_SHARE
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+            self._groups.clear()
+            self._blocked.clear()
+
+    def _collect(self):
+        now = time.monotonic()
+        with self._lock:
+            windows = list(self._windows.items())
+        for (source, group), window in windows:
+            remaining = window.capacity if now >= window.resets else window.left
+            yield "upstream_budget_remaining", {"source": source, "group": group}, remaining
+            yield "upstream_budget_capacity", {"source": source, "group": group}, window.capacity
+
+
+budgets = Budgets()
+
+
+@contextlib.contextmanager
+def overrun() -> Iterator[None]:
+    """Lets calls made inside spend the reserve, so only a window at zero defers them."""
+    token = _overrun.set(True)
+    try:
+        yield
+    finally:
+        _overrun.reset(token)
+
+
+def _paced(url: str, waited: float):
+    source = metrics.source_for(url)
+    metrics.inc("upstream_throttled_total", source=source, action=PACED)
+    metrics.observe("upstream_paced_seconds", waited, source=source)
+
+
+def pace(url: str):
+    """Blocks until ``url``'s budget admits one more call; raises ``Throttled`` past ``MAX_WAIT``."""
+    waited = 0.0
+    while True:
+        wait = budgets.reserve(url, MAX_WAIT - waited)
+        if not wait:
+            break
+        time.sleep(wait)
+        waited += wait
+    if waited:
+        _paced(url, waited)
+
+
+async def pace_async(url: str):
+    waited = 0.0
+    while True:
+        wait = budgets.reserve(url, MAX_WAIT - waited)
+        if not wait:
+            break
+        await asyncio.sleep(wait)
+        waited += wait
+    if waited:
+        _paced(url, waited)
+
+
+def record(url: str, status: int, headers: Mapping[str, str]):
+    budgets.record(url, status, headers)
+
+
+def low(url: str) -> bool:
+    return budgets.low(url)
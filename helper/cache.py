@@ -0,0 +1,259 @@
+"""In-process TTL cache for market data with stale-while-revalidate.
+
+Every entry belongs to a *kind* from ``TTL`` (Upbit tickers, the Upbit catalog,
+FX rates, ...). Within ``TTL[kind]`` seconds the cached value is a plain hit.
+For the same span again after that it is *stale*: callers still get it
+immediately while one background refresh replaces it. Older entries are
+misses and are loaded inline; concurrent misses share one load.
+
+    payload = cache.get_json(url, "upbit_ticker")
+
+Hits, stale hits and misses are exported as ``cache_requests_total`` per kind.
+When a load is refused by the source's rate budget (``helper.budget``), the
+last value held is returned however old it is and counted in
+``cache_throttled_total``; while the budget is low, ``get_json`` and
+``get_content`` keep values ``LOW_BUDGET_TTL_SCALE`` times longer. A key
+with nothing cached loads under ``budget.overrun()`` instead, so the caller
+gets an error only when the source's budget is spent outright.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from helper import aio, budget, http, metrics
+from helper.singleflight import Group
+
+# seconds a value is served as fresh
+TTL: Dict[str, float] = {
+    "upbit_ticker": 1,
+    "upbit_catalog": 24 * 60 * 60,
+    "upbit_board": 2,
+    "bithumb_ticker": 1,
+    "bithumb_catalog": 24 * 60 * 60,
+    "binance_ticker": 1,
+    "kimchi": 3,
+    "fx": 30,
+    "stock_search": 24 * 60 * 60,
+    "stock_quote": 2,
+    "index_quote": 2,
+    "nasdaq_quote": 15,
+    "chart_image": 60,
+}
+# seconds after expiry a value may still be served while it refreshes; defaults to the TTL itself
+STALE: Dict[str, float] = {
+    # rates barely move; better an older rate than none while every source is down
+    "fx": 10 * 60,
+}
+# how many times longer values live while their source is low on rate budget
+LOW_BUDGET_TTL_SCALE = 5
+
+HIT = "hit"
+STALE_HIT = "stale"
+MISS = "miss"
+
+# background refreshes started from get_async; the loop itself only keeps weak references to tasks
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+class _Entry:
+    __slots__ = ("value", "stored")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.stored = time.monotonic()
+
+
+class TTLCache:
+    """Bounded LRU of ``key -> value`` with per-call TTLs; thread-safe and usable from the aio loop."""
+
+    def __init__(self, name: str, max_entries: int = 2048, refresh_workers: int = 4):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loads = Group(f"cache_{name}")
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix=f"cache-{name}")
+        self.counts: Dict[str, int] = {HIT: 0, STALE_HIT: 0, MISS: 0}
+        metrics.register_collector(self._collect)
+
+    def _lookup(self, key: Hashable, ttl: float, stale: float, kind: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                age = now - entry.stored
+                if age < ttl:
+                    result = HIT
+                elif age < ttl + stale:
+                    result = STALE_HIT
+                else:
+                    result = MISS
+            else:
+                result = MISS
+            self.counts[result] += 1
+            refresh = result == STALE_HIT and key not in self._refreshing
+            if refresh:
+                self._refreshing.add(key)
+        metrics.inc("cache_requests_total", cache=self.name, kind=kind, result=result)
+        return result, entry, refresh
+
+    def _store(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = _Entry(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh_done(self, key: Hashable):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def get(self, key: Hashable, loader: Callable[[], Any], kind: str, ttl: Optional[float] = None, stale: Optional[float] = None) -> Any:
+        ttl = TTL[kind] if ttl is None else ttl
+        stale = STALE.get(kind, ttl) if stale is None else stale
+        result, entry, refresh = self._lookup(key, ttl, stale, kind)
+        if refresh:
+            self._executor.submit(self._refresh, key, loader, kind)
+        if result != MISS:
+            return entry.value
+        try:
+            if entry is None:
+                # nothing to fall back on: dip into the budget's reserve rather than fail the command
+                with budget.overrun():
+                    return self._loads.do(key, lambda: self._load(key, loader))
+            return self._loads.do(key, lambda: self._load(key, loader))
+        except budget.Throttled:
+            if entry is None:
+                raise
+            return self._throttled(entry, kind)
+
+    async def get_async(self, key: Hashable, loader: Callable[[], Awaitable], kind: str, ttl: Optional[float] = None, stale: Optional[float] = None) -> Any:
+        ttl = TTL[kind] if ttl is None else ttl
+        stale = STALE.get(kind, ttl) if stale is None else stale
+        result, entry, refresh = self._lookup(key, ttl, stale, kind)
+        if refresh:
+            task = asyncio.ensure_future(self._refresh_async(key, loader, kind))
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        if result != MISS:
+            return entry.value
+        try:
+            if entry is None:
+                with budget.overrun():
+                    return await self._loads.do_async(key, lambda: self._load_async(key, loader))
+            return await self._loads.do_async(key, lambda: self._load_async(key, loader))
+        except budget.Throttled:
+            if entry is None:
+                raise
+            return self._throttled(entry, kind)
+
+    def _throttled(self, entry: _Entry, kind: str) -> Any:
+        # an expired value is still a better reply than a rate-limit error
+        metrics.inc("cache_throttled_total", cache=self.name, kind=kind)
+        return entry.value
+
+    def _load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = loader()
+        self._store(key, value)
+        return value
+
+    async def _load_async(self, key: Hashable, loader: Callable[[], Awaitable]) -> Any:
+        value = await loader()
+        self._store(key, value)
+        return value
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any], kind: str):
+        try:
+            self._load(key, loader)
+        except budget.Throttled:
+            # counted by helper.budget; the stale value stays until the budget recovers
+            pass
+        except Exception as e:
+            # keep serving the stale value; the next lookup past the stale window loads inline
+            metrics.inc("cache_refresh_errors_total", cache=self.name, kind=kind)
+            print(f"[cache] refresh of {kind} failed: {e}")
+        finally:
+            self._refresh_done(key)
+
+    async def _refresh_async(self, key: Hashable, loader: Callable[[], Awaitable], kind: str):
+        try:
+            await self._load_async(key, loader)
+        except budget.Throttled:
+            # counted by helper.budget; the stale value stays until the budget recovers
+            pass
+        except Exception as e:
+            metrics.inc("cache_refresh_errors_total", cache=self.name, kind=kind)
+            print(f"[cache] refresh of {kind} failed: {e}")
+        finally:
+            self._refresh_done(key)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), **self.counts}
+
+    def _collect(self):
+        yield "cache_entries", {"cache": self.name}, len(self._entries)
+
+
+market = TTLCache("market")
+
+
+def _ttl(url: str, kind: str) -> Optional[float]:
+    return TTL[kind] * LOW_BUDGET_TTL_SCALE if budget.low(url) else None
+
+
+def _key(read: str, url: str, kwargs: dict):
+    return (read,) + http.request_key(url, kwargs.get("params"), kwargs.get("headers"))
+
+
+def _json(url: str, kwargs: dict):
+    response = http.get(url, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+def _json_unchecked(url: str, kwargs: dict):
+    return http.get(url, **kwargs).json()
+
+
+def _content(url: str, kwargs: dict) -> bytes:
+    response = http.get(url, **kwargs)
+    response.raise_for_status()
+    return response.content
+
+
+def get_json(url: str, kind: str, check: bool = True, **kwargs) -> Any:
+    """Decoded JSON for ``url`` cached under ``kind``'s TTL.
+
+    With ``check=False`` error bodies (e.g. Upbit's 404 for an unknown market)
+    are returned and cached like any other payload instead of raising.
+    The returned object is shared between callers and must not be mutated.
+    """
+    load = _json if check else _json_unchecked
+    return market.get(_key(f"json:{check}", url, kwargs), lambda: load(url, kwargs), kind, _ttl(url, kind))
+
+
+def get_content(url: str, kind: str, **kwargs) -> bytes:
+    """Raw response body (e.g. a chart PNG) cached under ``kind``'s TTL."""
+    return market.get(_key("content", url, kwargs), lambda: _content(url, kwargs), kind, _ttl(url, kind))
+
+
+async def get_json_async(url: str, kind: str, check: bool = True, **kwargs) -> Any:
+    return await market.get_async(_key(f"json:{check}", url, kwargs), lambda: aio.get_json(url, check=check, **kwargs), kind, _ttl(url, kind))
+
+
+async def get_content_async(url: str, kind: str, **kwargs) -> bytes:
+    return await market.get_async(_key("content", url, kwargs), lambda: aio.get_bytes(url, **kwargs), kind, _ttl(url, kind))
@@ -0,0 +1,329 @@
+"""Local OHLCV candle store for Upbit and Binance.
+
+Every (exchange, symbol, interval) series lives in its own directory under
+``CANDLE_DIR`` (``candles/binance/BTCUSDT/1h/``) as one append-only file per
+column: ``time`` (candle open, unix seconds, int64) and ``open``/``high``/
+``low``/``close``/``volume`` (float64). Files are read through ``np.memmap``,
+so ``Series.last()`` and ``Series.range()`` return ``Candles`` whose columns
+are views of the mapped files and copy nothing.
+
+``candles()`` is what chart and indicator commands call::
+
+    bars = candles.candles(candles.BINANCE, "BTCUSDT", "1h", 200)
+    bars.close[-20:].mean()
+
+The first call for a series downloads ``HISTORY`` candles. After that a call
+asks the exchange only for candles from the last stored one onward (the
+still-open candle is rewritten in place), and at most once every ``REFRESH``
+seconds per series; older history is fetched only when more is asked for
+than is stored. If a refresh fails, the stored candles are served.
+"""
+import calendar
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from helper import http, metrics
+
+CANDLE_DIR = os.getenv("CANDLE_DIR", "candles")
+
+UPBIT = "upbit"
+BINANCE = "binance"
+UPBIT_CANDLE_URL = "https://api.upbit.com/v1/candles/"
+BINANCE_KLINES_URL = "https://api.binance.com/api/v3/klines"
+
+# interval name -> seconds per candle
+INTERVALS = {
+    "1m": 60,
+    "3m": 3 * 60,
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "30m": 30 * 60,
+    "1h": 60 * 60,
+    "4h": 4 * 60 * 60,
+    "1d": 24 * 60 * 60,
+    "1w": 7 * 24 * 60 * 60,
+}
+UPBIT_PATHS = {
+    "1m": "minutes/1",
+    "3m": "minutes/3",
+    "5m": "minutes/5",
+    "15m": "minutes/15",
+    "30m": "minutes/30",
+    "1h": "minutes/60",
+    "4h": "minutes/240",
+    "1d": "days",
+    "1w": "weeks",
+}
+PAGE_SIZE = {UPBIT: 200, BINANCE: 1000}
+
+# candles downloaded the first time a series is asked for
+HISTORY = 500
+MAX_COUNT = 2000
+# seconds between tail refreshes of one series
+REFRESH = 5.0
+# a series this many candles behind is downloaded afresh instead of caught up
+MAX_GAP = 5000
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+DTYPES = {column: np.dtype("<i8") if column == "time" else np.dtype("<f8") for column in COLUMNS}
+_SYMBOL = re.compile(r"[A-Za-z0-9-]{1,30}")
+
+
+@dataclass(frozen=True)
+class Candles:
+    time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __getitem__(self, index: slice) -> "Candles":
+        return Candles(*(getattr(self, column)[index] for column in COLUMNS))
+
+    @classmethod
+    def empty(cls) -> "Candles":
+        return cls(*(np.empty(0, dtype=DTYPES[column]) for column in COLUMNS))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[int, float, float, float, float, float]]) -> "Candles":
+        """Builds candles from ``(time, open, high, low, close, volume)`` rows in ascending time."""
+        if not rows:
+            return cls.empty()
+        table = np.asarray(rows, dtype=np.float64)
+        return cls(*(table[:, i].astype(DTYPES[column]) for i, column in enumerate(COLUMNS)))
+
+    @classmethod
+    def concat(cls, parts: Sequence["Candles"]) -> "Candles":
+        return cls(*(np.concatenate([getattr(part, column) for part in parts]) for column in COLUMNS))
+
+
+class Series:
+    """One memory-mapped candle series; writers hold ``lock``, readers need not."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.synced = 0.0
+        # set once the exchange has no candles older than the first stored one
+        self.complete = False
+        self._view = Candles.empty()
+        self._open()
+
+    def _path(self, column: str) -> str:
+        return os.path.join(self.directory, column)
+
+    def _open(self):
+        try:
+            sizes = [os.path.getsize(self._path(column)) // DTYPES[column].itemsize for column in COLUMNS]
+        except FileNotFoundError:
+            self._view = Candles.empty()
+            return
+        length = min(sizes)
+        for column, size in zip(COLUMNS, sizes):
+            if size != length:
+                # drop the part of a row torn by a crash mid-append so the columns line up
+                os.truncate(self._path(column), length * DTYPES[column].itemsize)
+        if length == 0:
+            self._view = Candles.empty()
+            return
+        self._view = Candles(*(np.memmap(self._path(column), dtype=DTYPES[column], mode="r", shape=(length,)) for column in COLUMNS))
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def view(self) -> Candles:
+        return self._view
+
+    def last(self, count: int) -> Candles:
+        view = self._view
+        return view[max(len(view) - count, 0):]
+
+    def range(self, start: float, end: float) -> Candles:
+        """Candles opening in ``[start, end)``."""
+        view = self._view
+        lo, hi = np.searchsorted(view.time, [start, end])
+        return view[lo:hi]
+
+    def append(self, rows: Candles):
+        """Appends ``rows`` newer than the stored ones, rewriting the last stored candle if it comes again."""
+        view = self._view
+        if len(view):
+            rows = rows[int(np.searchsorted(rows.time, view.time[-1])):]
+        if not len(rows):
+            return
+        if len(view) and rows.time[0] == view.time[-1]:
+            for column in COLUMNS:
+                with open(self._path(column), "r+b") as fp:
+                    fp.seek((len(view) - 1) * DTYPES[column].itemsize)
+                    fp.write(getattr(rows, column)[:1].tobytes())
+            rows = rows[1:]
+        if len(rows):
+            os.makedirs(self.directory, exist_ok=True)
+            # time goes last, so a crash leaves at worst a torn row that ``_open`` trims
+            for column in COLUMNS[1:] + COLUMNS[:1]:
+                with open(self._path(column), "ab") as fp:
+                    fp.write(getattr(rows, column).tobytes())
+        self._open()
+
+    def replace(self, rows: Candles):
+        os.makedirs(self.directory, exist_ok=True)
+        for column in COLUMNS:
+            with open(self._path(column) + ".tmp", "wb") as fp:
+                fp.write(np.ascontiguousarray(getattr(rows, column), dtype=DTYPES[column]).tobytes())
+            os.replace(self._path(column) + ".tmp", self._path(column))
+        self._open()
+
+
+class Store:
+    def __init__(self, directory: str = CANDLE_DIR):
+        self.directory = directory
+        self._series: Dict[Tuple[str, str, str], Series] = {}
+        self._lock = threading.Lock()
+
+    def series(self, exchange: str, symbol: str, interval: str) -> Series:
+        key = (exchange, symbol, interval)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = Series(os.path.join(self.directory, *key))
+        return series
+
+    def discard(self, exchange: str, symbol: str, interval: str, series: Series):
+        """Forgets ``series`` if it is still the one kept for its key and holds no candles."""
+        key = (exchange, symbol, interval)
+        with self._lock:
+            if self._series.get(key) is series and not len(series):
+                del self._series[key]
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+
+store = Store()
+
+
+def _upbit_time(text: str) -> int:
+    return calendar.timegm(time.strptime(text, "%Y-%m-%dT%H:%M:%S"))
+
+
+def _upbit_page(symbol: str, interval: str, end: Optional[int], count: int) -> Candles:
+    params = {"market": symbol, "count": count}
+    if end is not None:
+        params["to"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(end))
+    response = http.get(UPBIT_CANDLE_URL + UPBIT_PATHS[interval], params=params)
+    response.raise_for_status()
+    rows = [
+        (_upbit_time(row["candle_date_time_utc"]), row["opening_price"], row["high_price"], row["low_price"], row["trade_price"], row["candle_acc_trade_volume"])
+        for row in response.json()
+    ]
+    # newest first on the wire
+    return Candles.from_rows(rows[::-1])
+
+
+def _binance_page(symbol: str, interval: str, end: Optional[int], count: int) -> Candles:
+    params = {"symbol": symbol, "interval": interval, "limit": count}
+    if end is not None:
+        params["endTime"] = end * 1000 - 1
+    response = http.get(BINANCE_KLINES_URL, params=params)
+    response.raise_for_status()
+    rows = [(row[0] // 1000, float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5])) for row in response.json()]
+    return Candles.from_rows(rows)
+
+
+PAGES = {UPBIT: _upbit_page, BINANCE: _binance_page}
+
+
+def fetch(exchange: str, symbol: str, interval: str, count: int, end: Optional[int] = None) -> Candles:
+    """Up to ``count`` candles opening before ``end`` (or the latest ones), paging as the exchange requires."""
+    page_size = PAGE_SIZE[exchange]
+    parts: List[Candles] = []
+    while count > 0:
+        page = PAGES[exchange](symbol, interval, end, min(count, page_size))
+        metrics.inc("candle_pages_total", exchange=exchange)
+        if len(page):
+            parts.append(page)
+        if len(page) < min(count, page_size):
+            break
+        count -= len(page)
+        end = int(page.time[0])
+    return Candles.concat(parts[::-1]) if parts else Candles.empty()
+
+
+def _sync(series: Series, exchange: str, symbol: str, interval: str, count: int, now: float):
+    wanted = max(count, HISTORY)
+    if not len(series):
+        rows = fetch(exchange, symbol, interval, wanted)
+        series.replace(rows)
+        series.complete = len(rows) < wanted
+        return
+    if now - series.synced >= REFRESH:
+        behind = int((now - series.view().time[-1]) // INTERVALS[interval]) + 1
+        if behind > MAX_GAP:
+            rows = fetch(exchange, symbol, interval, wanted)
+            series.replace(rows)
+            series.complete = len(rows) < wanted
+            return
+        series.append(fetch(exchange, symbol, interval, behind + 1))
+    if len(series) < count and not series.complete:
+        missing = count - len(series)
+        older = fetch(exchange, symbol, interval, missing, end=int(series.view().time[0]))
+        series.complete = len(older) < missing
+        if len(older):
+            series.replace(Candles.concat([older, series.view()]))
+
+
+def candles(exchange: str, symbol: str, interval: str, count: int = HISTORY) -> Candles:
+    """The last ``count`` candles of a series, brought up to date first.
+
+    ``symbol`` is the exchange's own market code (``KRW-BTC``, ``BTCUSDT``).
+    The returned columns are read-only views of the store.
+    """
+    if exchange not in PAGES:
+        raise ValueError(f"unknown exchange: {exchange}")
+    if interval not in INTERVALS:
+        raise ValueError(f"unknown interval: {interval}")
+    if not _SYMBOL.fullmatch(symbol):
+        raise ValueError(f"invalid symbol: {symbol}")
+    count = min(max(count, 1), MAX_COUNT)
+    series = store.series(exchange, symbol, interval)
+    now = time.time()
+    if now - series.synced >= REFRESH or len(series) < count and not series.complete:
+        with series.lock:
+            # a caller that waited on the lock finds the series already refreshed
+            if now - series.synced >= REFRESH or len(series) < count and not series.complete:
+                try:
+                    _sync(series, exchange, symbol, interval, count, now)
+                except Exception as e:
+                    metrics.inc("candle_sync_errors_total", exchange=exchange)
+                    if not len(series):
+                        # most likely a symbol the exchange does not list; keeping it would let
+                        # every mistyped symbol add an entry to the store for good
+                        store.discard(exchange, symbol, interval, series)
+                        raise
+                    print(f"[candles] {exchange} {symbol} {interval} refresh failed, serving stored candles: {e}")
+                finally:
+                    # failures back off for REFRESH too rather than retrying on every call
+                    series.synced = now
+            if not len(series):
+                store.discard(exchange, symbol, interval, series)
+    metrics.inc("candle_reads_total", exchange=exchange)
+    return series.last(count)
+
+
+def _collect():
+    yield "candle_series", {}, len(store)
+
+
+metrics.register_collector(_collect)
@@ -0,0 +1,280 @@
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+try:
+    from iris import ChatContext
+except ModuleNotFoundError:  # pragma: no cover
+    ChatContext = None  # type: ignore[misc,assignment]
+
+from helper import aio, metrics
+
+
+REJECT = "reject"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+BUSY_MESSAGE = "요청이 밀려 있습니다. 잠시 후 다시 시도해주세요."
+
+# job priorities, lower runs first
+HIGH = 0
+NORMAL = 1
+LOW = 2
+PRIORITY_NAMES = {HIGH: "high", NORMAL: "normal", LOW: "low"}
+
+
+@dataclass
+class LaneConfig:
+    workers: int
+    queue_size: int
+    overflow: str = REJECT
+    block_timeout: float = 2.0
+    # coroutine handlers admitted at once in async mode; they share the aio loop instead of worker threads
+    async_limit: int = 64
+    # seconds of waiting that promote a queued job by one priority level, so low priority still runs
+    aging: float = 5.0
+
+
+@dataclass
+class Job:
+    func: Callable
+    chat: Any
+    args: tuple
+    priority: int = NORMAL
+    received: float = field(default_factory=time.perf_counter)
+
+    @property
+    def command(self) -> str:
+        try:
+            return self.chat.message.command
+        except AttributeError:
+            return "unknown"
+
+
+class PriorityJobQueue:
+    """Bounded multi-level FIFO with aging.
+
+    ``get`` compares only the oldest job of each level: its effective
+    priority is ``priority - waited / aging``, so a job that has waited
+    ``aging`` seconds competes as if it were one level higher.
+    """
+
+    def __init__(self, maxsize: int, aging: float):
+        self.maxsize = maxsize
+        self.aging = aging
+        self._levels: Dict[int, Deque[Job]] = {level: deque() for level in PRIORITY_NAMES}
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def sizes(self) -> Dict[int, int]:
+        return {level: len(jobs) for level, jobs in self._levels.items()}
+
+    def _append(self, job: Job):
+        self._levels.setdefault(job.priority, deque()).append(job)
+        self._size += 1
+        self._cond.notify()
+
+    def put_nowait(self, job: Job):
+        with self._cond:
+            if self._size >= self.maxsize:
+                raise queue.Full
+            self._append(job)
+
+    def put(self, job: Job, timeout: float):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._size < self.maxsize, timeout):
+                raise queue.Full
+            self._append(job)
+
+    def get(self) -> Job:
+        with self._cond:
+            self._cond.wait_for(lambda: self._size > 0)
+            now = time.perf_counter()
+            heads: List[tuple] = [
+                (level - (now - jobs[0].received) / self.aging, level)
+                for level, jobs in self._levels.items()
+                if jobs
+            ]
+            _, level = min(heads)
+            self._size -= 1
+            self._cond.notify()
+            return self._levels[level].popleft()
+
+    def evict(self, priority: int = LOW) -> Optional[Job]:
+        """Removes the oldest job of the lowest priority level, if any is no higher than ``priority``."""
+        with self._cond:
+            for level in sorted(self._levels, reverse=True):
+                if level < priority:
+                    return None
+                if self._levels[level]:
+                    self._size -= 1
+                    self._cond.notify()
+                    return self._levels[level].popleft()
+            return None
+
+
+class Lane:
+    """Bounded priority queue drained by a fixed number of worker threads.
+
+    Workers take the highest-priority job first, with aging (see
+    ``PriorityJobQueue``). When the queue is full the overflow policy decides
+    what happens: ``reject`` refuses the new job, ``drop_oldest`` evicts the
+    oldest job of the lowest queued priority to make room (or refuses the new
+    job if everything queued outranks it), and ``block`` waits up to
+    ``block_timeout`` seconds before rejecting.
+
+    Coroutine handlers go through ``submit_async`` instead: they run on the
+    shared ``helper.aio`` loop and are rejected once ``async_limit`` of them
+    are in flight.
+    """
+
+    def __init__(self, name: str, config: LaneConfig):
+        if config.overflow not in (REJECT, DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy: {config.overflow}")
+        self.name = name
+        self.config = config
+        self._queue = PriorityJobQueue(config.queue_size, config.aging)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._inflight = 0
+        self.rejected = 0
+        self.dropped = 0
+        self._threads = []
+        for idx in range(config.workers):
+            thread = threading.Thread(target=self._worker, name=f"lane-{name}-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job: Job) -> bool:
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except queue.Full:
+            pass
+
+        if self.config.overflow == DROP_OLDEST:
+            with self._lock:
+                while True:
+                    try:
+                        self._queue.put_nowait(job)
+                        return True
+                    except queue.Full:
+                        pass
+                    dropped = self._queue.evict(job.priority)
+                    if dropped is None:
+                        if self._queue.qsize() < self._queue.maxsize:
+                            # drained by a worker in between
+                            continue
+                        # every queued job outranks the new one
+                        break
+                    self.dropped += 1
+                    _reply_busy(dropped)
+
+        if self.config.overflow == BLOCK:
+            try:
+                self._queue.put(job, timeout=self.config.block_timeout)
+                return True
+            except queue.Full:
+                pass
+
+        self.rejected += 1
+        _reply_busy(job)
+        return False
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                self._active += 1
+            command = job.command
+            # 대기 시간과 실행 시간(command_seconds)을 따로 본다
+            metrics.observe("command_queue_wait_seconds", time.perf_counter() - job.received, lane=self.name, priority=PRIORITY_NAMES.get(job.priority, str(job.priority)))
+            metrics.track_replies(job.chat, command, job.received)
+            try:
+                with metrics.timer("command", command=command, lane=self.name):
+                    job.func(job.chat, *job.args)
+            except Exception as e:
+                print(f"[{self.name}] {e}")
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+    def submit_async(self, job: Job) -> bool:
+        with self._lock:
+            admitted = self._inflight < self.config.async_limit
+            if admitted:
+                self._inflight += 1
+            else:
+                self.rejected += 1
+        if not admitted:
+            _reply_busy(job)
+            return False
+        aio.submit(self._run_async(job))
+        return True
+
+    async def _run_async(self, job: Job):
+        command = job.command
+        metrics.observe("command_queue_wait_seconds", time.perf_counter() - job.received, lane=self.name, priority=PRIORITY_NAMES.get(job.priority, str(job.priority)))
+        metrics.track_replies(job.chat, command, job.received)
+        try:
+            with metrics.timer("command", command=command, lane=self.name):
+                await job.func(job.chat, *job.args)
+        except Exception as e:
+            print(f"[{self.name}] {e}")
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        queued_by_priority = {f"queued_{PRIORITY_NAMES.get(level, level)}": size for level, size in self._queue.sizes().items()}
+        return {
+            "workers": self.config.workers,
+            "active": self._active,
+            "async_inflight": self._inflight,
+            "async_limit": self.config.async_limit,
+            "queued": self._queue.qsize(),
+            "queue_size": self.config.queue_size,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            **queued_by_priority,
+        }
+
+
+class Dispatcher:
+    """Routes command handlers to per-class lanes so slow work cannot starve cheap replies."""
+
+    def __init__(self, lanes: Dict[str, LaneConfig]):
+        self.lanes = {name: Lane(name, config) for name, config in lanes.items()}
+        metrics.register_collector(self._collect)
+
+    def submit(self, lane: Optional[str], func: Callable, chat: ChatContext, *args, priority: int = NORMAL) -> bool:
+        if lane is None:
+            with metrics.timer("command", command=chat.message.command, lane="inline"):
+                func(chat, *args)
+            return True
+        return self.lanes[lane].submit(Job(func, chat, args, priority))
+
+    def submit_async(self, lane: str, func: Callable, chat: ChatContext, *args, priority: int = NORMAL) -> bool:
+        """Schedules the coroutine function ``func`` on the aio loop under ``lane``'s admission limit."""
+        return self.lanes[lane].submit_async(Job(func, chat, args, priority))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def _collect(self):
+        for name, stats in self.stats().items():
+            for key, value in stats.items():
+                yield f"lane_{key}", {"lane": name}, value
+
+
+def _reply_busy(job: Job):
+    try:
+        job.chat.reply(BUSY_MESSAGE)
+    except Exception as e:
+        print(e)
@@ -0,0 +1,172 @@
+"""KRW exchange rates shared by every command that needs one.
+
+All of ``CURRENCIES`` are fetched together and cached as one entry for
+``cache.TTL["fx"]`` seconds; past that the cached rates are still served
+while one background refresh replaces them, so ``!바낸``, ``!김프``,
+``!달러`` and ``!미`` share a single fetch.
+
+Each refresh walks ``SOURCES`` in order and keeps asking the next source only
+for the currencies still missing, so one source failing (or lacking a
+currency) falls through to the next. Every ``Rate`` records the source that
+served it and when.
+
+    fx.usd_krw()            # 1387.5
+    fx.rate("JPY").price    # KRW per 100 JPY
+"""
+import asyncio
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from helper import aio, cache, http, metrics
+
+CURRENCIES = ("USD", "EUR", "JPY", "CNY")
+# currencies quoted per 100 units, as Korean banks and Naver do
+UNITS = {"JPY": 100}
+
+EXCHANGE_URL = "https://api.stock.naver.com/marketindex/exchange?code=FX_{currency}KRW"
+CALCULATOR_URL = "https://m.search.naver.com/p/csearch/content/qapirender.nhn?key=calculator&pkid=141&q=%ED%99%98%EC%9C%A8&where=m&u1=keb&u6=standardUnit&u7=0&u3={currency}&u4=KRW&u8=down&u2={unit}"
+OPEN_ER_URL = "https://open.er-api.com/v6/latest/USD"
+
+
+@dataclass(frozen=True)
+class Rate:
+    currency: str
+    # KRW per ``unit`` of ``currency``
+    price: float
+    unit: int = 1
+    change: Optional[float] = None
+    ratio: Optional[float] = None
+    # Naver's fluctuation code: "2" up, "5" down
+    indicator: str = ""
+    source: str = ""
+    fetched: float = 0.0
+
+    @property
+    def per_unit(self) -> float:
+        return self.price / self.unit
+
+
+def _number(text: Any) -> float:
+    return float(str(text).replace(",", ""))
+
+
+def _parse_exchange(currencies: Sequence[str], payloads: List[Any]) -> Dict[str, Rate]:
+    rates = {}
+    for currency, payload in zip(currencies, payloads):
+        for item in payload.get("normalList") or []:
+            if item.get("exchangeCode") == currency:
+                rates[currency] = Rate(
+                    currency,
+                    _number(item["closePrice"]),
+                    UNITS.get(currency, 1),
+                    change=_number(item.get("fluctuations", "0")),
+                    ratio=_number(item.get("fluctuationsRatio", "0")),
+                    indicator=(item.get("fluctuationsType") or {}).get("code", ""),
+                )
+    return rates
+
+
+def _parse_calculator(currencies: Sequence[str], payloads: List[Any]) -> Dict[str, Rate]:
+    return {currency: Rate(currency, _number(payload["country"][1]["value"]), UNITS.get(currency, 1)) for currency, payload in zip(currencies, payloads)}
+
+
+def _parse_open_er(currencies: Sequence[str], payloads: List[Any]) -> Dict[str, Rate]:
+    table = payloads[0]["rates"]
+    rates = {}
+    for currency in currencies:
+        if currency in table and "KRW" in table:
+            unit = UNITS.get(currency, 1)
+            rates[currency] = Rate(currency, table["KRW"] / table[currency] * unit, unit)
+    return rates
+
+
+class Source(NamedTuple):
+    name: str
+    # currencies -> URLs to fetch
+    urls: Callable[[Sequence[str]], List[str]]
+    # (currencies, decoded payloads in URL order) -> rates found
+    parse: Callable[[Sequence[str], List[Any]], Dict[str, Rate]]
+
+
+SOURCES = [
+    Source("naver_exchange", lambda currencies: [EXCHANGE_URL.format(currency=c) for c in currencies], _parse_exchange),
+    Source("naver_calculator", lambda currencies: [CALCULATOR_URL.format(currency=c, unit=UNITS.get(c, 1)) for c in currencies], _parse_calculator),
+    Source("open_er", lambda currencies: [OPEN_ER_URL], _parse_open_er),
+]
+
+
+def _fetch_json(url: str) -> Any:
+    response = http.get(url)
+    response.raise_for_status()
+    return response.json()
+
+
+def _stamp(source: Source, rates: Dict[str, Rate]) -> Dict[str, Rate]:
+    fetched = time.time()
+    return {currency: replace(rate, source=source.name, fetched=fetched) for currency, rate in rates.items()}
+
+
+def _failed(source: Source, e: Exception):
+    metrics.inc("fx_source_errors_total", source=source.name)
+    print(f"[fx] {source.name} failed: {e}")
+
+
+def _done(rates: Dict[str, Rate]) -> Dict[str, Rate]:
+    if "USD" not in rates:
+        raise RuntimeError("no source returned USD/KRW")
+    for rate in rates.values():
+        metrics.inc("fx_rates_served_total", source=rate.source)
+    return rates
+
+
+def _load() -> Dict[str, Rate]:
+    rates: Dict[str, Rate] = {}
+    for source in SOURCES:
+        missing = [currency for currency in CURRENCIES if currency not in rates]
+        if not missing:
+            break
+        try:
+            rates.update(_stamp(source, source.parse(missing, [_fetch_json(url) for url in source.urls(missing)])))
+        except Exception as e:
+            _failed(source, e)
+    return _done(rates)
+
+
+async def _load_async() -> Dict[str, Rate]:
+    rates: Dict[str, Rate] = {}
+    for source in SOURCES:
+        missing = [currency for currency in CURRENCIES if currency not in rates]
+        if not missing:
+            break
+        try:
+            payloads = await asyncio.gather(*(aio.get_json(url) for url in source.urls(missing)))
+            rates.update(_stamp(source, source.parse(missing, list(payloads))))
+        except Exception as e:
+            _failed(source, e)
+    return _done(rates)
+
+
+def rates() -> Dict[str, Rate]:
+    return cache.market.get(("fx",), _load, "fx")
+
+
+async def rates_async() -> Dict[str, Rate]:
+    return await cache.market.get_async(("fx",), _load_async, "fx")
+
+
+def rate(currency: str = "USD") -> Rate:
+    """Raises ``KeyError`` for a currency no source could price."""
+    return rates()[currency]
+
+
+async def rate_async(currency: str = "USD") -> Rate:
+    return (await rates_async())[currency]
+
+
+def usd_krw() -> float:
+    return rate("USD").price
+
+
+async def usd_krw_async() -> float:
+    return (await rate_async("USD")).price
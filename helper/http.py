@@ -0,0 +1,117 @@
+"""Shared HTTP client for every bot.
+
+Each upstream host gets its own ``requests.Session`` with a keep-alive
+connection pool, so repeated calls to Upbit, Binance or Naver reuse the
+TCP/TLS connection instead of handshaking on every command. Calls without an
+explicit ``timeout`` get ``DEFAULT_TIMEOUT`` and every request carries
+``DEFAULT_HEADERS`` underneath its own headers. Identical GETs that overlap
+in time share one upstream request (see ``helper.singleflight``), and calls
+to the exchanges are paced against the rate budgets their responses report
+(see ``helper.budget``).
+"""
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from helper import budget, metrics
+from helper.singleflight import Group
+
+# When set (e.g. by bench/replay.py), every upstream call is sent to
+# "{UPSTREAM_OVERRIDE}/{host}{path}?{query}" instead of the real host.
+UPSTREAM_OVERRIDE = os.getenv("IRIS_UPSTREAM_OVERRIDE")
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; irispy-client)",
+    "Accept": "application/json, */*;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+# Keep-alive connections kept per host; matches the widest lane so workers never queue on the pool.
+POOL_SIZE = 16
+# Sessions kept at once; the least recently used host is dropped beyond this.
+MAX_HOSTS = 32
+# Set to False to send every call through a one-off connection (used by bench/http_pool.py as the baseline).
+POOLING = os.getenv("IRIS_HTTP_POOL", "1") != "0"
+
+_inflight = Group("http")
+_sessions: "OrderedDict[str, requests.Session]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def resolve_url(url: str) -> str:
+    if not UPSTREAM_OVERRIDE:
+        return url
+    parts = urlsplit(url)
+    rewritten = f"{UPSTREAM_OVERRIDE.rstrip('/')}/{parts.netloc}{parts.path}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def session_for(url: str) -> requests.Session:
+    """Returns the pooled session for ``url``'s host, creating it on first use."""
+    host = urlsplit(url).netloc
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _new_session()
+            if len(_sessions) > MAX_HOSTS:
+                # not closed: another thread may be mid-request on it; its pool is closed once unreferenced
+                _sessions.popitem(last=False)
+                metrics.inc("http_sessions_evicted_total")
+        else:
+            _sessions.move_to_end(host)
+        return session
+
+
+def close():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def request_key(url: str, params=None, headers=None):
+    """Identity of a GET for coalescing: the URL plus anything that changes the response."""
+    params_key = tuple(sorted(params.items())) if isinstance(params, dict) else params
+    headers_key = tuple(sorted(headers.items())) if headers else None
+    return url, params_key, headers_key
+
+
+def get(url: str, coalesce: bool = True, **kwargs) -> requests.Response:
+    """``requests.get`` over the host's pooled session, recording latency and errors per upstream source.
+
+    Concurrent identical calls return the same ``Response`` object, so callers must treat it as read-only.
+    Pass ``coalesce=False`` (or ``stream=True``) for a private response.
+    """
+    if not coalesce or kwargs.get("stream"):
+        return _get(url, **kwargs)
+    key = request_key(url, kwargs.get("params"), kwargs.get("headers"))
+    return _inflight.do(key, lambda: _get(url, **kwargs), source=metrics.source_for(url))
+
+
+def _get(url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    target = resolve_url(url)
+    budget.pace(url)
+    with metrics.upstream(url):
+        if not POOLING:
+            headers = {**DEFAULT_HEADERS, **(kwargs.pop("headers", None) or {})}
+            response = requests.get(target, headers=headers, **kwargs)
+        else:
+            response = session_for(target).get(target, **kwargs)
+        budget.record(url, response.status_code, response.headers)
+    return response
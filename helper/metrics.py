@@ -0,0 +1,181 @@
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+# seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+UPSTREAM_SOURCES = {
+    "api.upbit.com": "upbit",
+    "api.binance.com": "binance",
+    "api.bithumb.com": "bithumb",
+    "m.search.naver.com": "naver_fx",
+    "ac.stock.naver.com": "naver_autocomplete",
+    "polling.finance.naver.com": "naver_polling",
+    "api.stock.naver.com": "naver_marketindex",
+    "apis.naver.com": "naver_vibe",
+    "openapi.naver.com": "naver_image_search",
+    "ssl.pstatic.net": "pstatic",
+    "api.nasdaq.com": "nasdaq",
+    "open.er-api.com": "open_er",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Gauge = Tuple[str, Dict[str, str], float]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+_lock = threading.Lock()
+_histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_collectors: List[Callable[[], Iterable[Gauge]]] = []
+
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def observe(name: str, seconds: float, **labels):
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        histogram = series.get(_key(labels))
+        if histogram is None:
+            histogram = series[_key(labels)] = Histogram()
+        histogram.observe(seconds)
+
+
+def inc(name: str, amount: float = 1, **labels):
+    with _lock:
+        series = _counters.setdefault(name, {})
+        key = _key(labels)
+        series[key] = series.get(key, 0) + amount
+
+
+def register_collector(collector: Callable[[], Iterable[Gauge]]):
+    """Registers a callable that yields ``(name, labels, value)`` gauges at scrape time."""
+    _collectors.append(collector)
+
+
+@contextmanager
+def timer(name: str, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc(f"{name}_errors_total", **labels)
+        raise
+    finally:
+        observe(f"{name}_seconds", time.perf_counter() - started, **labels)
+
+
+def source_for(url: str) -> str:
+    host = urlparse(url).netloc or url
+    return UPSTREAM_SOURCES.get(host, host)
+
+
+@contextmanager
+def upstream(url_or_source: str):
+    """Times one upstream call; ``url_or_source`` is a URL or a bare source name such as ``gemini``."""
+    with timer("upstream_request", source=source_for(url_or_source)):
+        yield
+
+
+def track_replies(chat, command: str, received: float):
+    """Records the time from event receipt to the first ``reply``/``reply_media`` of a chat."""
+    state = {"replied": False}
+
+    def wrap(func: Callable, kind: str) -> Callable:
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if not state["replied"]:
+                    state["replied"] = True
+                    observe("command_first_reply_seconds", time.perf_counter() - received, command=command, kind=kind)
+        return wrapper
+
+    chat.reply = wrap(chat.reply, "text")
+    chat.reply_media = wrap(chat.reply_media, "media")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{value}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+def render() -> str:
+    lines: List[str] = []
+    with _lock:
+        for name in sorted(_counters):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in _counters[name].items():
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+        for name in sorted(_histograms):
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in _histograms[name].items():
+                for bound, count in zip(histogram.buckets, histogram.cumulative()):
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+    for collector in list(_collectors):
+        try:
+            for name, labels, value in collector():
+                lines.append(f"{name}{_format_labels(_key(labels))} {value:g}")
+        except Exception as e:
+            print(f"metrics collector failed: {e}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves ``/metrics`` in Prometheus text format from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,315 @@
+"""Holdings valuation for every registered user and their value history.
+
+Holdings are what ``!코인등록`` keeps per user in ``helper.userstate``
+(``{symbol: Holding(amount, average)}``). ``value()`` prices any number
+of users at once: their positions are flattened into NumPy arrays, priced
+from one ``upbit.tickers()`` call for the union of their symbols, and summed
+per user with ``np.bincount``.
+
+``start_recorder()`` values everyone at the top of each hour and at KST
+midnight and appends one fixed-size record per user to ``hourly.bin`` and
+``daily.bin`` under ``PORTFOLIO_DIR``. ``history`` keeps those series in
+memory, so ``!내코인`` can compare against yesterday or last week without
+fetching anything beyond the current tickers.
+"""
+import asyncio
+import bisect
+import concurrent.futures
+import datetime
+import operator
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pytz
+from helper import aio, metrics, upbit, userstate
+from helper.userstate import Holding
+
+PORTFOLIO_DIR = os.getenv("PORTFOLIO_DIR", "portfolio")
+KST = pytz.timezone("Asia/Seoul")
+
+HOURLY = "hourly"
+DAILY = "daily"
+RESOLUTIONS = {HOURLY: 60 * 60, DAILY: 24 * 60 * 60}
+# hourly records older than this are dropped when the log is compacted
+HOURLY_RETENTION = 14 * 24 * 60 * 60
+# seconds between recorder checks for a new hour or day
+RECORD_INTERVAL = 60.0
+# hourly records are checked against HOURLY_RETENTION at most this often while running
+COMPACT_INTERVAL = 24 * 60 * 60
+
+# bucket start (unix seconds), user id, value (KRW), cost (KRW)
+RECORD = struct.Struct("<Iqdd")
+_AT = operator.attrgetter("at")
+
+
+@dataclass(frozen=True)
+class Position:
+    symbol: str
+    amount: float
+    average: float
+    price: float
+    change: float
+
+    @property
+    def value(self) -> float:
+        return round(self.price * self.amount, 0)
+
+    @property
+    def cost(self) -> float:
+        return self.average * self.amount
+
+
+@dataclass(frozen=True)
+class Portfolio:
+    user_id: int
+    positions: Tuple[Position, ...]
+    value: float
+    cost: float
+    # held symbols Upbit has no KRW market or ticker for (delisted, or registered with a typo)
+    unlisted: Tuple[str, ...] = ()
+
+    @property
+    def pnl(self) -> float:
+        return self.value - self.cost
+
+
+@dataclass(frozen=True)
+class Point:
+    at: int
+    value: float
+    cost: float
+
+    @property
+    def pnl(self) -> float:
+        return self.value - self.cost
+
+
+def holdings(user_id) -> Dict[str, Holding]:
+    return userstate.holdings(user_id)
+
+
+def all_holdings() -> Dict[int, Dict[str, Holding]]:
+    """Holdings of every user with at least one registered coin."""
+    return userstate.all_holdings()
+
+
+def _markets(users: Dict[int, Dict[str, Holding]]) -> List[str]:
+    return sorted({"KRW-" + symbol for coins in users.values() for symbol in coins})
+
+
+def _listed_tickers(users: Dict[int, Dict[str, Holding]]) -> List[Dict[str, Any]]:
+    """One ticker batch for the users' markets that Upbit lists.
+
+    An unknown market makes Upbit fail the whole batch, so markets missing
+    from the catalog are dropped first; their positions end up in
+    ``Portfolio.unlisted``.
+    """
+    listed = set(upbit.krw_markets(upbit.catalog()))
+    markets = _markets(users)
+    dropped = [market for market in markets if market not in listed]
+    if dropped:
+        metrics.inc("portfolio_unlisted_markets_total", len(dropped))
+        print(f"[portfolio] not listed on Upbit, left out: {', '.join(dropped)}")
+    markets = [market for market in markets if market in listed]
+    return upbit.tickers(markets, check=False) if markets else []
+
+
+def value(users: Dict[int, Dict[str, Holding]], tickers: Iterable[Dict[str, Any]]) -> Dict[int, Portfolio]:
+    """Values every user's holdings against ``tickers``; positions without a ticker go to ``unlisted``."""
+    quotes = {row["market"][4:]: row for row in tickers if isinstance(row, dict) and "market" in row}
+    owners, symbols, amounts, averages = [], [], [], []
+    user_ids = list(users)
+    for index, user_id in enumerate(user_ids):
+        for symbol, holding in users[user_id].items():
+            if symbol in quotes:
+                owners.append(index)
+                symbols.append(symbol)
+                amounts.append(holding.amount)
+                averages.append(holding.average)
+    owner = np.asarray(owners, dtype=np.intp)
+    amount = np.asarray(amounts, dtype=np.float64)
+    average = np.asarray(averages, dtype=np.float64)
+    price = np.asarray([quotes[symbol]["trade_price"] for symbol in symbols], dtype=np.float64)
+    change = np.asarray([quotes[symbol]["signed_change_rate"] * 100 for symbol in symbols], dtype=np.float64)
+    values = np.round(price * amount, 0)
+    costs = average * amount
+    value_totals = np.bincount(owner, weights=values, minlength=len(user_ids))
+    cost_totals = np.bincount(owner, weights=costs, minlength=len(user_ids))
+
+    positions: Dict[int, List[Position]] = defaultdict(list)
+    for i, index in enumerate(owners):
+        positions[index].append(Position(symbols[i], float(amount[i]), float(average[i]), float(price[i]), float(change[i])))
+    return {
+        user_id: Portfolio(
+            user_id,
+            tuple(positions[index]),
+            float(value_totals[index]),
+            float(cost_totals[index]),
+            tuple(symbol for symbol in users[user_id] if symbol not in quotes),
+        )
+        for index, user_id in enumerate(user_ids)
+    }
+
+
+def value_all() -> Dict[int, Portfolio]:
+    users = all_holdings()
+    if not users:
+        return {}
+    return value(users, _listed_tickers(users))
+
+
+def value_user(user_id) -> Optional[Portfolio]:
+    coins = holdings(user_id)
+    if not coins:
+        return None
+    users = {int(user_id): coins}
+    return value(users, _listed_tickers(users))[int(user_id)]
+
+
+class History:
+    """Append-only per-resolution value log, mirrored in memory as sorted per-user series."""
+
+    def __init__(self, directory: str = PORTFOLIO_DIR):
+        self.directory = directory
+        self._series: Dict[str, Dict[int, List[Point]]] = {resolution: defaultdict(list) for resolution in RESOLUTIONS}
+        self._last: Dict[str, int] = {resolution: 0 for resolution in RESOLUTIONS}
+        # when hourly records were last cut back to HOURLY_RETENTION
+        self._compacted = 0.0
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _path(self, resolution: str) -> str:
+        return os.path.join(self.directory, f"{resolution}.bin")
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        for resolution in RESOLUTIONS:
+            try:
+                with open(self._path(resolution), "rb") as fp:
+                    data = fp.read()
+            except FileNotFoundError:
+                continue
+            usable = len(data) - len(data) % RECORD.size
+            if usable != len(data):
+                # drop a record torn by a crash mid-append so later appends stay aligned
+                os.truncate(self._path(resolution), usable)
+            for at, user_id, value_, cost in RECORD.iter_unpack(data[:usable]):
+                self._add(resolution, user_id, Point(at, value_, cost))
+        self._compacted = time.time()
+        self._compact(HOURLY, self._compacted - HOURLY_RETENTION)
+
+    def _add(self, resolution: str, user_id: int, point: Point):
+        series = self._series[resolution][user_id]
+        if series and series[-1].at >= point.at:
+            bisect.insort_right(series, point, key=_AT)
+        else:
+            series.append(point)
+        self._last[resolution] = max(self._last[resolution], point.at)
+
+    def _compact(self, resolution: str, before: float):
+        series = self._series[resolution]
+        if not any(points and points[0].at < before for points in series.values()):
+            return
+        for user_id in list(series):
+            series[user_id] = [point for point in series[user_id] if point.at >= before]
+            if not series[user_id]:
+                del series[user_id]
+        records = sorted((point.at, user_id, point.value, point.cost) for user_id, points in series.items() for point in points)
+        path = self._path(resolution)
+        with open(path + ".tmp", "wb") as fp:
+            fp.write(b"".join(RECORD.pack(*record) for record in records))
+        os.replace(path + ".tmp", path)
+
+    def last(self, resolution: str) -> int:
+        with self._lock:
+            self._load()
+            return self._last[resolution]
+
+    def append(self, resolution: str, at: int, portfolios: Iterable[Portfolio]):
+        with self._lock:
+            self._load()
+            points = [(portfolio.user_id, Point(at, portfolio.value, portfolio.cost)) for portfolio in portfolios]
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(resolution), "ab") as fp:
+                fp.write(b"".join(RECORD.pack(point.at, user_id, point.value, point.cost) for user_id, point in points))
+            for user_id, point in points:
+                self._add(resolution, user_id, point)
+            self._last[resolution] = max(self._last[resolution], at)
+            if resolution == HOURLY and at - self._compacted >= COMPACT_INTERVAL:
+                # a bot that runs for weeks would otherwise keep every hour until it restarts
+                self._compacted = at
+                self._compact(HOURLY, at - HOURLY_RETENTION)
+        metrics.inc("portfolio_snapshots_total", len(points), resolution=resolution)
+
+    def at(self, user_id: int, seconds_ago: float, now: Optional[float] = None) -> Optional[Point]:
+        """The record closest to ``seconds_ago`` before ``now``, from hourly records while they are kept, else daily."""
+        target = (time.time() if now is None else now) - seconds_ago
+        order = (HOURLY, DAILY) if seconds_ago < HOURLY_RETENTION else (DAILY, HOURLY)
+        with self._lock:
+            self._load()
+            for resolution in order:
+                series = self._series[resolution].get(int(user_id))
+                if not series:
+                    continue
+                index = bisect.bisect_left(series, target, key=_AT)
+                nearby = [point for point in series[max(index - 1, 0):index + 1] if abs(point.at - target) <= RESOLUTIONS[resolution]]
+                if nearby:
+                    return min(nearby, key=lambda point: abs(point.at - target))
+        return None
+
+
+history = History()
+_recorder_task: Optional[concurrent.futures.Future] = None
+
+
+def _day_start(now: float) -> int:
+    local = datetime.datetime.fromtimestamp(now, KST)
+    return int(KST.localize(datetime.datetime(local.year, local.month, local.day)).timestamp())
+
+
+def record(now: Optional[float] = None) -> int:
+    """Appends an hourly and/or daily snapshot of every portfolio if one is due; returns the users recorded."""
+    now = time.time() if now is None else now
+    hour = int(now // RESOLUTIONS[HOURLY] * RESOLUTIONS[HOURLY])
+    day = _day_start(now)
+    due = [(resolution, at) for resolution, at in ((HOURLY, hour), (DAILY, day)) if history.last(resolution) < at]
+    if not due:
+        return 0
+    portfolios = [portfolio for portfolio in value_all().values() if portfolio.positions]
+    for resolution, at in due:
+        history.append(resolution, at, portfolios)
+    return len(portfolios)
+
+
+async def _run_recorder():
+    while True:
+        try:
+            await asyncio.to_thread(record)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.inc("portfolio_record_errors_total")
+            print(f"[portfolio] snapshot failed: {e}")
+        await asyncio.sleep(RECORD_INTERVAL)
+
+
+def start_recorder():
+    """Starts the background snapshot recorder once; safe to call again."""
+    global _recorder_task
+    if _recorder_task is None or _recorder_task.done():
+        _recorder_task = aio.submit(_run_recorder())
+
+
+def stop_recorder():
+    global _recorder_task
+    if _recorder_task is not None:
+        _recorder_task.cancel()
+        _recorder_task = None
@@ -0,0 +1,127 @@
+"""One coin's price on Upbit, Bithumb and Binance, fetched from all of them at once.
+
+``compare_async()`` starts every exchange read together on the ``helper.aio``
+loop, each under its own deadline from ``DEADLINES``, and returns once every
+source has answered or run out of time, so the wait is the longest deadline
+at most rather than the sum of the exchanges. A source that misses its
+deadline comes back as ``TIMEOUT`` instead of failing the reply. Its request
+is not wasted: shared fetches run behind ``asyncio.shield`` and still fill
+the cache for the next caller.
+
+    quotes.compare("WLD")  # [Quote(source="upbit", status="ok", ...), ...]
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from helper import aio, binance, bithumb, fx, metrics, upbit
+
+UPBIT = "upbit"
+BITHUMB = "bithumb"
+BINANCE = "binance"
+SOURCES = (UPBIT, BITHUMB, BINANCE)
+# seconds each source may take before the reply goes out without it
+DEADLINES: Dict[str, float] = {UPBIT: 1.5, BITHUMB: 1.5, BINANCE: 2.0}
+
+OK = "ok"
+MISSING = "missing"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+
+@dataclass(frozen=True)
+class Quote:
+    source: str
+    status: str
+    # exchange's own quote currency: KRW for Upbit and Bithumb, USDT for Binance
+    price: Optional[float] = None
+    change: Optional[float] = None
+    krw: Optional[float] = None
+    elapsed: float = 0.0
+
+
+async def _krw_market(client, symbol: str) -> Optional[Tuple[float, float, float]]:
+    rows = await client.tickers_async(["KRW-" + symbol], check=False)
+    if not isinstance(rows, list) or not rows:
+        return None
+    return rows[0]["trade_price"], rows[0]["signed_change_rate"] * 100, rows[0]["trade_price"]
+
+
+async def _upbit(symbol: str):
+    return await _krw_market(upbit, symbol)
+
+
+async def _bithumb(symbol: str):
+    return await _krw_market(bithumb, symbol)
+
+
+async def _binance(symbol: str):
+    pair = symbol + "USDT"
+    tickers, usd_krw = await asyncio.gather(binance.tickers_async([pair]), fx.usd_krw_async())
+    row = tickers[pair]
+    return row["last_price"], row["change_percent"], row["last_price"] * usd_krw
+
+
+FETCHERS = {UPBIT: _upbit, BITHUMB: _bithumb, BINANCE: _binance}
+
+
+async def _quote(source: str, symbol: str, deadline: float) -> Quote:
+    started = time.perf_counter()
+    found = None
+    try:
+        found = await asyncio.wait_for(FETCHERS[source](symbol), deadline)
+        status = OK if found else MISSING
+    except asyncio.TimeoutError:
+        status = TIMEOUT
+    except KeyError:
+        # Binance's targeted ticker leaves unlisted symbols out
+        status = MISSING
+    except Exception as e:
+        # Binance answers 400 for a symbol it does not list
+        status = MISSING if getattr(e, "status", None) == 400 else ERROR
+        if status == ERROR:
+            print(f"[quotes] {source} {symbol} failed: {e}")
+    elapsed = time.perf_counter() - started
+    metrics.inc("quote_fanout_total", source=source, status=status)
+    metrics.observe("quote_fanout_seconds", elapsed, source=source)
+    if found is None:
+        return Quote(source, status, elapsed=elapsed)
+    price, change, krw = found
+    return Quote(source, status, price, change, krw, elapsed)
+
+
+async def compare_async(symbol: str, deadlines: Optional[Dict[str, float]] = None) -> List[Quote]:
+    """Quotes for ``symbol`` (``"WLD"``) from every source, in ``SOURCES`` order."""
+    deadlines = {**DEADLINES, **(deadlines or {})}
+    return list(await asyncio.gather(*(_quote(source, symbol, deadlines[source]) for source in SOURCES)))
+
+
+def compare(symbol: str, deadlines: Optional[Dict[str, float]] = None) -> List[Quote]:
+    return aio.run(compare_async(symbol, deadlines))
+
+
+async def resolve_async(query: str) -> Optional[str]:
+    """The symbol for what users type: ``wld`` as is, names like ``월드코인`` through the Upbit and Bithumb catalogs.
+
+    ``None`` when the name is ambiguous or no catalog could be read.
+    """
+    query = query.strip()
+    if query.isascii() and query.isalnum():
+        return query.upper()
+    for source, client in ((UPBIT, upbit), (BITHUMB, bithumb)):
+        # a cold catalog is a request too, so it gets the source's deadline
+        try:
+            matches = await asyncio.wait_for(client.search_async(query), DEADLINES[source])
+        except asyncio.TimeoutError:
+            metrics.inc("quote_resolve_total", source=source, status=TIMEOUT)
+            continue
+        except Exception as e:
+            # a catalog that cannot be read is skipped like a slow one; the next source may still know the name
+            metrics.inc("quote_resolve_total", source=source, status=ERROR)
+            print(f"[quotes] {source} catalog search for {query} failed: {e}")
+            continue
+        # Bithumb is only asked about names Upbit does not know at all
+        if matches:
+            return matches[0]["market"][4:] if len(matches) == 1 else None
+    return None
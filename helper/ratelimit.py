@@ -0,0 +1,139 @@
+"""Token buckets per user and per room for each command class (lane).
+
+A command is admitted only if both the sender's and the room's bucket for
+its lane hold enough tokens for the command's cost; tokens refill
+continuously. Buckets live in one dict as ``[tokens, updated, notified]``
+and are dropped once they would have refilled completely, so idle users
+cost nothing.
+
+    limiter = RateLimiter({"ai": ClassLimit(user=Limit(2, 1 / 60), room=Limit(5, 5 / 60))})
+
+    @bot.on_event("message")
+    @is_not_banned
+    @limiter.guard(registry)
+    def on_message(chat): ...
+"""
+import functools
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional
+
+from helper import metrics
+
+LIMITED_MESSAGE = "요청이 너무 잦습니다. {seconds}초 후 다시 시도해주세요."
+
+# seconds between sweeps of fully refilled buckets
+SWEEP_INTERVAL = 60.0
+
+USER = "user"
+ROOM = "room"
+
+
+@dataclass(frozen=True)
+class Limit:
+    capacity: float
+    refill_per_sec: float
+
+    @property
+    def time_to_full(self) -> float:
+        return self.capacity / self.refill_per_sec
+
+
+@dataclass(frozen=True)
+class ClassLimit:
+    user: Optional[Limit] = None
+    room: Optional[Limit] = None
+
+
+class RateLimiter:
+    def __init__(self, classes: Dict[str, ClassLimit]):
+        self.classes = classes
+        # bench/replay.py turns this off to measure handlers rather than the limits
+        self.enabled = True
+        self._buckets: Dict[Hashable, List[float]] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.rejected = 0
+        metrics.register_collector(self._collect)
+
+    def _bucket(self, key: Hashable, limit: Limit, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [limit.capacity, now, 0]
+        else:
+            bucket[0] = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.refill_per_sec)
+            bucket[1] = now
+        return bucket
+
+    def acquire(self, lane: Optional[str], user_id, room_id, cost: float = 1) -> float:
+        """Takes ``cost`` tokens from the user and room buckets of ``lane``.
+
+        Returns 0 when admitted, otherwise the seconds until the request would
+        fit (nothing is taken in that case). A bucket never refills past its
+        capacity, so a cost above it is capped there and takes the whole bucket.
+        """
+        class_limit = self.classes.get(lane) if lane is not None and self.enabled else None
+        if class_limit is None:
+            return 0.0
+        scoped = [(USER, user_id, class_limit.user), (ROOM, room_id, class_limit.room)]
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep >= SWEEP_INTERVAL:
+                self._sweep(now)
+            buckets = [(scope, self._bucket((lane, scope, ident), limit, now), limit) for scope, ident, limit in scoped if limit is not None]
+            wait = 0.0
+            for scope, bucket, limit in buckets:
+                taken = min(cost, limit.capacity)
+                if bucket[0] < taken:
+                    wait = max(wait, (taken - bucket[0]) / limit.refill_per_sec)
+                    metrics.inc("ratelimit_rejected_total", lane=lane, scope=scope)
+            if wait:
+                self.rejected += 1
+                return wait
+            for _, bucket, limit in buckets:
+                bucket[0] -= min(cost, limit.capacity)
+                bucket[2] = 0
+            return 0.0
+
+    def should_notify(self, lane: str, user_id, room_id) -> bool:
+        """True once per rejection streak, so a spammer gets one notice instead of one per message.
+
+        The streak is the user's, or the room's for a lane that only limits rooms.
+        """
+        key = (lane, USER, user_id) if self.classes[lane].user is not None else (lane, ROOM, room_id)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket[2]:
+                return False
+            bucket[2] = 1
+            return True
+
+    def _sweep(self, now: float):
+        self._last_sweep = now
+        for key in [key for key, bucket in self._buckets.items() if now - bucket[1] >= self._limit(key).time_to_full]:
+            del self._buckets[key]
+
+    def _limit(self, key) -> Limit:
+        lane, scope, _ = key
+        return getattr(self.classes[lane], scope)
+
+    def guard(self, registry) -> Callable:
+        """Decorator for the message handler that drops commands over their lane's limits."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(chat, *args, **kwargs):
+                command = registry.get(chat.message.command)
+                if command is not None:
+                    wait = self.acquire(command.lane, chat.sender.id, chat.room.id, command.cost(chat))
+                    if wait:
+                        if self.should_notify(command.lane, chat.sender.id, chat.room.id):
+                            chat.reply(LIMITED_MESSAGE.format(seconds=math.ceil(wait)))
+                        return None
+                return func(chat, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _collect(self):
+        yield "ratelimit_buckets", {}, len(self._buckets)
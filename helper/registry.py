@@ -0,0 +1,121 @@
+import asyncio
+import importlib
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Union
+
+from helper.dispatcher import NORMAL
+
+
+class Command:
+    """A registered command whose handler module is imported on first call.
+
+    ``target`` is either a callable or a ``"package.module:function"`` string.
+    ``async_target`` optionally names a coroutine function with the same
+    signature, used instead of ``target`` when the bot runs with ``IRIS_ASYNC=1``.
+    ``cost`` is the number of rate-limit tokens a call takes, either a number
+    or a function of the ``ChatContext``; ``priority`` (``helper.dispatcher.HIGH``/
+    ``NORMAL``/``LOW``) orders it within its lane and may be a function too.
+    """
+
+    def __init__(self, registry: "CommandRegistry", target: Union[str, Callable], lane: Optional[str], needs_link: bool, async_target: Union[str, Callable, None] = None, cost: Union[float, Callable] = 1, priority: Union[int, Callable] = NORMAL):
+        self._registry = registry
+        self.target = target
+        self.async_target = async_target
+        self.lane = lane
+        self.needs_link = needs_link
+        self._cost = cost
+        self._priority = priority
+        self._handler: Optional[Callable] = target if callable(target) else None
+        self._async_handler: Optional[Callable] = async_target if callable(async_target) else None
+
+    @property
+    def loaded(self) -> bool:
+        return self._handler is not None
+
+    def resolve(self) -> Callable:
+        if self._handler is None:
+            self._handler = self._registry._load(self.target)
+        return self._handler
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def cost(self, chat) -> float:
+        return self._cost(chat) if callable(self._cost) else self._cost
+
+    def priority(self, chat) -> int:
+        return self._priority(chat) if callable(self._priority) else self._priority
+
+    def resolve_async(self) -> Callable:
+        if self._async_handler is None:
+            self._async_handler = self._registry._load(self.async_target)
+        return self._async_handler
+
+    async def call_async(self, *args, **kwargs):
+        if self._async_handler is None:
+            # the first import would otherwise stall every coroutine on the loop
+            await asyncio.to_thread(self.resolve_async)
+        return await self._async_handler(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"Command(target={self.target!r}, lane={self.lane!r})"
+
+
+class CommandRegistry:
+    """Maps command strings and their aliases to handlers with a single dict lookup."""
+
+    def __init__(self):
+        self._commands: Dict[str, Command] = {}
+        self._lock = threading.Lock()
+        self.import_times: Dict[str, float] = {}
+
+    def register(self, names: Union[str, Iterable[str]], target: Union[str, Callable], lane: Optional[str] = None, needs_link: bool = False, async_target: Union[str, Callable, None] = None, cost: Union[float, Callable] = 1, priority: Union[int, Callable] = NORMAL) -> Command:
+        if isinstance(names, str):
+            names = [names]
+        if async_target is not None and lane is None:
+            raise ValueError("async handlers need a lane")
+        command = Command(self, target, lane, needs_link, async_target, cost, priority)
+        for name in names:
+            if name in self._commands:
+                raise ValueError(f"Command already registered: {name}")
+            self._commands[name] = command
+        return command
+
+    def get(self, name: str) -> Optional[Command]:
+        return self._commands.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._commands
+
+    def commands(self) -> Dict[str, Command]:
+        return dict(self._commands)
+
+    def _load(self, target: str) -> Callable:
+        module_name, _, attr = target.partition(":")
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            if module_name not in self.import_times:
+                self.import_times[module_name] = elapsed
+                print(f"[registry] {module_name} imported in {elapsed * 1000:.1f} ms")
+        return getattr(module, attr)
+
+    def preload(self):
+        """Imports every handler module, e.g. from a background thread after startup."""
+        for command in set(self._commands.values()):
+            try:
+                command.resolve()
+                if command.async_target is not None:
+                    command.resolve_async()
+            except Exception as e:
+                print(f"[registry] failed to load {command.target}: {e}")
+
+    def import_report(self) -> str:
+        if not self.import_times:
+            return "아직 불러온 모듈이 없습니다."
+        rows = sorted(self.import_times.items(), key=lambda item: item[1], reverse=True)
+        lines = [f"{name} : {elapsed * 1000:,.1f} ms" for name, elapsed in rows]
+        total = sum(self.import_times.values())
+        return "모듈 로딩 시간\n" + "\n".join(lines) + f"\n합계 : {total * 1000:,.1f} ms"
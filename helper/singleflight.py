@@ -0,0 +1,68 @@
+"""Request coalescing: concurrent calls with the same key share one in-flight execution.
+
+``Group.do`` is for worker threads and ``Group.do_async`` for coroutines on
+the ``helper.aio`` loop. Only calls that overlap in time are merged; nothing
+is remembered once the leader finishes, so this never serves stale data.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from helper import metrics
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class Group:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], **labels) -> Any:
+        """Runs ``fn`` unless an identical call is already running, in which case its result is shared."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.inc("singleflight_shared_total", group=self.name, **labels)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable], **labels) -> Any:
+        """Coroutine counterpart of ``do``; must be awaited on the aio loop."""
+        future = self._futures.get(key)
+        if future is not None:
+            metrics.inc("singleflight_shared_total", group=self.name, **labels)
+        else:
+            future = self._futures[key] = asyncio.ensure_future(fn())
+            future.add_done_callback(lambda done: self._futures.pop(key, None) if self._futures.get(key) is done else None)
+        # a cancelled waiter must not cancel the fetch the other waiters share
+        return await asyncio.shield(future)
+
+    def inflight(self) -> int:
+        return len(self._calls) + len(self._futures)
@@ -0,0 +1,306 @@
+"""Upbit market data: catalog, tickers, and a live WebSocket price book.
+
+``start_stream()`` subscribes to the ``ticker`` stream for every KRW market on
+the shared ``helper.aio`` loop and keeps the latest trade price, signed change
+rate and 24h volume per market in ``book``. ``tickers()`` answers from the
+book while the stream is healthy and falls back to the cached REST endpoint
+when it is not running, has gone quiet, or lacks a requested market, so
+callers never need to know which one served them.
+
+Rows from either source have the REST ``/v1/ticker`` shape::
+
+    {"market": "KRW-BTC", "trade_price": ..., "signed_change_rate": ...,
+     "change_rate": ..., "acc_trade_volume_24h": ..., "acc_trade_price_24h": ...,
+     "timestamp": ...}
+
+``search()`` resolves what users type after ``!코인`` (``BTC``, ``비트``,
+``bitcoin``, ``ㅂㅌ``) against an index of the cached KRW catalog, so a
+Korean name costs no request beyond the ticker itself.
+"""
+import asyncio
+import bisect
+import concurrent.futures
+import difflib
+import json
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from helper import aio, cache, metrics
+
+MARKET_ALL_URL = "https://api.upbit.com/v1/market/all"
+TICKER_URL = "https://api.upbit.com/v1/ticker?markets="
+WS_URL = os.getenv("UPBIT_WS_URL", "wss://api.upbit.com/websocket/v1")
+
+# seconds without any stream message before the book is treated as down
+MAX_SILENCE = 10.0
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 30.0
+
+# SIMPLE-format ticker fields -> REST field names
+_SIMPLE_FIELDS = {
+    "cd": "market",
+    "tp": "trade_price",
+    "scr": "signed_change_rate",
+    "cr": "change_rate",
+    "atv24h": "acc_trade_volume_24h",
+    "atp24h": "acc_trade_price_24h",
+    "tms": "timestamp",
+}
+
+
+class PriceBook:
+    """Latest ticker row per market, written by the stream and read by any thread.
+
+    Rows are replaced, never mutated, so readers need no lock. ``listeners``
+    are called with every new row on the stream's event loop and must not
+    block.
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.connected = False
+        self.last_message = 0.0
+        self.messages = 0
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def update(self, row: Dict[str, Any]):
+        self.rows[row["market"]] = row
+        self.last_message = time.monotonic()
+        self.messages += 1
+        for listener in self.listeners:
+            try:
+                listener(row)
+            except Exception as e:
+                print(f"[upbit] book listener failed: {e}")
+
+    @property
+    def live(self) -> bool:
+        return self.connected and time.monotonic() - self.last_message < MAX_SILENCE
+
+    def get_many(self, markets: Iterable[str]) -> Optional[List[Dict[str, Any]]]:
+        """Rows for every market, or ``None`` if the book is down or any market is missing."""
+        if not self.live:
+            return None
+        rows = self.rows
+        try:
+            return [rows[market] for market in markets]
+        except KeyError:
+            return None
+
+
+book = PriceBook()
+_stream_task: Optional[concurrent.futures.Future] = None
+
+
+def catalog() -> List[Dict[str, Any]]:
+    return cache.get_json(MARKET_ALL_URL, "upbit_catalog")
+
+
+async def catalog_async() -> List[Dict[str, Any]]:
+    return await cache.get_json_async(MARKET_ALL_URL, "upbit_catalog")
+
+
+def krw_markets(markets: Iterable[Dict[str, Any]]) -> List[str]:
+    return [market["market"] for market in markets if market["market"].startswith("KRW-")]
+
+
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+# difflib ratio a name must reach to be offered as a fuzzy match
+FUZZY_CUTOFF = 0.6
+
+
+def chosung(text: str) -> str:
+    """Initial consonants of the Hangul syllables in ``text``; other characters pass through."""
+    return "".join(CHOSUNG[(ord(char) - 0xAC00) // 588] if "가" <= char <= "힣" else char for char in text)
+
+
+def _normalize(text: str) -> str:
+    return "".join(text.split()).upper()
+
+
+class MarketIndex:
+    """KRW markets indexed by symbol, Korean name, English name and Korean initial consonants.
+
+    ``search()`` returns the best tier of matches that is not empty: exact
+    symbol, then exact name, then prefix, then substring, then fuzzy. More
+    than one market means the query was ambiguous.
+    """
+
+    def __init__(self, markets: Iterable[Dict[str, Any]]):
+        self.markets = [market for market in markets if market["market"].startswith("KRW-")]
+        self._keys: Dict[str, List[Tuple[str, int]]] = {}
+        for position, market in enumerate(self.markets):
+            for field, key in self._fields(market).items():
+                self._keys.setdefault(field, []).append((key, position))
+        for keys in self._keys.values():
+            keys.sort()
+        # a query that is one market's symbol and another's name means the symbol
+        self._symbols: Dict[str, List[int]] = {}
+        for key, position in self._keys.get("symbol", []):
+            self._symbols.setdefault(key, []).append(position)
+        self._names: Dict[str, List[int]] = {}
+        for field in ("korean", "english", "chosung"):
+            for key, position in self._keys.get(field, []):
+                self._names.setdefault(key, []).append(position)
+
+    @staticmethod
+    def _fields(market: Dict[str, Any]) -> Dict[str, str]:
+        korean = _normalize(market.get("korean_name", ""))
+        return {
+            "symbol": market["market"][4:],
+            "korean": korean,
+            "english": _normalize(market.get("english_name", "")),
+            "chosung": chosung(korean),
+        }
+
+    def _prefixed(self, query: str) -> List[int]:
+        found = []
+        for keys in self._keys.values():
+            start = bisect.bisect_left(keys, (query,))
+            for key, position in keys[start:]:
+                if not key.startswith(query):
+                    break
+                found.append(position)
+        return found
+
+    def _containing(self, query: str) -> List[int]:
+        return [position for keys in self._keys.values() for key, position in keys if query in key]
+
+    def _fuzzy(self, query: str) -> List[int]:
+        names = {}
+        for field in ("korean", "english"):
+            for key, position in self._keys.get(field, []):
+                names.setdefault(key, position)
+        return [names[name] for name in difflib.get_close_matches(query, names, n=5, cutoff=FUZZY_CUTOFF)]
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        query = _normalize(query)
+        if not query:
+            return []
+        positions = self._symbols.get(query) or self._names.get(query) or self._prefixed(query) or self._containing(query)
+        if positions:
+            # shorter names first, so "비트" lists 비트코인 before 비트코인캐시
+            positions = sorted(dict.fromkeys(positions), key=lambda position: len(self.markets[position].get("korean_name", "")))
+            return [self.markets[position] for position in positions]
+        # already ordered by similarity
+        return [self.markets[position] for position in dict.fromkeys(self._fuzzy(query))]
+
+
+_index: Optional[MarketIndex] = None
+_indexed_catalog: Optional[list] = None
+
+
+def market_index(markets: Optional[List[Dict[str, Any]]] = None) -> MarketIndex:
+    """Index of ``markets`` (the cached catalog by default), rebuilt only when the catalog is refreshed."""
+    global _index, _indexed_catalog
+    markets = catalog() if markets is None else markets
+    # the cache hands out the same list until it reloads the catalog
+    if markets is not _indexed_catalog:
+        _index, _indexed_catalog = MarketIndex(markets), markets
+    return _index
+
+
+def search(query: str) -> List[Dict[str, Any]]:
+    return market_index().search(query)
+
+
+async def search_async(query: str) -> List[Dict[str, Any]]:
+    return market_index(await catalog_async()).search(query)
+
+
+def tickers(markets: List[str], check: bool = True):
+    """Ticker rows for ``markets`` in order.
+
+    With ``check=False`` an unknown market yields Upbit's error body (a dict
+    with ``"error"``) instead of raising, like the REST endpoint.
+    """
+    rows = book.get_many(markets)
+    if rows is not None:
+        metrics.inc("upbit_ticker_reads_total", source="book")
+        return rows
+    metrics.inc("upbit_ticker_reads_total", source="rest")
+    return cache.get_json(TICKER_URL + ",".join(markets), "upbit_ticker", check=check)
+
+
+async def tickers_async(markets: List[str], check: bool = True):
+    rows = book.get_many(markets)
+    if rows is not None:
+        metrics.inc("upbit_ticker_reads_total", source="book")
+        return rows
+    metrics.inc("upbit_ticker_reads_total", source="rest")
+    return await cache.get_json_async(TICKER_URL + ",".join(markets), "upbit_ticker", check=check)
+
+
+def parse_ticker(payload: Dict[str, Any]) -> Dict[str, Any]:
+    if "cd" in payload:
+        return {name: payload.get(short) for short, name in _SIMPLE_FIELDS.items()}
+    return {name: payload.get("code" if name == "market" else name) for name in _SIMPLE_FIELDS.values()}
+
+
+async def _consume(url: str, markets: List[str]):
+    import aiohttp
+
+    subscribe = [
+        {"ticket": f"irispy-{uuid.uuid4()}"},
+        {"type": "ticker", "codes": markets},
+        {"format": "SIMPLE"},
+    ]
+    async with aio.session().ws_connect(url, heartbeat=30) as ws:
+        await ws.send_str(json.dumps(subscribe))
+        book.connected = True
+        print(f"[upbit] stream subscribed to {len(markets)} markets")
+        async for message in ws:
+            if message.type in (aiohttp.WSMsgType.BINARY, aiohttp.WSMsgType.TEXT):
+                payload = json.loads(message.data)
+                if payload.get("ty", payload.get("type")) == "ticker":
+                    book.update(parse_ticker(payload))
+            elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                break
+
+
+async def _run_stream(url: str):
+    delay = RECONNECT_MIN
+    while True:
+        started = time.monotonic()
+        try:
+            markets = krw_markets(await catalog_async())
+            await _consume(url, markets)
+        except asyncio.CancelledError:
+            book.connected = False
+            raise
+        except Exception as e:
+            print(f"[upbit] stream error: {e}")
+        book.connected = False
+        metrics.inc("upbit_stream_disconnects_total")
+        # a connection that stayed up for a while resets the backoff
+        if time.monotonic() - started > RECONNECT_MAX:
+            delay = RECONNECT_MIN
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RECONNECT_MAX)
+
+
+def start_stream(url: str = WS_URL):
+    """Starts the background subscriber once; safe to call again."""
+    global _stream_task
+    if _stream_task is None or _stream_task.done():
+        _stream_task = aio.submit(_run_stream(url))
+
+
+def stop_stream():
+    global _stream_task
+    if _stream_task is not None:
+        _stream_task.cancel()
+        _stream_task = None
+    book.connected = False
+
+
+def _collect():
+    yield "upbit_book_markets", {}, len(book.rows)
+    yield "upbit_book_live", {}, int(book.live)
+    if book.last_message:
+        yield "upbit_book_age_seconds", {}, time.monotonic() - book.last_message
+
+
+metrics.register_collector(_collect)
@@ -0,0 +1,272 @@
+"""Per-user coin holdings and favorites, cached in memory and written back to PyKV in batches.
+
+Holdings (``!코인등록``) are stored under ``coin.<user id>`` as
+``{symbol: {"amount": ..., "average": ...}}`` and favorites (``!즐찾등록``)
+under ``favorite.<user id>`` as ``{symbol: true}``. Favorites used to be
+written into ``coin.<user id>`` as well; the first load of a user moves any
+such entries to ``favorite.<user id>``.
+
+A user's state is read from PyKV once and then served from memory. Changes
+go through ``update_holdings()``/``update_favorites()``, which apply them
+under that user's lock, so two commands from the same user run one after the
+other instead of overwriting each other's read-modify-write, and mark the key
+dirty. ``start_flusher()`` writes every dirty key every ``FLUSH_INTERVAL``
+seconds, one ``put`` per key however many changes it collected; ``flush()``
+writes immediately and also runs at interpreter exit.
+
+    userstate.update_holdings(user_id, lambda coins: coins.update(BTC=Holding(0.5, 90_000_000)))
+    userstate.holdings(user_id)  # {"BTC": Holding(amount=0.5, average=90000000)}
+"""
+import asyncio
+import atexit
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar
+
+from iris import PyKV
+
+from helper import aio, metrics
+
+HOLDINGS_PREFIX = "coin."
+FAVORITES_PREFIX = "favorite."
+HOLDINGS = "holdings"
+FAVORITES = "favorites"
+PREFIXES = {HOLDINGS: HOLDINGS_PREFIX, FAVORITES: FAVORITES_PREFIX}
+# seconds between write-backs of dirty users
+FLUSH_INTERVAL = 2.0
+
+R = TypeVar("R")
+
+
+@dataclass(frozen=True)
+class Holding:
+    amount: float
+    average: float
+
+    @property
+    def cost(self) -> float:
+        return self.amount * self.average
+
+
+class _User:
+    __slots__ = ("lock", "holdings", "favorites")
+
+    def __init__(self, holdings: Dict[str, Holding], favorites: List[str]):
+        self.lock = threading.Lock()
+        self.holdings = holdings
+        self.favorites = favorites
+
+
+def _holdings(stored: Any) -> Dict[str, Holding]:
+    if not isinstance(stored, dict):
+        return {}
+    return {
+        symbol: Holding(float(info["amount"]), float(info["average"]))
+        for symbol, info in stored.items()
+        if isinstance(info, dict) and "amount" in info and "average" in info
+    }
+
+
+def _legacy_favorites(stored: Any) -> List[str]:
+    # favorites written into coin.<user id> before they had their own key
+    return [symbol for symbol, info in stored.items() if info is True] if isinstance(stored, dict) else []
+
+
+def _encode(namespace: str, user: _User) -> dict:
+    if namespace == HOLDINGS:
+        return {symbol: {"amount": holding.amount, "average": holding.average} for symbol, holding in user.holdings.items()}
+    return {symbol: True for symbol in user.favorites}
+
+
+class UserStates:
+    """Every loaded user's holdings and favorites, plus the keys waiting to be written."""
+
+    def __init__(self):
+        self._users: Dict[int, _User] = {}
+        self._dirty: Set[Tuple[int, str]] = set()
+        self._lock = threading.Lock()
+        self.writes = 0
+        metrics.register_collector(self._collect)
+
+    def user(self, user_id) -> _User:
+        user_id = int(user_id)
+        user = self._users.get(user_id)
+        if user is not None:
+            return user
+        # loaded outside the lock so a slow PyKV read only holds up this user's first command
+        kv = PyKV()
+        coins = kv.get(f"{HOLDINGS_PREFIX}{user_id}")
+        stored = kv.get(f"{FAVORITES_PREFIX}{user_id}")
+        legacy = _legacy_favorites(coins)
+        favorites = list(stored) if isinstance(stored, dict) else []
+        loaded = _User(_holdings(coins), favorites + [symbol for symbol in legacy if symbol not in favorites])
+        with self._lock:
+            user = self._users.setdefault(user_id, loaded)
+            if user is loaded and legacy:
+                self._dirty.update({(user_id, HOLDINGS), (user_id, FAVORITES)})
+                metrics.inc("userstate_migrated_total")
+        return user
+
+    def update(self, user_id, namespace: str, change: Callable[[_User], R]) -> R:
+        user = self.user(user_id)
+        with user.lock:
+            result = change(user)
+        with self._lock:
+            self._dirty.add((int(user_id), namespace))
+        return result
+
+    def flush(self) -> int:
+        """Writes every dirty key to PyKV; returns how many were written."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        kv = PyKV()
+        written = 0
+        for user_id, namespace in sorted(dirty):
+            user = self._users[user_id]
+            with user.lock:
+                value = _encode(namespace, user)
+            try:
+                kv.put(f"{PREFIXES[namespace]}{user_id}", value)
+                written += 1
+            except Exception as e:
+                # written again with the next flush
+                with self._lock:
+                    self._dirty.add((user_id, namespace))
+                metrics.inc("userstate_flush_errors_total")
+                print(f"[userstate] writing {PREFIXES[namespace]}{user_id} failed: {e}")
+        with self._lock:
+            self.writes += written
+        metrics.inc("userstate_writes_total", written)
+        return written
+
+    def all_holdings(self) -> Dict[int, Dict[str, Holding]]:
+        """Holdings of every user with at least one coin, stored or still waiting to be written."""
+        found = {}
+        for entry in PyKV().search_key(HOLDINGS_PREFIX):
+            key = entry["key"]
+            if not key.startswith(HOLDINGS_PREFIX):
+                continue
+            try:
+                user_id = int(key[len(HOLDINGS_PREFIX):])
+            except ValueError:
+                continue
+            found[user_id] = _holdings(entry["value"])
+        # loaded users are newer in memory than in PyKV until the next flush
+        for user_id, user in list(self._users.items()):
+            with user.lock:
+                found[user_id] = dict(user.holdings)
+        return {user_id: coins for user_id, coins in found.items() if coins}
+
+    def clear(self):
+        """Forgets every loaded user without writing; for benchmarks and tests."""
+        with self._lock:
+            self._users.clear()
+            self._dirty.clear()
+
+    def _collect(self):
+        yield "userstate_users", {}, len(self._users)
+        yield "userstate_dirty_keys", {}, len(self._dirty)
+
+
+states = UserStates()
+atexit.register(states.flush)
+
+
+def holdings(user_id) -> Dict[str, Holding]:
+    user = states.user(user_id)
+    with user.lock:
+        return dict(user.holdings)
+
+
+def holding(user_id, symbol: str) -> Optional[Holding]:
+    return states.user(user_id).holdings.get(symbol)
+
+
+def favorites(user_id) -> List[str]:
+    user = states.user(user_id)
+    with user.lock:
+        return list(user.favorites)
+
+
+def update_holdings(user_id, change: Callable[[Dict[str, Holding]], R]) -> R:
+    """Runs ``change`` on the user's holdings dict in place, atomically with respect to other updates."""
+    return states.update(user_id, HOLDINGS, lambda user: change(user.holdings))
+
+
+def update_favorites(user_id, change: Callable[[List[str]], R]) -> R:
+    return states.update(user_id, FAVORITES, lambda user: change(user.favorites))
+
+
+def set_holding(user_id, symbol: str, amount: float, average: float):
+    def change(coins: Dict[str, Holding]):
+        coins[symbol] = Holding(amount, average)
+
+    update_holdings(user_id, change)
+
+
+def remove_holding(user_id, symbol: str) -> bool:
+    return update_holdings(user_id, lambda coins: coins.pop(symbol, None) is not None)
+
+
+def _add(symbols: List[str], symbol: str) -> bool:
+    if symbol in symbols:
+        return False
+    symbols.append(symbol)
+    return True
+
+
+def _remove(symbols: List[str], symbol: str) -> bool:
+    if symbol not in symbols:
+        return False
+    symbols.remove(symbol)
+    return True
+
+
+def add_favorite(user_id, symbol: str) -> bool:
+    """False if ``symbol`` was already a favorite."""
+    return update_favorites(user_id, lambda symbols: _add(symbols, symbol))
+
+
+def remove_favorite(user_id, symbol: str) -> bool:
+    return update_favorites(user_id, lambda symbols: _remove(symbols, symbol))
+
+
+def all_holdings() -> Dict[int, Dict[str, Holding]]:
+    return states.all_holdings()
+
+
+def flush() -> int:
+    return states.flush()
+
+
+_flusher_task = None
+
+
+async def _run_flusher():
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(states.flush)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.inc("userstate_flush_errors_total")
+            print(f"[userstate] flush failed: {e}")
+
+
+def start_flusher():
+    """Starts the background write-back once; safe to call again."""
+    global _flusher_task
+    if _flusher_task is None or _flusher_task.done():
+        _flusher_task = aio.submit(_run_flusher())
+
+
+def stop_flusher():
+    """Stops the background write-back and writes whatever is still dirty."""
+    global _flusher_task
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        _flusher_task = None
+    states.flush()
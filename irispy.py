@@ -1,85 +1,90 @@
+import time
+_started = time.perf_counter()
+
 from iris import ChatContext, Bot
 from iris.bot.models import ErrorContext
-from bots.gemini import get_gemini
-from bots.pyeval import python_eval, real_eval
-from bots.stock import create_stock_image
-from bots.imagen import get_imagen
-from bots.lyrics import get_lyrics, find_lyrics
-from bots.replyphoto import reply_photo
-from bots.text2image import draw_text
-from bots.coin import get_coin_info
-#from bots.test_img import get_img
-from bots.kospidaq import kospidaq
-from bots.nasdaq import nasdaq
-from bots.ThreeIdoit import Threeidiots
-from bots.ThreeIdoit import wldadel
-from bots.favoritecoin import favorite_coin_info
-from bots.stock import create_gold_image
 
 from iris.decorators import *
-from helper.BanControl import ban_user, unban_user
+from helper.dispatcher import Dispatcher, LaneConfig, REJECT, DROP_OLDEST, BLOCK, HIGH, LOW
+from helper.registry import CommandRegistry
+from helper.ratelimit import RateLimiter, ClassLimit, Limit
+from helper import metrics
 from iris.kakaolink import IrisLink
 
 from bots.detect_nickname_change import detect_nickname_change
-import sys, threading
+import os, sys, threading
 
 iris_url = sys.argv[1]
 bot = Bot(iris_url)
 
+# 명령 종류별 작업 레인 : 느린 생성 작업이 시세 응답을 막지 않도록 분리
+dispatcher = Dispatcher({
+    "market": LaneConfig(workers=8, queue_size=64, overflow=DROP_OLDEST),
+    "image": LaneConfig(workers=3, queue_size=16, overflow=REJECT),
+    "ai": LaneConfig(workers=2, queue_size=6, overflow=REJECT),
+    "admin": LaneConfig(workers=2, queue_size=16, overflow=BLOCK),
+})
+
+# 명령 종류별 토큰 버킷 : Limit(최대 토큰, 초당 충전량). 사용자 한 명이나 방 하나가 할당량을 독차지하지 못하게 한다
+limiter = RateLimiter({
+    "market": ClassLimit(user=Limit(10, 0.5), room=Limit(30, 2)),
+    "image": ClassLimit(user=Limit(4, 0.2), room=Limit(12, 0.5)),
+    "ai": ClassLimit(user=Limit(3, 1 / 60), room=Limit(6, 4 / 60)),
+})
+
+def hello(chat: ChatContext):
+    chat.reply(f"Hello {chat.sender.name}")
+
+@is_admin
+def import_report(chat: ChatContext):
+    chat.reply(registry.import_report())
+
+# 명령어 → 핸들러 등록. 핸들러 모듈은 처음 호출될 때 import 된다.
+# priority : 같은 레인 안에서 HIGH(짧은 텍스트 응답, 관리) > NORMAL > LOW(이미지 생성) 순으로 처리하고,
+# 오래 기다린 작업은 LaneConfig.aging 초마다 한 단계씩 올라간다.
+# IRIS_ASYNC=1 이면 async 핸들러가 있는 명령은 레인 스레드 대신 공유 이벤트 루프에서 실행된다
+ASYNC_MODE = os.getenv("IRIS_ASYNC") == "1"
+registry = CommandRegistry()
+registry.register("!병림픽", "bots.ThreeIdoit:Threeidiots", lane="market", priority=HIGH)
+registry.register("!개", "bots.ThreeIdoit:wldadel", lane="market", priority=HIGH)
+registry.register("!증시", "bots.kospidaq:kospidaq", lane="image", async_target="bots.kospidaq:kospidaq_async")
+registry.register("!미", "bots.nasdaq:nasdaq", lane="image", async_target="bots.nasdaq:nasdaq_async")
+registry.register("!hhi", hello)
+registry.register(["!1단계", "!2단계", "!3단계", "!절망시리즈", "!퍽"], "bots.replyphoto:reply_photo", lane="image", needs_link=True, priority=HIGH)
+registry.register(["!gi", "!i2i"], "bots.gemini:get_gemini", lane="ai", async_target="bots.gemini:get_gemini_async", priority=LOW)
+registry.register("!분석", "bots.gemini:get_gemini", lane="ai", async_target="bots.gemini:get_gemini_async", priority=HIGH)
+registry.register("!ipy", "bots.pyeval:python_eval", lane="admin")
+registry.register("!iev", "bots.pyeval:real_eval", lane="admin", needs_link=True)
+registry.register("!ban", "helper.BanControl:ban_user", lane="admin", priority=HIGH)
+registry.register("!unban", "helper.BanControl:unban_user", lane="admin", priority=HIGH)
+registry.register("!모듈", import_report, lane="admin")
+registry.register("!주식", "bots.stock:create_stock_image", lane="image", async_target="bots.stock:create_stock_image_async")
+registry.register("!금", "bots.stock:create_gold_image", lane="image", async_target="bots.stock:create_gold_image_async")
+# 파라미터 없는 !코인 도 미리 정렬해 둔 시세판(helper.board)의 한 페이지만 보내니 다른 조회처럼 비용 1로 둔다
+registry.register("!코인", "bots.coin:get_coin_info", lane="market", async_target="bots.coin:get_coin_info_async", priority=HIGH)
+registry.register(["!바낸", "!김프", "!달러", "!환율"], "bots.coin:get_coin_info", lane="market", async_target="bots.coin:get_coin_info_async", priority=HIGH)
+registry.register(["!내코인", "!코인등록", "!코인삭제"], "bots.coin:get_coin_info", lane="market", async_target="bots.coin:get_coin_info_async", priority=HIGH)
+registry.register("!알림", "bots.alert:alert", lane="market", priority=HIGH)
+registry.register("!바구니", "bots.basket:basket", lane="market", priority=HIGH)
+registry.register("!시세", "bots.quote:quote", lane="market", async_target="bots.quote:quote_async", priority=HIGH)
+registry.register("!차트", "bots.chart:chart", lane="image")
+registry.register(["!즐찾등록", "!즐찾삭제", "!즐"], "bots.favoritecoin:favorite_coin_info", lane="market", priority=HIGH)
+
 @bot.on_event("message")
 @is_not_banned
+@limiter.guard(registry)
 def on_message(chat: ChatContext):
-
-    
     try:
-        match chat.message.command:
-            case "!병림픽" :
-                Threeidiots(chat)
-            
-            case "!개" :
-                wldadel(chat)
-
-            case "!증시":
-                kospidaq(chat)
-            
-            case "!미":
-                nasdaq(chat)
-
-            case "!hhi":
-                chat.reply(f"Hello {chat.sender.name}")
-
-            case "!1단계" | "!2단계" | "!3단계" | "!절망시리즈" | "!퍽":
-                reply_photo(chat, kl)
-
-            case "!gi" | "!i2i" | "!분석":
-                get_gemini(chat)
-            
-            case "!ipy":
-                python_eval(chat)
-            
-            case "!iev":
-                real_eval(chat, kl)
-            
-            case "!ban":
-                ban_user(chat)
-            
-            case "!unban":
-                unban_user(chat)
-
-            case "!주식":
-                create_stock_image(chat)
-
-            case "!금" :
-                create_gold_image(chat)
-            
-            case "!코인" | "!바낸" | "!김프" | "!달러" :
-                get_coin_info(chat)
-
-            case "!즐찾등록" | "!즐찾삭제" | "!즐":
-                favorite_coin_info(chat)
-
-            
+        command = registry.get(chat.message.command)
+        if command is None:
+            return
+        args = (kl,) if command.needs_link else ()
+        if ASYNC_MODE and command.async_target is not None:
+            dispatcher.submit_async(command.lane, command.call_async, chat, *args, priority=command.priority(chat))
+        else:
+            dispatcher.submit(command.lane, command, chat, *args, priority=command.priority(chat))
     except Exception as e :
+        metrics.inc("event_errors_total", event="message")
         print(e)
 
 #입장감지
@@ -101,6 +106,7 @@ def on_delmem(chat: ChatContext):
 
 @bot.on_event("error")
 def on_error(err: ErrorContext):
+    metrics.inc("event_errors_total", event=err.event)
     print(err.event, "이벤트에서 오류가 발생했습니다", err.exception)
     #sys.stdout.flush()
 
@@ -110,4 +116,30 @@ if __name__ == "__main__":
     nickname_detect_thread.start()
     #카카오링크를 사용하지 않는 경우 주석처리
     kl = IrisLink(bot.iris_url)
+    #METRICS_PORT=0 이면 메트릭 엔드포인트를 띄우지 않는다
+    metrics_port = int(os.getenv("METRICS_PORT", "9108"))
+    if metrics_port:
+        metrics.start_server(metrics_port)
+    #UPBIT_STREAM=0 이면 업비트 웹소켓 시세 구독 없이 REST 로만 조회한다
+    if os.getenv("UPBIT_STREAM", "1") != "0":
+        from helper import upbit
+        upbit.start_stream()
+    #BINANCE_SNAPSHOT=1 이면 바이낸스 전체 시세를 주기적으로 받아 심볼별로 들고 있는다 (기본은 필요한 심볼만 조회)
+    if os.getenv("BINANCE_SNAPSHOT") == "1":
+        from helper import binance
+        binance.start_snapshot()
+    #저장된 가격 알림을 불러와 시세가 바뀔 때마다 확인한다
+    from helper import alerts
+    alerts.start(bot.api)
+    #PORTFOLIO_HISTORY=0 이면 !내코인 평가금액 기록(매시/매일)을 남기지 않는다
+    if os.getenv("PORTFOLIO_HISTORY", "1") != "0":
+        from helper import portfolio
+        portfolio.start_recorder()
+    #!코인등록/!즐찾등록 변경분을 모아 FLUSH_INTERVAL 마다 PyKV 에 기록한다
+    from helper import userstate
+    userstate.start_flusher()
+    print(f"시작 준비 완료 : {(time.perf_counter() - _started) * 1000:,.0f} ms")
+    #IRIS_PRELOAD=1 이면 첫 요청 전에 백그라운드에서 핸들러 모듈을 미리 불러온다
+    if os.getenv("IRIS_PRELOAD") == "1":
+        threading.Thread(target=registry.preload, daemon=True).start()
     bot.run()